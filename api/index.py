@@ -1,15 +1,17 @@
 import os
 import sys
-import io
-import torch
-from PIL import Image
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from torchvision import transforms
 import json
+import threading
 from pathlib import Path
+from starlette.concurrency import run_in_threadpool
+
+# torch / torchvision and everything built on them are imported on the first
+# request that needs the model (see _load_model_locked), so cold starts that
+# only serve /, /classes or /health never pay for them
 
 # Add parent directory to Python path for imports
 current_dir = Path(__file__).parent
@@ -19,8 +21,11 @@ sys.path.append(str(parent_dir))
 try:
     from utilss.species_fetcher import fetch_species_names
     from utilss.dataset_manager import get_class_names_from_dataset
-    from model import AnimalCNN
     from utilss.logger import log_correction
+    from utilss.inference_backend import CHECKPOINT_PATH, backend_path, load_backend
+    from utilss.model_bundle import read_class_names
+    from utilss.ingest import (FORM_OVERHEAD_BYTES, UploadLimitMiddleware, check_image_header,
+                               limits_from_env, read_upload, spool_upload)
 except ImportError as e:
     print(f"Import error: {e}")
     # Define fallback functions for deployment
@@ -36,14 +41,28 @@ except ImportError as e:
     def log_correction(filename, predicted, actual):
         pass
 
-    # Simple model class for deployment
-    class AnimalCNN:
-        def __init__(self, num_classes):
-            pass
+    CHECKPOINT_PATH = "outputs/best_model.pth"
+
+    def read_class_names(checkpoint_path):
+        return None
+
+    # No backend_path / load_backend either: _load_model_locked() then reports
+    # the model as unavailable, so uploads are never read and need no limits
+    limits_from_env = None
 
 # Initialize FastAPI
 app = FastAPI(title="Animal Classification API", version="1.0.0")
 
+# Upload limits: bodies are capped while they stream in and images are
+# checked from their header before decoding (see utilss/ingest.py)
+UPLOAD_LIMITS = limits_from_env(os.environ) if limits_from_env else None
+if UPLOAD_LIMITS is not None:
+    app.add_middleware(
+        UploadLimitMiddleware,
+        max_bytes=UPLOAD_LIMITS.max_upload_bytes + FORM_OVERHEAD_BYTES,
+        path_limits={"/predict/batch": UPLOAD_LIMITS.max_batch_bytes},
+    )
+
 # Allow frontend access via CORS
 app.add_middleware(
     CORSMiddleware,
@@ -52,12 +71,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Setup device (CPU for Vercel)
-device = torch.device("cpu")
-
-# Initialize class names
+# Initialize class names (from the model bundle's header when there is one,
+# so the dataset folder is never read)
 try:
-    class_names = get_class_names_from_dataset()
+    class_names = read_class_names(os.path.join(parent_dir, CHECKPOINT_PATH)) or \
+        get_class_names_from_dataset()
     num_classes = len(class_names)
 except:
     # Fallback class names for deployment
@@ -72,24 +90,58 @@ if num_classes == 0:
                    "Tiger", "Zebra"]
     num_classes = len(class_names)
 
+# Batch endpoint limits
+BATCH_SIZE = int(os.environ.get("ANIMAL_BATCH_MAX_SIZE", "16"))
+BATCH_MAX_FILES = int(os.environ.get("ANIMAL_BATCH_MAX_FILES", "10000"))
+
+# Inference executor thread layout (see utilss/inference_executor.py)
+DECODE_WORKERS = int(os.environ.get("ANIMAL_DECODE_WORKERS", "0")) or None
+MODEL_WORKERS = int(os.environ.get("ANIMAL_MODEL_WORKERS", "1"))
+
+# Inference backend: eager | torchscript | onnxruntime | int8
+# (ANIMAL_QUANTIZED=1 is short for int8)
+QUANTIZED = os.environ.get("ANIMAL_QUANTIZED", "0") == "1"
+INFERENCE_BACKEND = os.environ.get("ANIMAL_INFERENCE_BACKEND", "int8" if QUANTIZED else "eager")
+
 # Load model lazily to reduce cold start time
 model = None
 model_loaded = False
+inference = None
+model_lock = threading.Lock()
 
 
 def load_model():
     """Load model on first request to reduce package size"""
-    global model, model_loaded
+    with model_lock:
+        return _load_model_locked()
+
+
+def _load_model_locked():
+    global model, model_loaded, inference
     if model_loaded:
         return model
 
     try:
-        model = AnimalCNN(num_classes=num_classes).to(device)
-        model_path = os.path.join(parent_dir, "outputs", "best_model.pth")
+        model_path = backend_path(INFERENCE_BACKEND, root=str(parent_dir))
 
         if os.path.exists(model_path):
-            model.load_state_dict(torch.load(model_path, map_location=device))
-            model.eval()
+            import torch
+            from utilss.adaptive_resolution import AdaptiveResolutionModel, policy_from_env
+            from utilss.inference_executor import InferenceExecutor, plan_threads
+            from utilss.preprocess import default_preprocessor
+
+            # CPU for Vercel
+            device = torch.device("cpu")
+            threads = plan_threads(DECODE_WORKERS, MODEL_WORKERS)["intra_op_threads"]
+            model = load_backend(INFERENCE_BACKEND, num_classes, device,
+                                 root=str(parent_dir), num_threads=threads)
+            # Adaptive resolution (ANIMAL_ADAPTIVE_RESOLUTION=1) downsizes batches under load
+            policy = policy_from_env(os.environ)
+            forward = AdaptiveResolutionModel(
+                model, policy, queue_depth_fn=lambda: inference.batcher.queue_depth()) if policy else model
+            inference = InferenceExecutor(
+                forward, decode_workers=DECODE_WORKERS, model_workers=MODEL_WORKERS,
+                max_batch_size=BATCH_SIZE, buffer_factory=default_preprocessor.empty)
             model_loaded = True
             print(f"✅ Model loaded with {num_classes} classes")
             return model
@@ -98,15 +150,8 @@ def load_model():
             return None
     except Exception as e:
         print(f"❌ Error loading model: {e}")
-        return None  # Image transform
-
+        return None
 
-transform = transforms.Compose([
-    transforms.Resize((224, 224)),
-    transforms.ToTensor(),
-    transforms.Normalize([0.485, 0.456, 0.406],
-                         [0.229, 0.224, 0.225])
-])
 
 # Mount static files
 try:
@@ -137,6 +182,7 @@ async def serve_index():
                 <p>Available endpoints:</p>
                 <ul>
                     <li>POST /predict - Upload image for classification</li>
+                    <li>POST /predict/batch - Upload many images or an archive (NDJSON results)</li>
                     <li>GET /classes - Get available animal classes</li>
                     <li>POST /feedback - Submit classification feedback</li>
                 </ul>
@@ -147,49 +193,85 @@ async def serve_index():
         return HTMLResponse(content=f"<h1>Error loading page: {e}</h1>")
 
 
+def get_base_class(label: str):
+    label = label.replace("_", " ")
+    for keyword in ["Bear", "Cat", "Dog", "Deer", "Bird", "Cow", "Horse",
+                    "Dolphin", "Elephant", "Giraffe", "Kangaroo", "Lion",
+                    "Panda", "Tiger", "Zebra"]:
+        if keyword in label:
+            return keyword
+    return label
+
+
+def decode_image(contents, out=None):
+    """Decode uploaded bytes into a normalized (C, H, W) CPU tensor (into ``out`` if given)"""
+    from utilss.preprocess import preprocess_bytes
+    check_image_header(contents, UPLOAD_LIMITS)
+    return preprocess_bytes(contents, out=out)
+
+
+def format_prediction(output):
+    """Turn one row of model logits into the /predict response"""
+    pred_idx = output.argmax().item()
+    predicted_class = class_names[pred_idx]
+    confidence = output.softmax(dim=0)[pred_idx].item()
+
+    return {
+        "prediction": predicted_class,
+        "base_class": get_base_class(predicted_class),
+        "confidence": round(confidence, 4),
+        "breeds": fetch_species_names(predicted_class, top_n=3)
+    }
+
+
 @app.post("/predict")
 async def predict(file: UploadFile = File(...)):
     """Predict animal class from uploaded image"""
-    # Load model on first request
-    current_model = load_model()
+    # Load model on first request (off the event loop)
+    current_model = await run_in_threadpool(load_model)
     if current_model is None:
         return {"error": "Model not available. Please check deployment."}
 
     try:
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents)).convert("RGB")
-        input_tensor = transform(image).unsqueeze(0).to(device)
-
-        with torch.no_grad():
-            output = current_model(input_tensor)
-            pred_idx = output.argmax(dim=1).item()
-
-        predicted_class = class_names[pred_idx]
-        confidence = torch.softmax(output, dim=1)[0][pred_idx].item()
-
-        def get_base_class(label: str):
-            label = label.replace("_", " ")
-            for keyword in ["Bear", "Cat", "Dog", "Deer", "Bird", "Cow", "Horse",
-                            "Dolphin", "Elephant", "Giraffe", "Kangaroo", "Lion",
-                            "Panda", "Tiger", "Zebra"]:
-                if keyword in label:
-                    return keyword
-            return label
-
-        base_class = get_base_class(predicted_class)
-        breed_suggestions = fetch_species_names(predicted_class, top_n=3)
-
-        return {
-            "prediction": predicted_class,
-            "base_class": base_class,
-            "confidence": round(confidence, 4),
-            "breeds": breed_suggestions
-        }
+        contents = await read_upload(file, UPLOAD_LIMITS)
+        async with inference.decoded(decode_image, contents) as input_tensor:
+            output = await inference.predict(input_tensor)
+
+        return format_prediction(output)
+    except HTTPException:
+        # Size and format rejections keep their 413 / 415 status
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=400, detail=f"Error processing image: {str(e)}")
 
 
+@app.post("/predict/batch")
+async def predict_batch(request: Request):
+    """Classify many files or one zip/tar archive, streaming NDJSON results"""
+    current_model = await run_in_threadpool(load_model)
+    if current_model is None:
+        return {"error": "Model not available. Please check deployment."}
+
+    from utilss.batch_predict import iter_upload_images, stream_batch_predictions
+
+    # Parse the form manually so the uploads stay open while streaming
+    form = await request.form(max_files=BATCH_MAX_FILES)
+    uploads = [item for item in form.getlist("files") if hasattr(item, "filename")]
+
+    async def results():
+        try:
+            async for line in stream_batch_predictions(
+                    iter_upload_images(uploads, UPLOAD_LIMITS.max_upload_bytes), decode_image, inference.forward_batch,
+                    format_prediction, batch_size=BATCH_SIZE,
+                    executor=inference.decode_pool):
+                yield line
+        finally:
+            await form.close()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
 @app.post("/feedback")
 async def feedback(
     file: UploadFile = File(...),
@@ -198,13 +280,18 @@ async def feedback(
 ):
     """Submit feedback for model improvement"""
     try:
-        contents = await file.read()
+        if UPLOAD_LIMITS is not None:
+            with await spool_upload(file, UPLOAD_LIMITS) as spool:
+                check_image_header(spool, UPLOAD_LIMITS)
         filename = file.filename
 
         # Log the correction (simplified for deployment)
         log_correction(filename, predicted, actual)
 
         return {"message": "✅ Feedback received and logged."}
+    except HTTPException:
+        # Size and format rejections keep their 413 / 415 status
+        raise
     except Exception as e:
         return {"message": f"⚠️ Error processing feedback: {e}"}
 
@@ -221,7 +308,10 @@ async def health_check():
     return {
         "status": "healthy",
         "model_loaded": model_loaded,
+        "backend": INFERENCE_BACKEND,
+        "inference": inference.stats() if inference is not None else None,
         "num_classes": num_classes,
+        "upload_limits": UPLOAD_LIMITS.as_dict() if UPLOAD_LIMITS else None,
         "classes": class_names[:10]  # Show first 10 classes only
     }
 
@@ -0,0 +1,108 @@
+"""
+Inference Backend Benchmark
+Compares eager, TorchScript, ONNX Runtime and INT8 backends on latency,
+throughput, peak RSS and import time
+
+Each backend runs in its own subprocess so import time and memory are not
+polluted by the others. Run export_model.py (and quantize.py for int8) first.
+
+Usage:
+    python benchmarks/bench_backends.py --num-classes 15
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+
+def worker(args):
+    """Measure one backend and print a JSON line."""
+    start = time.perf_counter()
+    if args.worker == "onnxruntime":
+        import numpy as np
+        import onnxruntime  # noqa: F401
+        make_batch = lambda n: np.random.randn(n, 3, 224, 224).astype(np.float32)  # noqa: E731
+        no_grad = None
+    else:
+        import torch
+        make_batch = lambda n: torch.randn(n, 3, 224, 224)  # noqa: E731
+        no_grad = torch.no_grad
+    import_s = time.perf_counter() - start
+
+    from utilss.inference_backend import load_backend
+
+    start = time.perf_counter()
+    backend = load_backend(args.worker, args.num_classes, root=ROOT)
+    load_s = time.perf_counter() - start
+
+    def run(batch):
+        if no_grad is None:
+            return backend(batch)
+        with no_grad():
+            return backend(batch)
+
+    single = make_batch(1)
+    for _ in range(5):
+        run(single)
+    latencies = []
+    for _ in range(args.repeats):
+        t0 = time.perf_counter()
+        run(single)
+        latencies.append(time.perf_counter() - t0)
+
+    batch = make_batch(args.batch_size)
+    run(batch)
+    t0 = time.perf_counter()
+    for _ in range(max(args.repeats // 5, 3)):
+        run(batch)
+    elapsed = time.perf_counter() - t0
+    throughput = max(args.repeats // 5, 3) * args.batch_size / elapsed
+
+    print(json.dumps({
+        "backend": args.worker,
+        "import_s": import_s,
+        "load_s": load_s,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "throughput": throughput,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["eager", "torchscript", "onnxruntime", "int8"])
+    parser.add_argument("--num-classes", type=int, default=15)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    print(f"{'backend':<12} {'import':>8} {'load':>8} {'p50 b=1':>9} {'b=' + str(args.batch_size):>10} {'peak RSS':>9}")
+    for name in args.backends:
+        cmd = [sys.executable, os.path.abspath(__file__), "--worker", name,
+               "--num-classes", str(args.num_classes), "--batch-size", str(args.batch_size),
+               "--repeats", str(args.repeats)]
+        proc = subprocess.run(cmd, capture_output=True, text=True, cwd=ROOT)
+        if proc.returncode != 0:
+            reason = (proc.stderr.strip().splitlines() or ["failed"])[-1]
+            print(f"{name:<12} ❌ {reason}")
+            continue
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{name:<12} {r['import_s']:>7.2f}s {r['load_s']:>7.2f}s {r['p50_ms']:>7.1f}ms "
+              f"{r['throughput']:>6.1f}/s {r['peak_rss_mb']:>7.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
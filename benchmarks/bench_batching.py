@@ -0,0 +1,88 @@
+"""
+Micro-Batching Benchmark
+Compares the per-request /predict path against MicroBatcher under concurrent load
+
+Usage:
+    python benchmarks/bench_batching.py --clients 32 --requests 20
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import AnimalCNN
+from utilss.batcher import MicroBatcher
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_clients(handler, clients, requests_per_client):
+    """Closed-loop load: each client sends its next request when the last one returns."""
+    latencies = []
+
+    async def client():
+        for _ in range(requests_per_client):
+            image = torch.randn(3, 224, 224)
+            start = time.perf_counter()
+            await handler(image)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return latencies, time.perf_counter() - start
+
+
+def report(name, latencies, elapsed):
+    print(f"{name:<24} {len(latencies) / elapsed:>8.1f} img/s"
+          f" | p50 {statistics.median(latencies) * 1000:>7.1f} ms"
+          f" | p99 {percentile(latencies, 99) * 1000:>7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=20,
+                        help="Requests per client")
+    parser.add_argument("--num-classes", type=int, default=15)
+    parser.add_argument("--max-batch-size", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    model = AnimalCNN(num_classes=args.num_classes, pretrained=False).eval()
+    print(f"🧪 {args.clients} concurrent clients x {args.requests} requests, "
+          f"torch threads={torch.get_num_threads()}\n")
+
+    # 🐢 Current path: one batch-1 forward per request, run inline on the event loop
+    async def per_request(image):
+        with torch.no_grad():
+            return model(image.unsqueeze(0))[0]
+
+    with torch.no_grad():
+        model(torch.randn(1, 3, 224, 224))  # warm-up
+    latencies, elapsed = asyncio.run(run_clients(per_request, args.clients, args.requests))
+    report("per-request", latencies, elapsed)
+
+    # 🚀 Micro-batched path
+    for max_batch_size in args.max_batch_size:
+        batcher = MicroBatcher(model, max_batch_size=max_batch_size,
+                               max_wait_ms=args.max_wait_ms)
+        latencies, elapsed = asyncio.run(run_clients(batcher.predict, args.clients, args.requests))
+        stats = batcher.stats()
+        batcher.stop()
+        report(f"batched (N={max_batch_size}, T={args.max_wait_ms:g}ms)", latencies, elapsed)
+        print(f"{'':<24} avg batch size {stats['avg_batch_size']}")
+
+
+if __name__ == "__main__":
+    main()
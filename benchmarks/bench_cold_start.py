@@ -0,0 +1,140 @@
+"""
+Cold-Start Benchmark
+Import, model construction, weight load and first-request time of a fresh serving process
+
+Every scenario runs in a new interpreter, so imports and allocations are
+really cold:
+    legacy  AnimalCNN with ImageNet weights, then load_state_dict (old serving path)
+    bare    AnimalCNN(pretrained=False), then load_state_dict
+    meta    model.load_inference_model (meta-device construction, tensors assigned)
+    api     api/index.py: module import, first /health, first and second /predict
+
+Usage:
+    python benchmarks/bench_cold_start.py --repeats 3 [--checkpoint outputs/best_model.pth]
+"""
+
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+SCENARIOS = ("legacy", "bare", "meta", "api")
+
+
+def timed(timings, name, fn):
+    start = time.perf_counter()
+    result = fn()
+    timings[name] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def run_model_scenario(scenario, checkpoint, num_classes):
+    timings = {}
+    torch = timed(timings, "import_torch", lambda: __import__("torch"))
+    model_module = timed(timings, "import_model", lambda: __import__("model"))
+
+    if scenario == "meta":
+        model = timed(timings, "construct+load", lambda: model_module.load_inference_model(
+            checkpoint, num_classes))
+    else:
+        model = timed(timings, "construct", lambda: model_module.AnimalCNN(
+            num_classes=num_classes, pretrained=scenario == "legacy"))
+        state = timed(timings, "read_weights", lambda: torch.load(checkpoint, map_location="cpu"))
+        timed(timings, "load_state_dict", lambda: model.load_state_dict(state))
+        model.eval()
+
+    batch = torch.zeros(1, 3, 224, 224)
+    with torch.no_grad():
+        timed(timings, "first_forward", lambda: model(batch))
+        timed(timings, "second_forward", lambda: model(batch))
+    return timings
+
+
+def run_api_scenario():
+    from PIL import Image
+
+    timings = {}
+    index = timed(timings, "import_api", lambda: __import__("api.index", fromlist=["app"]))
+    timings["torch_imported_by_api"] = float("torch" in sys.modules)
+    from fastapi.testclient import TestClient
+    client = TestClient(index.app)
+
+    buffer = io.BytesIO()
+    Image.effect_noise((640, 480), 64).convert("RGB").save(buffer, format="JPEG")
+    payload = buffer.getvalue()
+
+    timed(timings, "first_health", lambda: client.get("/health"))
+    for name in ("first_predict", "second_predict"):
+        response = timed(timings, name, lambda: client.post(
+            "/predict", files={"file": ("cold.jpg", payload, "image/jpeg")}))
+        if "error" in response.json():
+            raise RuntimeError(response.json()["error"])
+    return timings
+
+
+def child(args):
+    start = time.perf_counter()
+    if args.child == "api":
+        timings = run_api_scenario()
+    else:
+        timings = run_model_scenario(args.child, args.checkpoint, args.num_classes)
+    timings["total"] = (time.perf_counter() - start) * 1000
+    print(json.dumps(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--checkpoint", default=os.path.join(ROOT, "outputs", "best_model.pth"))
+    parser.add_argument("--num-classes", type=int, default=15)
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args)
+
+    checkpoint = args.checkpoint
+    if not os.path.exists(checkpoint):
+        # Random weights of the right shape are enough to time the model scenarios
+        import torch
+        from model import AnimalCNN
+        checkpoint = os.path.join(tempfile.mkdtemp(), "cold_start.pth")
+        torch.save(AnimalCNN(num_classes=args.num_classes, pretrained=False).state_dict(), checkpoint)
+        print(f"⚠️ {args.checkpoint} not found; using random weights (api scenario skipped)")
+        args.scenarios = [s for s in args.scenarios if s != "api"]
+
+    results = {}
+    for scenario in args.scenarios:
+        runs = []
+        for _ in range(args.repeats):
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", scenario,
+                 "--checkpoint", checkpoint, "--num-classes", str(args.num_classes)],
+                cwd=ROOT, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"❌ {scenario}: {proc.stderr.strip().splitlines()[-1] if proc.stderr else 'failed'}")
+                break
+            runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        if runs:
+            results[scenario] = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+    for scenario, timings in results.items():
+        print(f"\n🧊 {scenario} (median of {args.repeats}, ms)")
+        for key, value in timings.items():
+            if key == "torch_imported_by_api":
+                print(f"  {'torch imported at startup':<24} {'yes' if value else 'no'}")
+            else:
+                print(f"  {key:<24} {value:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Data-Parallel Scaling Benchmark
+Images/sec of DDP (gloo) training steps on AnimalCNN at 1, 2, 4 and 8 processes
+
+Every process trains on synthetic batches, so the numbers reflect compute
+and gradient all-reduce only (no decoding), with the machine's cores split
+evenly between processes the way utilss.distributed.init_distributed does.
+
+Usage:
+    python benchmarks/bench_ddp_scaling.py --processes 1 2 4 8 --steps 20
+"""
+
+import argparse
+import os
+import socket
+import sys
+import time
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.nn.parallel import DistributedDataParallel
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.loaders import available_cpus
+from model import AnimalCNN
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def worker(rank, world_size, port, args, results):
+    os.environ["MASTER_ADDR"] = "127.0.0.1"
+    os.environ["MASTER_PORT"] = str(port)
+    torch.set_num_threads(max(1, available_cpus() // world_size))
+    dist.init_process_group("gloo", rank=rank, world_size=world_size)
+
+    model = AnimalCNN(num_classes=args.num_classes, pretrained=False).to(memory_format=torch.channels_last)
+    model = DistributedDataParallel(model)
+    optimizer = torch.optim.Adam([p for p in model.parameters() if p.requires_grad], lr=1e-4)
+    criterion = torch.nn.CrossEntropyLoss()
+    images = torch.randn(args.batch_size, 3, 224, 224).contiguous(memory_format=torch.channels_last)
+    labels = torch.randint(0, args.num_classes, (args.batch_size,))
+
+    def step():
+        optimizer.zero_grad()
+        criterion(model(images), labels).backward()
+        optimizer.step()
+
+    for _ in range(args.warmup):
+        step()
+    dist.barrier()
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        step()
+    dist.barrier()
+    elapsed = time.perf_counter() - start
+
+    if rank == 0:
+        results[world_size] = world_size * args.batch_size * args.steps / elapsed
+    dist.destroy_process_group()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--batch-size", type=int, default=32, help="Per-process batch size")
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--num-classes", type=int, default=15)
+    args = parser.parse_args()
+
+    results = mp.Manager().dict()
+    for world_size in args.processes:
+        mp.spawn(worker, args=(world_size, free_port(), args, results), nprocs=world_size, join=True)
+        print(f"  {world_size} process(es): {results[world_size]:.1f} img/s")
+
+    baseline = results[args.processes[0]] / args.processes[0]
+    print(f"\n{'processes':>10}{'threads/proc':>14}{'images/sec':>12}{'speedup':>10}{'efficiency':>12}")
+    for world_size in args.processes:
+        rate = results[world_size]
+        speedup = rate / results[args.processes[0]]
+        print(f"{world_size:>10}{max(1, available_cpus() // world_size):>14}{rate:>12.1f}"
+              f"{speedup:>9.2f}x{rate / (baseline * world_size):>11.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Pre-Fork Serving Benchmark
+Per-worker memory, startup time and /predict throughput of serve.py vs uvicorn --workers
+
+Both servers are started from the repository root with the prediction cache
+disabled, loaded with concurrent /predict uploads of distinct JPEGs, and
+measured from /proc. PSS splits shared pages between workers, so it shows
+the saving from shared weights that RSS hides.
+
+Usage:
+    python benchmarks/bench_prefork.py --workers 4 --clients 32 --duration 20
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from utilss.prefork import memory_usage
+
+
+def make_jpegs(count, width, height):
+    payloads = []
+    for _ in range(count):
+        buffer = io.BytesIO()
+        Image.effect_noise((width, height), 64).convert("RGB").save(buffer, format="JPEG", quality=90)
+        payloads.append(buffer.getvalue())
+    return payloads
+
+
+def descendants(pid):
+    children = []
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            for child in f.read().split():
+                children.append(int(child))
+                children.extend(descendants(int(child)))
+    except OSError:
+        pass
+    return children
+
+
+async def wait_ready(url, workers, timeout):
+    """
+    Seconds until the server answers /health with a loaded model 4x per
+    worker in a row (workers are not addressable individually, and a worker
+    still importing main_api simply leaves its share of requests queued)
+    """
+    start = time.perf_counter()
+    healthy = 0
+    async with httpx.AsyncClient(base_url=url, timeout=5) as client:
+        while time.perf_counter() - start < timeout:
+            try:
+                response = await client.get("/health")
+                healthy = healthy + 1 if response.json().get("model_loaded") else 0
+            except (httpx.HTTPError, ValueError):
+                healthy = 0
+            if healthy >= 4 * workers:
+                return time.perf_counter() - start
+            await asyncio.sleep(0.05)
+    raise TimeoutError(f"server at {url} not ready after {timeout}s")
+
+
+async def load(url, payloads, clients, duration):
+    done = errors = 0
+    stop = time.perf_counter() + duration
+
+    async def client_loop(offset, client):
+        nonlocal done, errors
+        i = offset
+        while time.perf_counter() < stop:
+            response = await client.post(
+                "/predict", files={"file": ("load.jpg", payloads[i % len(payloads)], "image/jpeg")})
+            if response.status_code == 200 and "error" not in response.json():
+                done += 1
+            else:
+                errors += 1
+            i += clients
+
+    async with httpx.AsyncClient(base_url=url, timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(c, client) for c in range(clients)))
+        elapsed = time.perf_counter() - start
+    return done / elapsed, errors
+
+
+def run(mode, args, payloads):
+    commands = {
+        "naive": [sys.executable, "-m", "uvicorn", "main_api:app", "--port", str(args.port),
+                  "--workers", str(args.workers), "--log-level", "warning"],
+        "prefork": [sys.executable, "serve.py", "--port", str(args.port),
+                    "--workers", str(args.workers), "--log-level", "warning"],
+    }
+    env = {**os.environ, "ANIMAL_CACHE_MAX_ENTRIES": "0"}
+    url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(commands[mode], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        ready_s = asyncio.run(wait_ready(url, args.workers, args.timeout))
+        rate, errors = asyncio.run(load(url, payloads, args.clients, args.duration))
+        processes = {pid: memory_usage(pid) for pid in [server.pid] + descendants(server.pid)}
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    print(f"\n🧪 {mode}: ready in {ready_s:.1f}s | {rate:.1f} img/s | {errors} errors")
+    for pid, usage in processes.items():
+        print(f"  pid {pid:>7} | RSS {usage.get('rss_mb', 0):>7.1f} MB | "
+              f"PSS {usage.get('pss_mb', 0):>7.1f} MB | shmem {usage.get('rssshmem_mb', 0):>6.1f} MB")
+    total_rss = sum(u.get("rss_mb", 0) for u in processes.values())
+    total_pss = sum(u.get("pss_mb", 0) for u in processes.values())
+    return {"ready_s": ready_s, "rate": rate, "rss": total_rss, "pss": total_pss,
+            "processes": len(processes)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--payloads", type=int, default=256, help="Distinct JPEGs to cycle through")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--modes", nargs="+", default=["naive", "prefork"], choices=["naive", "prefork"])
+    args = parser.parse_args()
+
+    payloads = make_jpegs(args.payloads, args.width, args.height)
+    results = {mode: run(mode, args, payloads) for mode in args.modes}
+
+    print(f"\n{'mode':>8}{'procs':>7}{'ready s':>9}{'img/s':>9}{'RSS MB':>9}{'PSS MB':>9}{'PSS/worker':>12}")
+    for mode, r in results.items():
+        print(f"{mode:>8}{r['processes']:>7}{r['ready_s']:>9.1f}{r['rate']:>9.1f}"
+              f"{r['rss']:>9.0f}{r['pss']:>9.0f}{r['pss'] / args.workers:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Preprocessing Microbenchmark
+Times utilss.preprocess against the Resize + ToTensor + Normalize transform and
+checks that both produce tensors within tolerance
+
+Usage:
+    python benchmarks/bench_preprocess.py [--images path/to/a.jpg path/to/b.png ...]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+import torch
+from PIL import Image
+from torchvision import transforms
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utilss.preprocess import IMAGENET_MEAN, IMAGENET_STD, INPUT_SIZE, Preprocessor
+
+reference = transforms.Compose([
+    transforms.Resize((INPUT_SIZE, INPUT_SIZE)),
+    transforms.ToTensor(),
+    transforms.Normalize(IMAGENET_MEAN, IMAGENET_STD)
+])
+
+
+def reference_from_bytes(data: bytes) -> torch.Tensor:
+    return reference(Image.open(io.BytesIO(data)).convert("RGB"))
+
+
+def synthetic_image(width: int, height: int, fmt: str) -> bytes:
+    """Smooth gradients plus mild noise, roughly like a photo."""
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 24)
+    image = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.FLIP_LEFT_RIGHT)))
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, quality=90) if fmt == "JPEG" else image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def time_fn(fn, data, repeats):
+    fn(data)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(data)
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", nargs="*", default=[])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--mean-tolerance", type=float, default=0.05,
+                        help="Max allowed mean |difference| in normalized units")
+    parser.add_argument("--top1-model", action="store_true",
+                        help="Also check AnimalCNN top-1 agreement on both tensors")
+    args = parser.parse_args()
+
+    samples = []
+    for path in args.images:
+        with open(path, "rb") as f:
+            samples.append((os.path.basename(path), f.read()))
+    if not samples:
+        samples = [
+            ("synthetic 4000x3000 JPEG", synthetic_image(4000, 3000, "JPEG")),
+            ("synthetic 1024x768 JPEG", synthetic_image(1024, 768, "JPEG")),
+            ("synthetic 1024x768 PNG", synthetic_image(1024, 768, "PNG")),
+        ]
+
+    fast = Preprocessor()
+    out = fast.empty()
+    model = None
+    if args.top1_model:
+        from model import AnimalCNN
+        model = AnimalCNN(num_classes=15, pretrained=False).eval()
+
+    failures = 0
+    print(f"{'image':<28} {'reference':>10} {'fast':>10} {'speedup':>8} {'mean|d|':>8} {'max|d|':>8}")
+    for name, data in samples:
+        ref_time = time_fn(reference_from_bytes, data, args.repeats)
+        fast_time = time_fn(lambda d: fast.from_bytes(d, out=out), data, args.repeats)
+
+        expected = reference_from_bytes(data)
+        actual = fast.from_bytes(data)
+        diff = (expected - actual).abs()
+        ok = diff.mean().item() <= args.mean_tolerance
+        failures += not ok
+
+        print(f"{name:<28} {ref_time * 1000:>8.1f}ms {fast_time * 1000:>8.1f}ms "
+              f"{ref_time / fast_time:>7.1f}x {diff.mean().item():>8.4f} {diff.max().item():>8.4f}"
+              f"{'' if ok else '  ❌ over tolerance'}")
+
+        if model is not None:
+            with torch.no_grad():
+                logits = model(torch.stack([expected, actual]))
+            agree = logits[0].argmax() == logits[1].argmax()
+            print(f"{'':<28} top-1 agreement: {'✅' if agree else '❌'}")
+
+    if failures:
+        sys.exit(f"❌ {failures} image(s) exceeded mean tolerance {args.mean_tolerance}")
+    print(f"\n✅ All tensors within mean tolerance {args.mean_tolerance}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Training Input Pipeline Benchmark
+Compares images/sec of AnimalDataset + main.py's PIL transform against ShardDataset
+
+Usage:
+    python build_shards.py
+    python benchmarks/bench_shards.py --workers 4 --batches 30
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from torch.utils.data import DataLoader
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.dataloader import AnimalDataset, train_transform
+from data.shards import SHARD_DIR, ShardDataset
+
+
+def images_per_second(dataset, batch_size, workers, batches):
+    loader = DataLoader(dataset, batch_size=batch_size, shuffle=True, num_workers=workers,
+                        persistent_workers=workers > 0)
+    iterator = iter(loader)
+    next(iterator)  # worker startup and first-touch page faults are not counted
+    seen, start = 0, time.perf_counter()
+    for _ in range(batches):
+        try:
+            images, _ = next(iterator)
+        except StopIteration:
+            iterator = iter(loader)
+            images, _ = next(iterator)
+        seen += images.shape[0]
+    return seen / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dataset", default="dataset")
+    parser.add_argument("--shards", default=SHARD_DIR)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batches", type=int, default=30)
+    args = parser.parse_args()
+
+    results = {
+        "jpeg (AnimalDataset)": images_per_second(AnimalDataset(args.dataset, train_transform()),
+                                                  args.batch_size, args.workers, args.batches),
+        "shards (ShardDataset)": images_per_second(ShardDataset(args.shards, train=True),
+                                                   args.batch_size, args.workers, args.batches),
+    }
+
+    print(f"\n{'pipeline':<24}{'images/sec':>12}")
+    for name, rate in results.items():
+        print(f"{name:<24}{rate:>12.1f}")
+    baseline = results["jpeg (AnimalDataset)"]
+    print(f"\nspeedup: {results['shards (ShardDataset)'] / baseline:.2f}x "
+          f"(batch {args.batch_size}, {args.workers} workers)")
+
+
+if __name__ == "__main__":
+    main()
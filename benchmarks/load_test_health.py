@@ -0,0 +1,86 @@
+"""
+Event-Loop Load Test
+Saturates /predict with large uploads and checks that /health latency stays flat
+
+Start the server first, e.g. ``uvicorn main_api:app``, then run:
+    python benchmarks/load_test_health.py --url http://127.0.0.1:8000 --clients 16
+"""
+
+import argparse
+import asyncio
+import io
+import statistics
+import time
+
+import httpx
+from PIL import Image
+
+
+def make_jpeg(width: int, height: int) -> bytes:
+    """Build a noisy JPEG so decoding cost is realistic."""
+    image = Image.effect_noise((width, height), 64).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def summarize(name, latencies):
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(0.99 * (len(ordered) - 1)))]
+    print(f"{name:<22} n={len(latencies):<5} p50 {statistics.median(latencies) * 1000:>7.1f} ms"
+          f" | p99 {p99 * 1000:>7.1f} ms | max {ordered[-1] * 1000:>7.1f} ms")
+
+
+async def probe_health(client, duration, interval):
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get("/health")
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def saturate_predict(client, payload, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.post(
+            "/predict", files={"file": ("load.jpg", payload, "image/jpeg")})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+
+async def main(args):
+    payload = make_jpeg(args.width, args.height)
+    print(f"🧪 Upload size: {len(payload) / 1e6:.1f} MB ({args.width}x{args.height})\n")
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=120) as client:
+        idle = await probe_health(client, args.duration, args.interval)
+
+        stop = asyncio.Event()
+        predict_latencies = []
+        workers = [asyncio.create_task(saturate_predict(client, payload, stop, predict_latencies))
+                   for _ in range(args.clients)]
+        await asyncio.sleep(1.0)  # let the predict queue fill up
+        loaded = await probe_health(client, args.duration, args.interval)
+        stop.set()
+        await asyncio.gather(*workers)
+
+    summarize("/health (idle)", idle)
+    summarize("/health (saturated)", loaded)
+    summarize("/predict (saturated)", predict_latencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=16,
+                        help="Concurrent /predict uploaders")
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="Seconds to probe /health in each phase")
+    parser.add_argument("--interval", type=float, default=0.05)
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    asyncio.run(main(parser.parse_args()))
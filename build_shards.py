@@ -0,0 +1,37 @@
+# build_shards.py
+"""
+Decode the dataset once into memory-mapped training shards.
+
+Usage:
+    python build_shards.py [--dataset dataset] [--output outputs/shards] [--size 224]
+
+Train from them with: python main.py --shards outputs/shards
+"""
+import argparse
+import time
+
+from data.shards import SHARD_DIR, build_shards
+from utilss.preprocess import INPUT_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build uint8 training shards")
+    parser.add_argument("--dataset", default="dataset")
+    parser.add_argument("--output", default=SHARD_DIR)
+    parser.add_argument("--size", type=int, default=INPUT_SIZE, help="Side of the stored square images")
+    parser.add_argument("--shard-size", type=int, default=1024, help="Images per shard file")
+    parser.add_argument("--workers", type=int, default=None, help="Decode processes (default: all cores)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = build_shards(args.dataset, args.output, size=args.size,
+                         shard_size=args.shard_size, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    total = len(index["paths"])
+    size_mb = total * args.size * args.size * 3 / 1e6
+    print(f"✅ {total} images in {len(index['shards'])} shard(s) ({size_mb:.0f} MB) "
+          f"written to {args.output} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# cache_features.py
+"""
+Precompute the frozen stem's layer3 activations for fast layer4 + fc training.
+
+Usage:
+    python cache_features.py [--views 4] [--checkpoint outputs/best_model.pth]
+
+Train from them with: python main.py --feature-cache outputs/features
+"""
+import argparse
+import time
+
+import torch
+
+from data.dataloader import AnimalDataset, train_transform
+from data.feature_cache import FEATURE_DIR, build_feature_cache
+from model import AnimalCNN
+from utilss.preprocess import Preprocessor, load_image
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache layer3 activations")
+    parser.add_argument("--dataset", default="dataset")
+    parser.add_argument("--output", default=FEATURE_DIR)
+    parser.add_argument("--views", type=int, default=1,
+                        help="Views per image: 1 clean + (views - 1) augmented")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Take the stem from this checkpoint instead of the ImageNet weights "
+                             "(main.py --feature-cache then starts from the same checkpoint)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    dataset = AnimalDataset(args.dataset, transform=Preprocessor(), loader=load_image)
+    augmented = AnimalDataset(args.dataset, transform=train_transform()) if args.views > 1 else None
+
+    model = AnimalCNN(num_classes=len(dataset.class_map), pretrained=not args.checkpoint).to(device)
+    if args.checkpoint:
+        model.load_state_dict(torch.load(args.checkpoint, map_location=device))
+
+    start = time.perf_counter()
+    index = build_feature_cache(model, dataset, args.output, augmented_dataset=augmented,
+                                views=args.views, batch_size=args.batch_size, device=device,
+                                checkpoint=args.checkpoint)
+    elapsed = time.perf_counter() - start
+    per_view_mb = len(index["paths"]) * 2 * int(torch.tensor(index["shape"]).prod()) / 1e6
+    print(f"✅ Cached {len(index['paths'])} images x {args.views} view(s) "
+          f"({per_view_mb * args.views:.0f} MB) to {args.output} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
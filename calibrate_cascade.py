@@ -0,0 +1,89 @@
+# calibrate_cascade.py
+"""
+Calibrate per-class confidence thresholds for cascade inference.
+
+Thresholds are fitted on the validation split so that first-stage answers
+meet --target-accuracy per class, then the cascade is simulated on the test
+split against the full model.
+
+Usage:
+    python calibrate_cascade.py [--target-accuracy 0.95]
+
+Serve it with ANIMAL_CASCADE=1 uvicorn main_api:app
+"""
+import argparse
+
+import torch
+from torch.utils.data import Subset, random_split
+
+from data.dataloader import AnimalDataset
+from data.loaders import make_loader, tune_loader
+from evaluate import predict_with_confidence
+from model import SmallAnimalCNN, load_inference_model
+from utilss.cascade import (NEVER, SMALL_MODEL_PATH, THRESHOLDS_PATH, calibrate_thresholds,
+                            save_thresholds, simulate_cascade)
+from utilss.model_registry import read_version
+from utilss.preprocess import Preprocessor, load_image
+from utilss.quantization import measure_latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate cascade thresholds")
+    parser.add_argument("--dataset", default="dataset")
+    parser.add_argument("--small", default=SMALL_MODEL_PATH)
+    parser.add_argument("--full", default="outputs/best_model.pth")
+    parser.add_argument("--output", default=THRESHOLDS_PATH)
+    parser.add_argument("--target-accuracy", type=float, default=0.95)
+    parser.add_argument("--min-samples", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the split (matches main.py)")
+    args = parser.parse_args()
+
+    dataset = AnimalDataset(args.dataset, transform=Preprocessor(), loader=load_image)
+    class_names = list(dataset.class_map.keys())
+    train_size = int(0.7 * len(dataset))
+    val_size = int(0.15 * len(dataset))
+    _, val_set, test_set = random_split(
+        dataset, [train_size, val_size, len(dataset) - train_size - val_size],
+        generator=torch.Generator().manual_seed(args.seed))
+    config = tune_loader(val_set, batch_sizes=(64, 128, 256))
+    val_loader = make_loader(Subset(dataset, val_set.indices), config=config, name="val")
+    test_loader = make_loader(Subset(dataset, test_set.indices), config=config, name="test")
+
+    small = load_inference_model(args.small, len(class_names), model_cls=SmallAnimalCNN)
+    full = load_inference_model(args.full, len(class_names))
+
+    # 🎚️ Fit thresholds on validation
+    y_val, small_val, conf_val = predict_with_confidence(small, val_loader)
+    thresholds = calibrate_thresholds(y_val, small_val, conf_val, len(class_names),
+                                      target_accuracy=args.target_accuracy,
+                                      min_samples=args.min_samples)
+
+    # 🧪 Simulate on test
+    y_test, small_test, conf_test = predict_with_confidence(small, test_loader)
+    _, full_test, _ = predict_with_confidence(full, test_loader)
+    report = simulate_cascade(y_test, small_test, conf_test, full_test, thresholds)
+    report = {key: round(value, 4) for key, value in report.items()}
+
+    # ⏱️ Per-tier latency at batch 1
+    small.eval()
+    full.eval()
+    latency = {"small_ms": round(measure_latency(small), 2), "full_ms": round(measure_latency(full), 2)}
+
+    save_thresholds(args.output, thresholds, class_names, target_accuracy=args.target_accuracy,
+                    small_model_version=read_version(args.small)["version"],
+                    full_model_version=read_version(args.full)["version"], **report, **latency)
+
+    print("\n🎚️ Per-class thresholds:")
+    for name, threshold in zip(class_names, thresholds):
+        print(f"  {name:<24} {'always escalate' if threshold >= NEVER else f'{threshold:.4f}'}")
+    print(f"\n📊 Test split: cascade acc {report['cascade_accuracy']:.4f} | "
+          f"small {report['small_accuracy']:.4f} | full {report['full_accuracy']:.4f} | "
+          f"escalation {report['escalation_rate']:.1%}")
+    expected_ms = latency["small_ms"] + report["escalation_rate"] * latency["full_ms"]
+    print(f"⏱️ Batch-1 latency: small {latency['small_ms']} ms | full {latency['full_ms']} ms | "
+          f"expected cascade {expected_ms:.2f} ms")
+    print(f"💾 Saved thresholds to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,55 @@
 # dataloader.py
 import os
 from torch.utils.data import Dataset
+from torchvision import transforms
 from PIL import Image, UnidentifiedImageError
 
+from data.manifest import build_manifest, manifest_fingerprint
+
+
+def pil_loader(img_path):
+    return Image.open(img_path).convert("RGB")
+
+
+def train_augmentation():
+    """Random flip, rotation and color jitter (PIL images or uint8 tensors)"""
+    return transforms.Compose([
+        transforms.RandomHorizontalFlip(),
+        transforms.RandomRotation(15),
+        transforms.ColorJitter(brightness=0.2, contrast=0.2, saturation=0.2),
+    ])
+
+
+def train_transform():
+    """Training augmentation: resize, flip, rotation, color jitter and normalization"""
+    return transforms.Compose([
+        transforms.Resize((224, 224)),
+        train_augmentation(),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=[0.485, 0.456, 0.406],
+                             std=[0.229, 0.224, 0.225])
+    ])
+
 
 class AnimalDataset(Dataset):
-    def __init__(self, root_dir, transform=None):
+    def __init__(self, root_dir, transform=None, loader=pil_loader, manifest_path=None):
         self.root_dir = root_dir
         self.transform = transform
+        self.loader = loader
         self.samples = []
+        self.hashes = []  # content sha256 of each sample, from the manifest
         self.class_map = {
             cls_name: idx for idx, cls_name in enumerate(sorted(os.listdir(root_dir)))
         }
 
-        for cls_name in self.class_map:
-            folder = os.path.join(root_dir, cls_name)
-            print(f"[Info] Scanning folder: {folder}")
-            for file in os.listdir(folder):
-                if file.lower().endswith(('png', 'jpg', 'jpeg')):
-                    img_path = os.path.join(folder, file)
-                    try:
-                        # Try to fully decode the image to ensure it's valid
-                        with Image.open(img_path) as img:
-                            img.convert("RGB")
-                        self.samples.append(
-                            (img_path, self.class_map[cls_name]))
-                    except (UnidentifiedImageError, OSError, SyntaxError):
-                        print(
-                            f"[Warning] Skipping corrupted image: {img_path}")
+        # 📒 Sample list comes from the manifest; only new or changed files are decoded
+        manifest = build_manifest(root_dir, manifest_path)
+        self.fingerprint = manifest_fingerprint(manifest)
+        for rel_path, entry in manifest["entries"].items():
+            if entry["valid"]:
+                self.samples.append(
+                    (os.path.join(root_dir, rel_path), self.class_map[entry["label"]]))
+                self.hashes.append(entry["sha256"])
 
     def __len__(self):
         return len(self.samples)
@@ -35,7 +57,7 @@ class AnimalDataset(Dataset):
     def __getitem__(self, idx):
         img_path, label = self.samples[idx]
         try:
-            img = Image.open(img_path).convert("RGB")
+            img = self.loader(img_path)
         except (UnidentifiedImageError, OSError, SyntaxError):
             print(f"[Warning] Failed to load during __getitem__: {img_path}")
             img = Image.new("RGB", (224, 224), (0, 0, 0))  # black placeholder
@@ -0,0 +1,175 @@
+# feature_cache.py
+"""
+Cached layer3 activations for training only layer4 + fc.
+
+AnimalCNN freezes conv1 through layer3, so their output for a given input
+never changes. build_feature_cache() runs that stem once per image (and
+per optional augmented view) and stores the activations as float16
+memory-mapped arrays; FeatureDataset serves them to FeatureHead, which runs
+just the trainable part of the model.
+"""
+import hashlib
+import json
+import os
+import random
+import shutil
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import Dataset
+
+from data.loaders import make_loader
+
+FEATURE_DIR = "outputs/features"
+FEATURE_VERSION = 1
+INDEX_FILE = "index.json"
+LABELS_FILE = "labels.npy"
+STEM_PREFIXES = ("conv1.", "bn1.", "layer1.", "layer2.", "layer3.")
+
+
+def _view_file(view):
+    return f"features-{view}.npy"
+
+
+def stem_fingerprint(model):
+    """Hash of the stem's weights and BatchNorm statistics the cache was computed with"""
+    digest = hashlib.sha256()
+    for name, tensor in model.base_model.state_dict().items():
+        if name.startswith(STEM_PREFIXES):
+            digest.update(name.encode())
+            digest.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+def build_feature_cache(model, dataset, out_dir=FEATURE_DIR, augmented_dataset=None, views=1,
+                        batch_size=64, device=None, checkpoint=None):
+    """
+    Run the frozen stem over the dataset and store its activations.
+
+    Args:
+        model: AnimalCNN whose stem produces the activations
+        dataset: Deterministic (non-augmented) dataset, stored as view 0
+        out_dir: Output directory (replaced once the new cache is complete)
+        augmented_dataset: Same samples in the same order with random
+            augmentation; each extra view is one pass over it
+        views: Total views per image (1 + augmented passes)
+        batch_size: Stem batch size
+        device: Device to run the stem on (default: the model's)
+        checkpoint: Checkpoint the stem weights came from (None: ImageNet);
+            recorded so training can start from the same weights
+
+    Returns:
+        The cache index
+    """
+    if views > 1 and augmented_dataset is None:
+        raise ValueError("augmented_dataset is required for more than one view")
+    device = device or next(model.parameters()).device
+    model.eval()
+
+    tmp_dir = f"{out_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    labels, shape = [], None
+    for view in range(views):
+        source = dataset if view == 0 else augmented_dataset
+        loader = make_loader(source, batch_size=batch_size, name=f"features view {view}")
+        array, offset = None, 0
+        with torch.no_grad():
+            for images, batch_labels in loader:
+                features = model.stem(images.to(device)).half().cpu().numpy()
+                if array is None:
+                    shape = features.shape[1:]
+                    array = np.lib.format.open_memmap(os.path.join(tmp_dir, _view_file(view)), mode="w+",
+                                                      dtype=np.float16, shape=(len(source),) + shape)
+                array[offset:offset + len(features)] = features
+                offset += len(features)
+                if view == 0:
+                    labels.extend(batch_labels.tolist())
+        array.flush()
+        del array
+        print(f"[Info] Cached view {view + 1}/{views} ({offset} images)")
+
+    np.save(os.path.join(tmp_dir, LABELS_FILE), np.array(labels, dtype=np.int64))
+    index = {
+        "version": FEATURE_VERSION,
+        "views": views,
+        "shape": list(shape),
+        "dtype": "float16",
+        "classes": list(dataset.class_map.keys()),
+        "data_fingerprint": getattr(dataset, "fingerprint", None),
+        "paths": [img_path for img_path, _ in dataset.samples],
+        "stem_fingerprint": stem_fingerprint(model),
+        "checkpoint": checkpoint,
+    }
+    with open(os.path.join(tmp_dir, INDEX_FILE), "w", encoding="utf-8") as f:
+        json.dump(index, f)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return index
+
+
+class FeatureDataset(Dataset):
+    """
+    Cached layer3 activations with their labels.
+
+    Train mode picks one of the stored views at random per sample (the
+    cached equivalent of on-the-fly augmentation); eval mode always returns
+    the non-augmented view 0.
+    """
+
+    def __init__(self, cache_dir=FEATURE_DIR, train=True):
+        with open(os.path.join(cache_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") != FEATURE_VERSION:
+            raise ValueError(f"Unsupported feature cache version in {cache_dir}; rebuild with cache_features.py")
+
+        self.cache_dir = cache_dir
+        self.views = index["views"]
+        self.train = train
+        self.stem_fingerprint = index["stem_fingerprint"]
+        # Checkpoint the stem came from (None: ImageNet weights)
+        self.checkpoint = index.get("checkpoint")
+        self.class_map = {cls_name: idx for idx, cls_name in enumerate(index["classes"])}
+        self.fingerprint = index.get("data_fingerprint")
+        labels = np.load(os.path.join(cache_dir, LABELS_FILE)).tolist()
+        self.samples = list(zip(index["paths"], labels))
+        self._arrays = None
+
+    def __getstate__(self):
+        # Memmaps are reopened in each DataLoader worker instead of pickled
+        state = self.__dict__.copy()
+        state["_arrays"] = None
+        return state
+
+    def _views(self):
+        if self._arrays is None:
+            self._arrays = [np.load(os.path.join(self.cache_dir, _view_file(view)), mmap_mode="r")
+                            for view in range(self.views)]
+        return self._arrays
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, idx):
+        view = random.randrange(self.views) if self.train else 0
+        features = torch.from_numpy(np.asarray(self._views()[view][idx], dtype=np.float32))
+        return features, self.samples[idx][1]
+
+
+class FeatureHead(nn.Module):
+    """
+    Runs an AnimalCNN's trainable part (layer4 + fc) on cached activations.
+
+    The wrapped model is kept whole, so after training ``model`` is a
+    regular AnimalCNN whose state_dict can be saved and served as usual.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, features):
+        return self.model.head(features)
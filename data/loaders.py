@@ -0,0 +1,198 @@
+# loaders.py
+"""
+Auto-tuned DataLoader factory.
+
+tune_loader() runs a short throughput probe over a sample of the dataset
+and picks worker count, prefetch depth and batch size for the host.
+make_loader() builds the DataLoader from that config and wraps it in a
+TimedLoader, which reports how much of each epoch was spent waiting for
+data versus running the consumer's compute.
+"""
+import os
+import time
+
+import torch
+from torch.utils.data import DataLoader, Subset
+
+
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS/Windows
+        return os.cpu_count() or 1
+
+
+def _default_worker_candidates():
+    # Processes launched together by torchrun share the machine's cores
+    cpus = max(1, available_cpus() // int(os.environ.get("LOCAL_WORLD_SIZE", "1")))
+    return sorted({0, min(2, cpus), max(1, cpus // 2), cpus})
+
+
+def _build(dataset, batch_size, num_workers, prefetch_factor, shuffle=False, persistent=False,
+           sampler=None):
+    kwargs = {}
+    if num_workers > 0:
+        kwargs = {"prefetch_factor": prefetch_factor, "persistent_workers": persistent}
+    return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle, sampler=sampler,
+                      num_workers=num_workers, pin_memory=torch.cuda.is_available(), **kwargs)
+
+
+def _probe(dataset, batch_size, num_workers, prefetch_factor, probe_batches, probe_seconds):
+    """Images/sec over up to ``probe_batches`` batches, not counting worker startup"""
+    iterator = iter(_build(dataset, batch_size, num_workers, prefetch_factor))
+    next(iterator, None)
+    seen, start = 0, time.perf_counter()
+    for _ in range(probe_batches):
+        batch = next(iterator, None)
+        if batch is None:
+            break
+        seen += len(batch[1])
+        if time.perf_counter() - start > probe_seconds:
+            break
+    del iterator
+    elapsed = time.perf_counter() - start
+    return seen / elapsed if seen else 0.0
+
+
+def tune_loader(dataset, batch_sizes=(64,), worker_candidates=None, prefetch_candidates=(2, 4),
+                probe_batches=4, probe_seconds=3.0, verbose=True):
+    """
+    Pick DataLoader settings by measuring throughput on this host.
+
+    Worker count is probed first (at the largest batch size), then prefetch
+    depth for the best worker count, then batch size. Datasets too small to
+    probe meaningfully get a single-process config.
+
+    Args:
+        dataset: Dataset to load
+        batch_sizes: Candidate batch sizes (pass one value to keep it fixed)
+        worker_candidates: Worker counts to try (default: 0, 2, cores/2, cores)
+        prefetch_candidates: Batches prefetched per worker to try
+        probe_batches: Batches timed per candidate
+        probe_seconds: Time cap per candidate
+
+    Returns:
+        Dictionary with batch_size, num_workers, prefetch_factor and images_per_sec
+    """
+    batch_sizes = sorted(set(batch_sizes))
+    largest = batch_sizes[-1]
+    sample_size = largest * (probe_batches + 1)
+    if len(dataset) < 2 * sample_size:
+        return {"batch_size": batch_sizes[0] if len(dataset) < largest else largest,
+                "num_workers": 0, "prefetch_factor": None, "images_per_sec": None}
+
+    order = torch.randperm(len(dataset))[:sample_size].tolist()
+    sample = Subset(dataset, order)
+
+    def probe(batch_size, num_workers, prefetch_factor):
+        rate = _probe(sample, batch_size, num_workers, prefetch_factor, probe_batches, probe_seconds)
+        if verbose:
+            print(f"  🔎 batch {batch_size:>4} | workers {num_workers:>2} | "
+                  f"prefetch {prefetch_factor or '-':>2} | {rate:8.1f} img/s")
+        return rate
+
+    if verbose:
+        print("⚙️ Probing data loader throughput...")
+    results = {w: probe(largest, w, prefetch_candidates[0])
+               for w in (worker_candidates or _default_worker_candidates())}
+    num_workers = max(results, key=results.get)
+    best_rate = results[num_workers]
+
+    prefetch_factor = prefetch_candidates[0]
+    if num_workers > 0:
+        for candidate in prefetch_candidates[1:]:
+            rate = probe(largest, num_workers, candidate)
+            if rate > best_rate:
+                prefetch_factor, best_rate = candidate, rate
+
+    batch_size = largest
+    for candidate in batch_sizes[:-1]:
+        rate = probe(candidate, num_workers, prefetch_factor)
+        if rate > best_rate:
+            batch_size, best_rate = candidate, rate
+
+    config = {"batch_size": batch_size, "num_workers": num_workers,
+              "prefetch_factor": prefetch_factor if num_workers > 0 else None,
+              "images_per_sec": round(best_rate, 1)}
+    if verbose:
+        print(f"✅ Loader config: {config}")
+    return config
+
+
+class TimedLoader:
+    """
+    DataLoader wrapper that splits each epoch into data-wait and compute time.
+
+    Time spent inside the DataLoader's ``next()`` counts as data wait; time
+    between handing out a batch and being asked for the next one counts as
+    compute. The split is printed when an epoch is exhausted and kept in
+    ``last_epoch``. Other attributes are forwarded to the DataLoader.
+    """
+
+    def __init__(self, loader, name="loader", report=True):
+        self.loader = loader
+        self.name = name
+        self.report = report
+        self.epochs = 0
+        self.last_epoch = None
+
+    def __getattr__(self, attr):
+        return getattr(self.loader, attr)
+
+    def __len__(self):
+        return len(self.loader)
+
+    def __iter__(self):
+        wait = compute = 0.0
+        images = 0
+        epoch_start = time.perf_counter()
+        iterator = iter(self.loader)
+        while True:
+            fetch_start = time.perf_counter()
+            try:
+                batch = next(iterator)
+            except StopIteration:
+                break
+            handed_out = time.perf_counter()
+            wait += handed_out - fetch_start
+            images += len(batch[1]) if isinstance(batch, (tuple, list)) else len(batch)
+            yield batch
+            compute += time.perf_counter() - handed_out
+
+        total = time.perf_counter() - epoch_start
+        self.epochs += 1
+        self.last_epoch = {
+            "epoch": self.epochs,
+            "images": images,
+            "data_wait_s": round(wait, 3),
+            "compute_s": round(compute, 3),
+            "data_wait_pct": round(100.0 * wait / total, 1) if total else 0.0,
+            "images_per_sec": round(images / total, 1) if total else 0.0,
+        }
+        if self.report:
+            print(f"⏱️ [{self.name}] data wait {wait:.1f}s ({self.last_epoch['data_wait_pct']}%) | "
+                  f"compute {compute:.1f}s | {self.last_epoch['images_per_sec']} img/s")
+
+
+def make_loader(dataset, batch_size=64, shuffle=False, config=None, tune=True,
+                name="loader", report=True, sampler=None):
+    """
+    Build a TimedLoader with tuned workers, prefetching and pinned memory.
+
+    Args:
+        dataset: Dataset to load
+        batch_size: Batch size when not tuned or overridden by ``config``
+        shuffle: Shuffle every epoch
+        config: Result of tune_loader() to reuse (skips probing)
+        tune: Probe this dataset when no config is given
+        name: Label used in the per-epoch report
+        report: Print the data-wait/compute split after each epoch
+        sampler: Custom sampler (e.g. DistributedSampler); replaces ``shuffle``
+    """
+    if config is None:
+        config = tune_loader(dataset, batch_sizes=(batch_size,), verbose=report) if tune else \
+            {"batch_size": batch_size, "num_workers": 0, "prefetch_factor": None}
+    loader = _build(dataset, config["batch_size"], config["num_workers"], config["prefetch_factor"],
+                    shuffle=shuffle and sampler is None, persistent=config["num_workers"] > 0,
+                    sampler=sampler)
+    return TimedLoader(loader, name=name, report=report)
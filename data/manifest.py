@@ -0,0 +1,118 @@
+# manifest.py
+"""
+Persistent dataset manifest with incremental rescans.
+
+The manifest records, for every image under the dataset root, its size,
+mtime, content hash, decoded dimensions, label and validity. On startup only
+files whose size or mtime changed are hashed and decoded again, so building
+the sample list for AnimalDataset no longer decodes the whole dataset.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, UnidentifiedImageError
+
+MANIFEST_VERSION = 1
+IMAGE_EXTENSIONS = ('png', 'jpg', 'jpeg')
+
+
+def manifest_path_for(root_dir):
+    """Manifest file stored next to the dataset folder, e.g. dataset_manifest.json"""
+    root_dir = os.path.abspath(root_dir)
+    return os.path.join(os.path.dirname(root_dir), f"{os.path.basename(root_dir)}_manifest.json")
+
+
+def inspect_image(img_path):
+    """Hash and fully decode one image, returning its manifest fields"""
+    with open(img_path, "rb") as f:
+        sha256 = hashlib.sha256(f.read()).hexdigest()
+    try:
+        # Fully decode the image to ensure it's valid
+        with Image.open(img_path) as img:
+            width, height = img.size
+            img.convert("RGB")
+        return {"sha256": sha256, "width": width, "height": height, "valid": True}
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        return {"sha256": sha256, "width": None, "height": None, "valid": False}
+
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"version": MANIFEST_VERSION, "entries": {}}
+
+
+def manifest_fingerprint(manifest):
+    """sha256 over the (path, label, content hash) of every valid image: the training-data fingerprint"""
+    digest = hashlib.sha256()
+    for rel_path, entry in sorted(manifest["entries"].items()):
+        if entry["valid"]:
+            digest.update(f"{rel_path}\t{entry['label']}\t{entry['sha256']}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def save_manifest(manifest, manifest_path):
+    directory = os.path.dirname(manifest_path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=".manifest-", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+
+def build_manifest(root_dir, manifest_path=None, workers=None):
+    """
+    Bring the manifest for ``root_dir`` up to date and return it.
+
+    Args:
+        root_dir: Dataset root with one sub-folder per class
+        manifest_path: Where the manifest lives (default: next to root_dir)
+        workers: Threads used to inspect new or changed files
+
+    Returns:
+        Manifest dict with "classes" and "entries" keyed by path relative to root_dir
+    """
+    manifest_path = manifest_path or manifest_path_for(root_dir)
+    manifest = load_manifest(manifest_path)
+    previous = manifest["entries"]
+
+    classes = sorted(os.listdir(root_dir))
+    entries, stale = {}, []
+    for cls_name in classes:
+        folder = os.path.join(root_dir, cls_name)
+        if not os.path.isdir(folder):
+            continue
+        for file in sorted(os.listdir(folder)):
+            if not file.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            rel_path = f"{cls_name}/{file}"
+            stat = os.stat(os.path.join(folder, file))
+            entry = previous.get(rel_path)
+            if entry is None or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+                entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+                stale.append((rel_path, entry))
+            entry["label"] = cls_name
+            entries[rel_path] = entry
+
+    # 🔍 Only new or changed files are hashed and decoded
+    if stale:
+        print(f"[Info] Validating {len(stale)} new or changed image(s)...")
+        with ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1)) as pool:
+            results = pool.map(inspect_image, (os.path.join(root_dir, rel) for rel, _ in stale))
+            for (rel_path, entry), fields in zip(stale, results):
+                entry.update(fields)
+                if not entry["valid"]:
+                    print(f"[Warning] Skipping corrupted image: {os.path.join(root_dir, rel_path)}")
+
+    changed = bool(stale) or len(entries) != len(previous) or manifest.get("classes") != classes
+    manifest = {"version": MANIFEST_VERSION, "classes": classes, "entries": entries}
+    if changed:
+        save_manifest(manifest, manifest_path)
+    return manifest
@@ -0,0 +1,160 @@
+# shards.py
+"""
+Pre-decoded, memory-mapped training shards.
+
+build_shards() decodes the dataset once into fixed-size uint8 arrays
+(resized to ``size`` x ``size`` without cropping, like main.py's transform
+and the serving Preprocessor) stored as ``.npy`` shard files plus a label
+index. ShardDataset maps those files read-only and only applies
+main.py's random flip, rotation and color jitter per sample, so training
+epochs never touch a JPEG decoder.
+"""
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import torch
+from PIL import Image
+from torch.utils.data import Dataset
+from torchvision.transforms import functional as TF
+
+from data.dataloader import AnimalDataset, train_augmentation
+from utilss.preprocess import IMAGENET_MEAN, IMAGENET_STD, INPUT_SIZE, Preprocessor, load_image
+
+SHARD_DIR = "outputs/shards"
+SHARD_VERSION = 2  # 2: squashed to size instead of short-side resize + center crop
+INDEX_FILE = "index.json"
+LABELS_FILE = "labels.npy"
+
+
+def _shard_file(shard):
+    return f"shard-{shard:05d}.npy"
+
+
+def decode_square(img_path, size=INPUT_SIZE):
+    """Decode one image to a ``(size, size, 3)`` uint8 array (squashed, no crop)"""
+    try:
+        img = load_image(img_path, (size, size))
+    except (OSError, SyntaxError, ValueError):
+        print(f"[Warning] Failed to decode while sharding: {img_path}")
+        return np.zeros((size, size, 3), dtype=np.uint8)
+    if img.size != (size, size):
+        img = img.resize((size, size), Image.BILINEAR)
+    return np.asarray(img, dtype=np.uint8)
+
+
+def _decode_square_star(args):
+    return decode_square(*args)
+
+
+def build_shards(root_dir="dataset", out_dir=SHARD_DIR, size=INPUT_SIZE, shard_size=1024, workers=None):
+    """
+    Decode the dataset once into memory-mapped uint8 shards.
+
+    Args:
+        root_dir: Dataset root with one sub-folder per class
+        out_dir: Output directory (replaced once the new shards are complete)
+        size: Side of the stored square images
+        shard_size: Images per shard file
+        workers: Decode processes (default: all cores)
+
+    Returns:
+        The shard index
+    """
+    dataset = AnimalDataset(root_dir)
+    samples = dataset.samples
+    tmp_dir = f"{out_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    np.save(os.path.join(tmp_dir, LABELS_FILE), np.array([label for _, label in samples], dtype=np.int64))
+
+    shards = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for shard, start in enumerate(range(0, len(samples), shard_size)):
+            chunk = samples[start:start + shard_size]
+            array = np.lib.format.open_memmap(os.path.join(tmp_dir, _shard_file(shard)), mode="w+",
+                                              dtype=np.uint8, shape=(len(chunk), size, size, 3))
+            jobs = [(img_path, size) for img_path, _ in chunk]
+            for i, pixels in enumerate(pool.map(_decode_square_star, jobs, chunksize=16)):
+                array[i] = pixels
+            array.flush()
+            del array
+            shards.append({"file": _shard_file(shard), "count": len(chunk)})
+            print(f"[Info] Wrote shard {shard} ({start + len(chunk)}/{len(samples)} images)")
+
+    index = {
+        "version": SHARD_VERSION,
+        "size": size,
+        "shard_size": shard_size,
+        "classes": list(dataset.class_map.keys()),
+        "data_fingerprint": getattr(dataset, "fingerprint", None),
+        "shards": shards,
+        "paths": [os.path.relpath(img_path, root_dir) for img_path, _ in samples],
+    }
+    with open(os.path.join(tmp_dir, INDEX_FILE), "w", encoding="utf-8") as f:
+        json.dump(index, f)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return index
+
+
+class ShardDataset(Dataset):
+    """
+    Training dataset over shards written by build_shards().
+
+    Shards are opened with ``mmap_mode="r"`` in each process on first use,
+    so images are paged in from the OS cache instead of decoded. Train mode
+    applies train_augmentation() (main.py's flip, rotation and color jitter)
+    to the stored image; eval mode only normalizes it, as serving does.
+    Shards stored at another size are resized to ``size`` per sample.
+    """
+
+    def __init__(self, shard_dir=SHARD_DIR, size=INPUT_SIZE, train=True,
+                 mean=IMAGENET_MEAN, std=IMAGENET_STD):
+        with open(os.path.join(shard_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") != SHARD_VERSION:
+            raise ValueError(f"Unsupported shard version in {shard_dir}; rebuild with build_shards.py")
+
+        self.shard_dir = shard_dir
+        self.shard_files = [shard["file"] for shard in index["shards"]]
+        self.shard_size = index["shard_size"]
+        self.size = size
+        self.train = train
+        self.augment = train_augmentation() if train else None
+        self.class_map = {cls_name: idx for idx, cls_name in enumerate(index["classes"])}
+        self.fingerprint = index.get("data_fingerprint")
+        labels = np.load(os.path.join(shard_dir, LABELS_FILE)).tolist()
+        self.samples = list(zip(index["paths"], labels))
+        self.normalizer = Preprocessor(size=size, mean=mean, std=std)
+        self._shards = None
+
+    def __getstate__(self):
+        # Memmaps are reopened in each DataLoader worker instead of pickled
+        state = self.__dict__.copy()
+        state["_shards"] = None
+        return state
+
+    def _arrays(self):
+        if self._shards is None:
+            self._shards = [np.load(os.path.join(self.shard_dir, file), mmap_mode="r")
+                            for file in self.shard_files]
+        return self._shards
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, idx):
+        shard, offset = divmod(idx, self.shard_size)
+        img = self._arrays()[shard][offset]  # (size, size, 3) view into the mapped file
+        chw = torch.from_numpy(np.array(img)).permute(2, 0, 1)
+        if chw.shape[1] != self.size:
+            chw = TF.resize(chw, [self.size, self.size], antialias=True)
+        if self.augment is not None:
+            chw = self.augment(chw)
+
+        return self.normalizer.normalize(chw), self.samples[idx][1]
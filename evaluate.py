@@ -5,12 +5,35 @@ import seaborn as sns
 import torch
 
 
-def evaluate(model, loader, classes):
-    device = next(model.parameters()).device
+def model_device(model):
+    """Device of the model's parameters (CPU for parameter-less scripted/quantized models)"""
+    param = next(model.parameters(), None)
+    return param.device if param is not None else torch.device("cpu")
+
+
+def per_class_accuracy(y_true, y_pred, num_classes):
+    """Accuracy (recall) per class index; None for classes absent from y_true"""
+    accuracies = []
+    for class_idx in range(num_classes):
+        mask = y_true == class_idx
+        accuracies.append(float((y_pred[mask] == class_idx).mean()) if mask.any() else None)
+    return accuracies
+
+
+def predict_with_confidence(model, loader):
+    """
+    Run the model over a loader.
+
+    Returns:
+        Tuple of (y_true, y_pred, confidence) numpy arrays, where confidence
+        is the softmax probability of the predicted class
+    """
+    device = model_device(model)
     model.eval()
 
     all_preds = []
     all_labels = []
+    all_confidences = []
 
     with torch.no_grad():
         for batch in loader:
@@ -19,14 +42,27 @@ def evaluate(model, loader, classes):
             labels = labels.to(device)
 
             outputs = model(images)
-            preds = torch.argmax(outputs, dim=1)
+            confidences, preds = torch.softmax(outputs.float(), dim=1).max(dim=1)
 
             all_preds.append(preds)
             all_labels.append(labels)
+            all_confidences.append(confidences)
 
     # 🧠 Combine all predictions and labels
     y_pred = torch.cat(all_preds).cpu().numpy()
     y_true = torch.cat(all_labels).cpu().numpy()
+    confidence = torch.cat(all_confidences).cpu().numpy()
+    return y_true, y_pred, confidence
+
+
+def evaluate(model, loader, classes, show_plot=True):
+    """
+    Print a classification report (and optionally plot the confusion matrix).
+
+    Returns:
+        Tuple of (y_true, y_pred) numpy arrays
+    """
+    y_true, y_pred, _ = predict_with_confidence(model, loader)
 
     # 🏷️ Restrict to classes actually used in test set
     used_labels = sorted(set(y_true) | set(y_pred))
@@ -38,6 +74,9 @@ def evaluate(model, loader, classes):
                                 labels=used_labels,
                                 target_names=used_class_names))
 
+    if not show_plot:
+        return y_true, y_pred
+
     # 🧩 Confusion Matrix
     cm = confusion_matrix(y_true, y_pred, labels=used_labels)
     plt.figure(figsize=(12, 10))
@@ -50,3 +89,5 @@ def evaluate(model, loader, classes):
     plt.ylabel("Actual")
     plt.tight_layout()
     plt.show()
+
+    return y_true, y_pred
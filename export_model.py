@@ -0,0 +1,95 @@
+# export_model.py
+"""
+Export outputs/best_model.pth as a frozen TorchScript module and an ONNX graph
+with a dynamic batch axis, then check both against eager logits. Checkpoints
+without a model bundle get one first.
+
+Usage:
+    python export_model.py [--num-classes N] [--opset 17]
+
+Serve an export with ANIMAL_INFERENCE_BACKEND=torchscript|onnxruntime
+"""
+import argparse
+import sys
+
+import torch
+
+from data.dataloader import AnimalDataset
+from model import load_inference_model
+from utilss.model_bundle import bundle_metadata, bundle_path, current_bundle, read_class_names, save_bundle
+from utilss.model_registry import read_version
+from utilss.inference_backend import (CHECKPOINT_PATH, ONNX_MODEL_PATH, TORCHSCRIPT_MODEL_PATH,
+                                      EagerBackend, OnnxRuntimeBackend, TorchScriptBackend,
+                                      check_parity)
+from utilss.preprocess import INPUT_SIZE
+
+
+def export_torchscript(model, path):
+    example = torch.randn(1, 3, INPUT_SIZE, INPUT_SIZE)
+    with torch.no_grad():
+        scripted = torch.jit.freeze(torch.jit.trace(model, example))
+    torch.jit.save(scripted, path)
+
+
+def export_onnx(model, path, opset):
+    example = torch.randn(1, 3, INPUT_SIZE, INPUT_SIZE)
+    torch.onnx.export(
+        model, example, path,
+        input_names=["input"], output_names=["logits"],
+        # Spatial axes are dynamic too, for adaptive-resolution serving
+        dynamic_axes={"input": {0: "batch", 2: "height", 3: "width"}, "logits": {0: "batch"}},
+        opset_version=opset, do_constant_folding=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export AnimalCNN to TorchScript and ONNX")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    parser.add_argument("--num-classes", type=int, default=None,
+                        help="Defaults to the classes in the checkpoint's bundle")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--atol", type=float, default=1e-3,
+                        help="Max allowed |logit difference| against eager")
+    parser.add_argument("--skip-onnx", action="store_true")
+    args = parser.parse_args()
+
+    # 📦 Checkpoints published before bundles existed get one, so servers read
+    # their classes from it instead of scanning dataset/
+    if current_bundle(args.checkpoint) is None:
+        dataset = AnimalDataset("dataset")
+        save_bundle(torch.load(args.checkpoint, map_location="cpu"), bundle_path(args.checkpoint),
+                    {**bundle_metadata(list(dataset.class_map), dataset.fingerprint),
+                     "version": read_version(args.checkpoint)["version"]})
+        print(f"💾 Saved {bundle_path(args.checkpoint)}")
+
+    num_classes = args.num_classes or len(read_class_names(args.checkpoint))
+    model = load_inference_model(args.checkpoint, num_classes)
+
+    print("📦 Exporting TorchScript...")
+    export_torchscript(model, TORCHSCRIPT_MODEL_PATH)
+    print(f"💾 Saved {TORCHSCRIPT_MODEL_PATH}")
+
+    if not args.skip_onnx:
+        print("📦 Exporting ONNX...")
+        export_onnx(model, ONNX_MODEL_PATH, args.opset)
+        print(f"💾 Saved {ONNX_MODEL_PATH}")
+
+    # ✅ Parity against eager logits (batch 1 and 4 exercise the dynamic axis)
+    reference = EagerBackend(num_classes, args.checkpoint)
+    exported = [TorchScriptBackend(TORCHSCRIPT_MODEL_PATH)]
+    if not args.skip_onnx:
+        exported.append(OnnxRuntimeBackend(ONNX_MODEL_PATH))
+
+    failed = False
+    for backend in exported:
+        try:
+            worst = check_parity(reference, backend, atol=args.atol)
+            print(f"✅ {backend.name} parity OK (max |Δlogit| {worst:.2e})")
+        except AssertionError as e:
+            print(f"❌ {e}")
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,90 +1,264 @@
+import argparse
+import copy
 import os
-import json
-import random
+import time
+import numpy as np
 import torch
 from model import AnimalCNN
 from data.dataloader import AnimalDataset
-from torchvision import transforms
-from torch.utils.data import DataLoader, Subset
+from data.loaders import make_loader
+from torch.utils.data import Subset
 from torch import nn, optim
-from utilss.logger import LOG_PATH
+from utilss.logger import get_correction_log
+from utilss.preprocess import Preprocessor, load_image
+from utilss.model_bundle import bundle_metadata
+from utilss.model_registry import publish_checkpoint
+from utilss.embedding_store import get_embedding_store
+from utilss.replay_buffer import get_replay_buffer
 
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-# 🔧 Transform (same as original training)
-transform = transforms.Compose([
-    transforms.Resize((224, 224)),
-    transforms.ToTensor(),
-    transforms.Normalize([0.485, 0.456, 0.406],
-                         [0.229, 0.224, 0.225])
-])
-
-# 🐾 Load full dataset
-dataset = AnimalDataset("dataset", transform=transform)
-class_names = list(dataset.class_map.keys())
-
-# 📥 Load recent corrections from the log
-if not os.path.exists(LOG_PATH):
-    print("⚠ No correction log found.")
-    exit()
-
-with open(LOG_PATH, "r") as f:
-    logs = json.load(f)
-
-if not logs:
-    print("⚠ Correction log is empty.")
-    exit()
-
-# 🧠 Take last 5 corrections
-corrected_paths = [entry["image"] for entry in logs[-5:]]
-
-# 🔍 Find dataset indices for corrected samples
-corrected_indices = []
-for idx, (img_path, _) in enumerate(dataset.samples):
-    if any(os.path.basename(img_path) in path for path in corrected_paths):
-        corrected_indices.append(idx)
-
-if not corrected_indices:
-    print("⚠ No corrected samples found in dataset.")
-    exit()
-
-# 🔁 Add 30 random replay samples (excluding corrected)
-all_indices = list(range(len(dataset)))
-replay_pool = [i for i in all_indices if i not in corrected_indices]
-replay_indices = random.sample(replay_pool, k=min(30, len(replay_pool)))
-
-# 📊 Combine
-final_indices = corrected_indices + replay_indices
-train_subset = Subset(dataset, final_indices)
-
-# 🧠 Load existing trained model
-model = AnimalCNN(num_classes=len(class_names)).to(device)
-model.load_state_dict(torch.load("outputs/best_model.pth"))
-model.train()
-
-# 🧮 Loss and Optimizer
-criterion = nn.CrossEntropyLoss()
-optimizer = optim.Adam(model.parameters(), lr=1e-4)
-
-# 🔁 Fine-tune for a few epochs
-loader = DataLoader(train_subset, batch_size=16, shuffle=True)
-for epoch in range(3):
-    total_loss, correct, total = 0, 0, 0
-    for imgs, labels in loader:
-        imgs, labels = imgs.to(device), labels.to(device)
+CHECKPOINT_PATH = "outputs/best_model.pth"
+
+
+def load_pending_corrections():
+    """Corrections in the log that no training run has consumed yet"""
+    corrections = get_correction_log().unconsumed()
+    if not corrections:
+        print("⚠ No unconsumed corrections in the log.")
+    return corrections
+
+
+def correction_path(image, actual, dataset_path="dataset"):
+    """Where a corrected image was saved in the dataset (dataset/<actual>/<file name>)"""
+    return os.path.join(dataset_path, actual, os.path.basename(image))
+
+
+def _rel_path(img_path, dataset_path):
+    return os.path.relpath(img_path, dataset_path).replace(os.sep, "/")
+
+
+def fine_tune(corrected_paths, dataset_path="dataset", replay_size=30, epochs=3,
+              checkpoint_path=CHECKPOINT_PATH, in_process=False):
+    """
+    Fine-tune the published model on corrected images plus a class-balanced
+    replay sample, then publish the result.
+
+    Args:
+        corrected_paths: Paths of the corrected images inside dataset_path
+        dataset_path: Dataset root the corrected images were saved into
+        replay_size: Number of non-corrected images mixed in, spread evenly over classes
+        epochs: Fine-tuning epochs
+        checkpoint_path: Checkpoint to start from and publish to
+        in_process: Running inside a server process: images are loaded in
+            this thread (no DataLoader worker processes, no throughput probes)
+
+    Returns:
+        Dictionary describing the run (published version, sample counts, final metrics)
+    """
+    # 🔧 Transform (same as original training): draft-mode JPEG decode +
+    # fused resize/normalize
+    transform = Preprocessor()
+
+    # 🐾 Load full dataset
+    dataset = AnimalDataset(dataset_path, transform=transform, loader=load_image)
+    class_names = list(dataset.class_map.keys())
+
+    # 🔍 Find dataset indices for corrected samples through an exact path map
+    index_of = {_rel_path(img_path, dataset_path): idx
+                for idx, (img_path, _) in enumerate(dataset.samples)}
+    corrected = {_rel_path(path, dataset_path) for path in corrected_paths} & index_of.keys()
+    corrected_indices = sorted(index_of[path] for path in corrected)
+
+    if not corrected_indices:
+        raise ValueError("No corrected samples found in dataset.")
+
+    # 🔁 Add class-balanced replay samples from the persistent reservoir (excluding corrected)
+    buffer = get_replay_buffer()
+    buffer.sync(dataset)
+    per_class = max(1, replay_size // len(class_names))
+    replay_indices = [index_of[path] for path, _ in buffer.sample(per_class, exclude=corrected)
+                      if path in index_of][:replay_size]
+
+    # 📊 Combine
+    final_indices = corrected_indices + replay_indices
+    train_subset = Subset(dataset, final_indices)
+
+    # 🧠 Load existing trained model
+    model = AnimalCNN(num_classes=len(class_names), pretrained=False).to(device)
+    model.load_state_dict(torch.load(checkpoint_path, map_location=device))
+    model.train()
+
+    # 🧮 Loss and Optimizer
+    criterion = nn.CrossEntropyLoss()
+    optimizer = optim.Adam(model.parameters(), lr=1e-4)
+
+    # 🔁 Fine-tune for a few epochs
+    loader = make_loader(train_subset, batch_size=16, shuffle=True, tune=not in_process,
+                         name="fine-tune")
+    for epoch in range(epochs):
+        total_loss, correct, total = 0, 0, 0
+        for imgs, labels in loader:
+            imgs, labels = imgs.to(device), labels.to(device)
+            optimizer.zero_grad()
+            outputs = model(imgs)
+            loss = criterion(outputs, labels)
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item() * imgs.size(0)
+            correct += (outputs.argmax(1) == labels).sum().item()
+            total += imgs.size(0)
+        print(
+            f"📘 Epoch {epoch+1} | Loss: {total_loss/total:.4f} | Accuracy: {correct/total:.4f}")
+
+    # 💾 Publish atomically so running servers hot-swap the new version
+    version = publish_checkpoint(model.state_dict(), checkpoint_path,
+                                 metadata={"source": "feedback_trainer"},
+                                 bundle=bundle_metadata(class_names, dataset.fingerprint))
+
+    print(f"✅ Model updated and saved to {checkpoint_path} (version {version})")
+    return {
+        "version": version,
+        "mode": "full",
+        "corrected_samples": len(corrected_indices),
+        "replay_samples": len(replay_indices),
+        "loss": round(total_loss / total, 4),
+        "accuracy": round(correct / total, 4),
+    }
+
+
+def _accuracy(head, embeddings, labels):
+    if len(labels) == 0:
+        return None
+    head.eval()
+    with torch.no_grad():
+        return (head(embeddings).argmax(1) == labels).float().mean().item()
+
+
+def fine_tune_head(corrected_paths, dataset_path="dataset", replay_per_class=8, epochs=30,
+                   lr=1e-3, holdout_fraction=0.1, max_accuracy_drop=0.01,
+                   checkpoint_path=CHECKPOINT_PATH, in_process=False):
+    """
+    Incremental update: fine-tune only the fc head on cached penultimate embeddings.
+
+    Only images new to the embedding store (normally just the corrections)
+    go through the backbone. The head is trained on the corrections plus up
+    to ``replay_per_class`` stored embeddings of every class, and is only
+    published if accuracy on a stable held-out split does not drop by more
+    than ``max_accuracy_drop``.
+
+    Args:
+        corrected_paths: Paths of the corrected images inside dataset_path
+        dataset_path: Dataset root
+        replay_per_class: Replay embeddings sampled per class
+        epochs: Full-batch passes over the head's training set
+        lr: Head learning rate
+        holdout_fraction: Share of the dataset used for the accuracy guard
+        max_accuracy_drop: Largest tolerated held-out accuracy drop
+        checkpoint_path: Checkpoint to start from and publish to
+        in_process: Running inside a server process: new images are embedded
+            in this thread (no DataLoader worker processes, no throughput probes)
+
+    Returns:
+        Dictionary describing the run; ``version`` is None if the guard rejected it
+    """
+    start = time.perf_counter()
+    dataset = AnimalDataset(dataset_path, transform=Preprocessor(), loader=load_image)
+    model = AnimalCNN(num_classes=len(dataset.class_map), pretrained=False)
+    model.load_state_dict(torch.load(checkpoint_path, map_location="cpu"))
+    model.eval()
+
+    # 🧊 Embed only what the store has not seen under this backbone
+    store = get_embedding_store()
+    embedded = store.sync(model, dataset, tune=not in_process)
+
+    corrected_rel = {_rel_path(path, dataset_path) for path in corrected_paths}
+    corrected = sorted({store.index_of(path) for path in corrected_rel} - {None})
+    if not corrected:
+        raise ValueError("No corrected samples found in dataset.")
+    is_corrected = np.zeros(len(store), dtype=bool)
+    is_corrected[corrected] = True
+    holdout = store.holdout_mask(holdout_fraction) & ~is_corrected
+
+    # 🔁 Balanced replay: the same number of buffered images from every class,
+    # looked up in the store (held-out rows stay out of training)
+    buffer = get_replay_buffer()
+    buffer.sync(dataset)
+    replay = []
+    for path, _ in buffer.sample(replay_per_class, exclude=corrected_rel):
+        idx = store.index_of(path)
+        if idx is not None and not holdout[idx]:
+            replay.append(idx)
+
+    train_idx = np.array(corrected + replay, dtype=np.int64)
+    features = torch.from_numpy(store.embeddings[train_idx])
+    labels = torch.from_numpy(store.labels[train_idx])
+    holdout_features = torch.from_numpy(store.embeddings[holdout])
+    holdout_labels = torch.from_numpy(store.labels[holdout])
+
+    # 🧠 Train a copy of the head; the backbone is never touched
+    head = copy.deepcopy(model.base_model.fc)
+    accuracy_before = _accuracy(model.base_model.fc, holdout_features, holdout_labels)
+    criterion = nn.CrossEntropyLoss()
+    optimizer = optim.Adam(head.parameters(), lr=lr)
+    for _ in range(epochs):
+        head.train()
         optimizer.zero_grad()
-        outputs = model(imgs)
+        outputs = head(features)
         loss = criterion(outputs, labels)
         loss.backward()
         optimizer.step()
-        total_loss += loss.item() * imgs.size(0)
-        correct += (outputs.argmax(1) == labels).sum().item()
-        total += imgs.size(0)
-    print(
-        f"📘 Epoch {epoch+1} | Loss: {total_loss/total:.4f} | Accuracy: {correct/total:.4f}")
+    train_accuracy = _accuracy(head, features, labels)
+    accuracy_after = _accuracy(head, holdout_features, holdout_labels)
+
+    result = {
+        "version": None,
+        "mode": "head",
+        "corrected_samples": len(corrected),
+        "replay_samples": len(replay),
+        "embedded_images": embedded,
+        "loss": round(loss.item(), 4),
+        "accuracy": round(train_accuracy, 4),
+        "holdout_accuracy_before": accuracy_before,
+        "holdout_accuracy_after": accuracy_after,
+    }
+
+    # 🛡️ Accuracy guard against the held-out split
+    if accuracy_before is not None and accuracy_after < accuracy_before - max_accuracy_drop:
+        print(f"⚠ Rejected head update: held-out accuracy {accuracy_before:.4f} -> {accuracy_after:.4f}")
+        result["seconds"] = round(time.perf_counter() - start, 2)
+        return result
+
+    model.base_model.fc.load_state_dict(head.state_dict())
+    result["version"] = publish_checkpoint(model.state_dict(), checkpoint_path,
+                                           metadata={"source": "feedback_trainer", "mode": "head"},
+                                           bundle=bundle_metadata(list(dataset.class_map),
+                                                                  dataset.fingerprint))
+    result["seconds"] = round(time.perf_counter() - start, 2)
+    print(f"✅ Head updated in {result['seconds']}s (version {result['version']}, "
+          f"held-out accuracy {accuracy_before} -> {accuracy_after})")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fine-tune the model on logged corrections")
+    parser.add_argument("--mode", choices=["head", "full"], default="head",
+                        help="head: fc-only update on cached embeddings; full: layer4 + fc on images")
+    args = parser.parse_args()
+
+    # 🧠 Take every correction not yet used for training
+    corrections = load_pending_corrections()
+    if not corrections:
+        exit()
 
-# 💾 Overwrite existing model
-save_path = "outputs/best_model.pth"
-torch.save(model.state_dict(), save_path)
+    paths = [correction_path(entry["image"], entry["actual"]) for entry in corrections]
+    try:
+        result = fine_tune_head(paths) if args.mode == "head" else fine_tune(paths)
+    except ValueError as e:
+        print(f"⚠ {e}")
+        exit()
+    if result["version"] is None:
+        exit()
 
-print(f"✅ Model updated and saved to {save_path}")
+    get_correction_log().mark_consumed([entry["id"] for entry in corrections],
+                                       consumed_by=result["version"])
@@ -1,44 +1,97 @@
+import argparse
 import torch
-from torch.utils.data import DataLoader, random_split
-from torchvision import transforms
-from data.dataloader import AnimalDataset
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import Subset, random_split
+from torch.utils.data.distributed import DistributedSampler
+from data.dataloader import AnimalDataset, train_transform
+from data.shards import ShardDataset
+from data.feature_cache import FeatureDataset, FeatureHead, stem_fingerprint
+from data.loaders import make_loader, tune_loader
 from model import AnimalCNN
 from train import train
 from evaluate import evaluate
 from collections import Counter
 from torch.optim.lr_scheduler import ReduceLROnPlateau
+from utilss.distributed import barrier, cleanup, get_world_size, init_distributed, is_main_process
+from utilss.model_bundle import bundle_metadata
 
-# 🧠 Use CUDA if available
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-print(f"\n🖥️  Using device: {device}\n")
+parser = argparse.ArgumentParser(description="Train AnimalCNN")
+source = parser.add_mutually_exclusive_group()
+source.add_argument("--shards", default=None,
+                    help="Train from shards built by build_shards.py instead of decoding JPEGs")
+source.add_argument("--feature-cache", default=None,
+                    help="Train layer4 + fc on activations cached by cache_features.py")
+parser.add_argument("--epochs", type=int, default=50)
+parser.add_argument("--bf16", action="store_true", help="bfloat16 autocast (CPUs with AVX512-BF16/AMX)")
+parser.add_argument("--no-channels-last", dest="channels_last", action="store_false")
+parser.add_argument("--accumulation-steps", type=int, default=1)
+parser.add_argument("--activation-checkpointing", action="store_true")
+parser.add_argument("--no-resume", dest="resume", action="store_false",
+                    help="Start over even if an interrupted run's state exists")
+parser.add_argument("--seed", type=int, default=42, help="Seed of the train/val/test split")
+parser.add_argument("--ddp", action="store_true",
+                    help="Data-parallel CPU training over gloo; launch with torchrun (see utilss/distributed.py)")
+args = parser.parse_args()
+
+# 🌐 One process per torchrun rank; rank 0 evaluates and writes checkpoints
+if args.ddp:
+    init_distributed("gloo")
+main_process = is_main_process()
+
+# 🧠 Use CUDA if available (gloo data-parallel training runs on CPU)
+device = torch.device("cuda" if torch.cuda.is_available() and not args.ddp else "cpu")
+if main_process:
+    print(f"\n🖥️  Using device: {device}\n")
 
 # 🧪 Transform with augmentation and normalization
-transform = transforms.Compose([
-    transforms.Resize((224, 224)),
-    transforms.RandomHorizontalFlip(),
-    transforms.RandomRotation(15),
-    transforms.ColorJitter(brightness=0.2, contrast=0.2, saturation=0.2),
-    transforms.ToTensor(),
-    transforms.Normalize(mean=[0.485, 0.456, 0.406],
-                         std=[0.229, 0.224, 0.225])
-])
-
-# 📦 Load dataset
-dataset = AnimalDataset("dataset", transform)
+transform = train_transform()
+
+# 📦 Load dataset (pre-decoded shards skip JPEG decoding every epoch; cached
+# features skip the frozen backbone too)
+def load_datasets():
+    if args.shards:
+        return ShardDataset(args.shards, train=True), ShardDataset(args.shards, train=False)
+    if args.feature_cache:
+        return FeatureDataset(args.feature_cache, train=True), FeatureDataset(args.feature_cache, train=False)
+    dataset = AnimalDataset("dataset", transform)
+    return dataset, dataset
+
+
+# Rank 0 refreshes the dataset manifest before the other ranks read it
+if main_process:
+    dataset, eval_dataset = load_datasets()
+    barrier()
+else:
+    barrier()
+    dataset, eval_dataset = load_datasets()
 class_names = list(dataset.class_map.keys())
-print(f"📦 Loaded {len(dataset)} images across {len(class_names)} classes.")
+if main_process:
+    print(f"📦 Loaded {len(dataset)} images across {len(class_names)} classes.")
 
-# 🔀 Split dataset: 70% train, 15% val, 15% test
+# 🔀 Split dataset: 70% train, 15% val, 15% test (seeded, so a resumed run
+# keeps the same split)
 train_size = int(0.7 * len(dataset))
 val_size = int(0.15 * len(dataset))
 test_size = len(dataset) - train_size - val_size
 train_set, val_set, test_set = random_split(
-    dataset, [train_size, val_size, test_size])
+    dataset, [train_size, val_size, test_size],
+    generator=torch.Generator().manual_seed(args.seed))
+if eval_dataset is not dataset:
+    val_set = Subset(eval_dataset, val_set.indices)
+    test_set = Subset(eval_dataset, test_set.indices)
 
-# 📤 DataLoaders
-train_loader = DataLoader(train_set, batch_size=64, shuffle=True)
-val_loader = DataLoader(val_set, batch_size=64, shuffle=False)
-test_loader = DataLoader(test_set, batch_size=64, shuffle=False)
+# 📤 DataLoaders: workers/prefetch probed for this host; the training batch
+# size (per process under --ddp) stays fixed, evaluation batch size is tuned
+# too. Each rank trains on its own shard of the training split; only rank 0
+# evaluates
+train_sampler = DistributedSampler(train_set, shuffle=True, seed=args.seed) if args.ddp else None
+train_loader = make_loader(train_set, batch_size=64, shuffle=True, name="train",
+                           report=main_process, sampler=train_sampler)
+val_loader = test_loader = None
+if main_process:
+    eval_config = tune_loader(val_set, batch_sizes=(64, 128, 256))
+    val_loader = make_loader(val_set, config=eval_config, name="val")
+    test_loader = make_loader(test_set, config=eval_config, name="test")
 
 # 🧮 Compute safe class weights
 targets = [label for _, label in dataset.samples]
@@ -61,16 +114,55 @@ weights[weights == 0] = mean_weight
 weights = weights / weights.sum()
 weights = weights.to(device)
 
-# 🧠 Initialize model, loss, optimizer, scheduler
-model = AnimalCNN(num_classes=num_classes).to(device)
+# 🧠 Initialize model, loss, optimizer, scheduler (a feature cache built from
+# a checkpoint's stem trains from that checkpoint)
+init_checkpoint = getattr(dataset, "checkpoint", None) if args.feature_cache else None
+model = AnimalCNN(num_classes=num_classes, pretrained=init_checkpoint is None)
+if init_checkpoint:
+    if main_process:
+        print(f"🧠 Starting from {init_checkpoint}, the checkpoint the feature cache was built from")
+    model.load_state_dict(torch.load(init_checkpoint, map_location="cpu"))
+model = model.to(device)
 loss_fn = torch.nn.CrossEntropyLoss(weight=weights)
 optimizer = torch.optim.Adam(model.parameters(), lr=0.0001)
 scheduler = ReduceLROnPlateau(optimizer, mode='min', factor=0.5, patience=3)
 
+# 🧊 With cached features only layer4 + fc run; the cache must come from this stem
+train_model = model
+if args.feature_cache:
+    if dataset.stem_fingerprint != stem_fingerprint(model):
+        raise SystemExit("❌ Feature cache was built from a different backbone "
+                         f"(the stem of {init_checkpoint or 'the ImageNet weights'} no longer matches); rerun cache_features.py")
+    train_model = FeatureHead(model)
+if args.ddp:
+    # Memory format is fixed before DDP builds its gradient buckets
+    train_model.to(memory_format=torch.channels_last if args.channels_last else torch.contiguous_format)
+    train_model = DistributedDataParallel(train_model)
+
+# ♻️ A resumed run must match the interrupted one's setup, or the saved
+# optimizer state and epoch count no longer mean the same thing
+run_config = {
+    "world_size": get_world_size(),
+    "source": "shards" if args.shards else "feature_cache" if args.feature_cache else "dataset",
+    "data_fingerprint": dataset.fingerprint,
+    "stem_fingerprint": getattr(dataset, "stem_fingerprint", None),
+    "batch_size": train_loader.batch_size,
+    "accumulation_steps": args.accumulation_steps,
+    "seed": args.seed,
+}
+
 # 🚀 Train
-print("\n🚀 Starting training...\n")
-train(model, train_loader, val_loader, loss_fn, optimizer, scheduler, device)
+if main_process:
+    print("\n🚀 Starting training...\n")
+train(train_model, train_loader, val_loader, loss_fn, optimizer, scheduler, device,
+      num_epochs=args.epochs, bf16=args.bf16, channels_last=args.channels_last,
+      accumulation_steps=args.accumulation_steps,
+      activation_checkpointing=args.activation_checkpointing,
+      resume=args.resume, export_model=model,
+      bundle_metadata=bundle_metadata(class_names, dataset.fingerprint), run_config=run_config)
 
 # 📊 Final evaluation on test set
-print("\n📊 Evaluating model...\n")
-evaluate(model, test_loader, class_names)
+if main_process:
+    print("\n📊 Evaluating model...\n")
+    evaluate(getattr(train_model, "module", train_model), test_loader, class_names)
+cleanup()
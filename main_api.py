@@ -1,23 +1,46 @@
 import os
-import io
-import sys
 import shutil
+import tempfile
 import torch
-from PIL import Image
-from fastapi import FastAPI, File, UploadFile, Form
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from torchvision import transforms
+from starlette.concurrency import run_in_threadpool
 
 from utilss.species_fetcher import fetch_species_names
 from utilss.dataset_manager import get_class_names_from_dataset
-from model import AnimalCNN
-from utilss.logger import log_correction
+from utilss.logger import get_correction_log, log_correction
+from utilss.inference_executor import InferenceExecutor, plan_threads
+from utilss.prediction_cache import PredictionCache
+from utilss.preprocess import default_preprocessor, preprocess_bytes
+from utilss.inference_backend import CHECKPOINT_PATH, backend_path, load_backend
+from utilss.model_bundle import read_class_names
+from utilss.model_registry import ModelManager
+from utilss.prefork import preloaded_backend
+from utilss.job_queue import TrainingJobQueue
+from utilss.replay_buffer import get_replay_buffer
+from utilss.batch_predict import iter_upload_images, stream_batch_predictions
+from utilss.ingest import (FORM_OVERHEAD_BYTES, UploadLimitMiddleware, check_image_header,
+                           limits_from_env, read_upload, spool_upload, store_image)
+from utilss.adaptive_resolution import AdaptiveResolutionModel, policy_from_env
+from utilss.cascade import (SMALL_MODEL_PATH, THRESHOLDS_PATH, CascadeModel, calibration_version,
+                            load_thresholds)
 
 # Initialize FastAPI
 app = FastAPI()
 
+# 📦 Upload limits (ANIMAL_MAX_UPLOAD_MB, ANIMAL_MAX_BATCH_UPLOAD_MB,
+# ANIMAL_MAX_IMAGE_PIXELS, ANIMAL_MAX_DECODE_PIXELS): request bodies are
+# capped while they stream in, and images are checked from their header
+# before any pixel is decoded
+UPLOAD_LIMITS = limits_from_env(os.environ)
+app.add_middleware(
+    UploadLimitMiddleware,
+    max_bytes=UPLOAD_LIMITS.max_upload_bytes + FORM_OVERHEAD_BYTES,
+    path_limits={"/predict/batch": UPLOAD_LIMITS.max_batch_bytes},
+)
+
 # Allow frontend access via CORS
 app.add_middleware(
     CORSMiddleware,
@@ -38,11 +61,16 @@ async def serve_index():
 # 🔍 Setup device
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-# 🚀 Initialize class names once at startup
-print("🔍 Scanning dataset folder for class names...")
-class_names = get_class_names_from_dataset()
+# 🚀 Class names come from the model bundle published with the checkpoint, so
+# startup never touches dataset/; checkpoints without a bundle fall back to
+# scanning the dataset folder
+class_names = read_class_names(CHECKPOINT_PATH)
+if class_names is not None:
+    print(f"✅ Read {len(class_names)} animal classes from the model bundle")
+else:
+    print("🔍 No model bundle found; scanning dataset folder for class names...")
+    class_names = get_class_names_from_dataset()
 num_classes = len(class_names)
-print(f"✅ Found {num_classes} animal classes")
 
 if num_classes == 0:
     print("❌ No classes found in dataset folder")
@@ -50,63 +78,240 @@ if num_classes == 0:
     class_names = ["Unknown"]
     num_classes = 1
 
-# 🧠 Load model
-model = AnimalCNN(num_classes=num_classes).to(device)
-model_path = "outputs/best_model.pth"
+# 🧠 Load model through the configured inference backend:
+# eager | torchscript | onnxruntime | int8 (ANIMAL_QUANTIZED=1 is short for int8)
+QUANTIZED = os.environ.get("ANIMAL_QUANTIZED", "0") == "1"
+INFERENCE_BACKEND = os.environ.get("ANIMAL_INFERENCE_BACKEND", "int8" if QUANTIZED else "eager")
+DECODE_WORKERS = int(os.environ.get("ANIMAL_DECODE_WORKERS", "0")) or None
+MODEL_WORKERS = int(os.environ.get("ANIMAL_MODEL_WORKERS", "1"))
+TORCH_THREADS = int(os.environ.get("ANIMAL_TORCH_THREADS", "0")) or \
+    plan_threads(DECODE_WORKERS, MODEL_WORKERS)["intra_op_threads"]
+if INFERENCE_BACKEND in ("int8", "onnxruntime"):
+    device = torch.device("cpu")  # these runtimes only serve on CPU
+model_path = backend_path(INFERENCE_BACKEND)
+MODEL_POLL_INTERVAL = float(os.environ.get("ANIMAL_MODEL_POLL_INTERVAL", "2"))
 
-try:
-    model.load_state_dict(torch.load(model_path, map_location=device))
-    model.eval()
-    print(f"✅ Model loaded with {num_classes} classes")
-except RuntimeError as e:
-    print(f"❌ Error loading model: {e}")
-    print("➡️ Please retrain using: python train.py with correct class count.")
-    model = None  # Avoid using an invalid model
 
-# 🖼️ Image transform
-transform = transforms.Compose([
-    transforms.Resize((224, 224)),
-    transforms.ToTensor(),
-    transforms.Normalize([0.485, 0.456, 0.406],
-                         [0.229, 0.224, 0.225])
-])
+def load_model():
+    # Under serve.py the weights were loaded once in the parent and shared
+    preloaded = preloaded_backend(model_path) if device.type == "cpu" else None
+    # Eager backends carry the bundle's class list; ModelManager swaps it in with the model
+    return preloaded or load_backend(INFERENCE_BACKEND, len(current_class_names()), device,
+                                     num_threads=TORCH_THREADS)
 
 
-@app.post("/predict")
-async def predict(file: UploadFile = File(...)):
-    if model is None:
-        return {"error": "Model not available. Please retrain first."}
+def current_class_names() -> list:
+    """Labels of the live model (from its bundle), else the startup list."""
+    return model_manager.class_names or class_names
 
-    contents = await file.read()
-    image = Image.open(io.BytesIO(contents)).convert("RGB")
-    input_tensor = transform(image).unsqueeze(0).to(device)
 
-    with torch.no_grad():
-        output = model(input_tensor)
-        pred_idx = output.argmax(dim=1).item()
+# 🔄 The manager watches the checkpoint's version record and hot-swaps new
+# versions in the background (see utilss/model_registry.py)
+model_manager = ModelManager(
+    load_model, model_path, poll_interval=MODEL_POLL_INTERVAL,
+    warmup_input=torch.zeros(1, 3, 224, 224, device=device))
 
-    predicted_class = class_names[pred_idx]
-    confidence = torch.softmax(output, dim=1)[0][pred_idx].item()
+if model_manager.load():
+    print(f"✅ Model {model_manager.version} loaded with {len(current_class_names())} classes ({INFERENCE_BACKEND} backend)")
+else:
+    # Requests are refused until a valid checkpoint is published
+    print("➡️ Please retrain using: python main.py with correct class count.")
 
-    def get_base_class(label: str):
-        label = label.replace("_", " ")
-        for keyword in ["Bear", "Cat", "Dog", "Deer", "Bird", "Cow", "Horse", "Dolphin", "Elephant", "Giraffe", "Kangaroo", "Lion", "Panda", "Polar", "Sloth", "Sun", "Tiger", "Zebra"]:
-            if keyword in label:
-                return keyword
-        return label
 
-    base_class = get_base_class(predicted_class)
-    breed_suggestions = fetch_species_names(predicted_class, top_n=3)
+# 🏋️ Background fine-tuning: one long-lived worker, corrections coalesced
+# into a run once ANIMAL_RETRAIN_MIN_CORRECTIONS are pending or the oldest
+# has waited ANIMAL_RETRAIN_MAX_WAIT seconds. ANIMAL_FEEDBACK_MODE=head (the
+# default) updates only the fc head on cached embeddings, fast enough to run
+# per correction; "full" fine-tunes layer4 + fc on images
+FEEDBACK_MODE = os.environ.get("ANIMAL_FEEDBACK_MODE", "head")
+RETRAIN_MIN_CORRECTIONS = int(os.environ.get(
+    "ANIMAL_RETRAIN_MIN_CORRECTIONS", "1" if FEEDBACK_MODE == "head" else "5"))
+RETRAIN_MAX_WAIT = float(os.environ.get("ANIMAL_RETRAIN_MAX_WAIT", "60"))
+# serve.py runs the trainer in one worker only (ANIMAL_RUN_TRAINER=0 elsewhere)
+RUN_TRAINER = os.environ.get("ANIMAL_RUN_TRAINER", "1") == "1"
 
-    print(
-        f"Predicted: {predicted_class} | Base: {base_class} | Confidence: {round(confidence, 4)}")
 
-    return {
+def run_training_job(corrections):
+    from feedback_trainer import correction_path, fine_tune, fine_tune_head
+    paths = [correction_path(c["image"], c["actual"]) for c in corrections]
+    # No DataLoader worker processes or probes forked from the server process
+    result = fine_tune_head(paths, in_process=True) if FEEDBACK_MODE == "head" \
+        else fine_tune(paths, in_process=True)
+    if result["version"] is not None:
+        get_correction_log().mark_consumed([c["log_id"] for c in corrections],
+                                           consumed_by=result["version"])
+        # Go live now rather than at the watcher's next poll
+        model_manager.load()
+    return result
+
+
+training_queue = TrainingJobQueue(
+    run_training_job, min_corrections=RETRAIN_MIN_CORRECTIONS,
+    max_wait_seconds=RETRAIN_MAX_WAIT)
+
+
+@app.on_event("startup")
+async def start_background_workers():
+    model_manager.start()
+    if RUN_TRAINER:
+        training_queue.start()
+
+# 🪜 Cascade (ANIMAL_CASCADE=1): a MobileNetV3-small first stage answers the
+# requests it is confident about and escalates the rest to the full model.
+# Train it with train_small_model.py and calibrate with calibrate_cascade.py
+CASCADE = os.environ.get("ANIMAL_CASCADE", "0") == "1"
+cascade = None
+if CASCADE:
+    from model import SmallAnimalCNN, load_inference_model
+    from utilss.model_registry import read_version
+    small_path = os.environ.get("ANIMAL_SMALL_MODEL_PATH", SMALL_MODEL_PATH)
+    calibration = load_thresholds(os.environ.get("ANIMAL_CASCADE_THRESHOLDS", THRESHOLDS_PATH),
+                                  class_names)
+    small_model = load_inference_model(small_path, num_classes, device, model_cls=SmallAnimalCNN)
+    cascade = CascadeModel(
+        small_model, model_manager, calibration["thresholds"],
+        version=f"{read_version(small_path)['version']}-{calibration_version(calibration)}")
+    print(f"✅ Cascade enabled (first stage {cascade.version}, "
+          f"calibrated escalation rate {calibration.get('escalation_rate')})")
+
+# ⚙️ Inference executor: decode pool + micro-batched model workers, so
+# PIL decoding and forward passes never run on the event loop
+BATCH_MAX_SIZE = int(os.environ.get("ANIMAL_BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("ANIMAL_BATCH_MAX_WAIT_MS", "5"))
+BATCH_MAX_FILES = int(os.environ.get("ANIMAL_BATCH_MAX_FILES", "10000"))
+
+# 📏 Adaptive resolution (ANIMAL_ADAPTIVE_RESOLUTION=1): batches run at a
+# smaller input size when the queue is deep; see utilss/adaptive_resolution.py
+resolution_policy = policy_from_env(os.environ)
+# Rows carry the size they ran at, so degraded results stay out of the cache
+adaptive = AdaptiveResolutionModel(
+    cascade or model_manager, resolution_policy,
+    queue_depth_fn=lambda: inference.batcher.queue_depth(), with_sizes=True) if resolution_policy else None
+
+inference = InferenceExecutor(
+    adaptive or cascade or model_manager, decode_workers=DECODE_WORKERS, model_workers=MODEL_WORKERS,
+    intra_op_threads=TORCH_THREADS, max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS, buffer_factory=default_preprocessor.empty)
+
+# 🗃️ Prediction cache keyed by upload hash + active model version
+CACHE_MAX_ENTRIES = int(os.environ.get("ANIMAL_CACHE_MAX_ENTRIES", "1024"))
+CACHE_DIR = os.environ.get("ANIMAL_CACHE_DIR") or None
+prediction_cache = PredictionCache(
+    # Versions name the disk tier's directories, so they stay path-safe (no ":" or "|")
+    version_fn=lambda: f"{model_manager.version}+{cascade.version}" if cascade else str(model_manager.version),
+    max_entries=CACHE_MAX_ENTRIES,
+    disk_dir=CACHE_DIR, version_check_interval=0)
+
+
+def get_base_class(label: str):
+    label = label.replace("_", " ")
+    for keyword in ["Bear", "Cat", "Dog", "Deer", "Bird", "Cow", "Horse", "Dolphin", "Elephant", "Giraffe", "Kangaroo", "Lion", "Panda", "Polar", "Sloth", "Sun", "Tiger", "Zebra"]:
+        if keyword in label:
+            return keyword
+    return label
+
+
+def decode_image(contents: bytes, out: torch.Tensor = None) -> torch.Tensor:
+    """Decode uploaded bytes into a normalized (C, H, W) tensor (into ``out`` if given)."""
+    check_image_header(contents, UPLOAD_LIMITS)
+    return preprocess_bytes(contents, out=out).to(device)
+
+
+def format_prediction(output) -> dict:
+    """
+    Turn one row of model logits into the /predict response.
+
+    With adaptive resolution the row is ``(logits, size)`` and the response
+    also reports the input size it was computed at.
+    """
+    output, size = output if adaptive else (output, None)
+    pred_idx = output.argmax().item()
+    predicted_class = current_class_names()[pred_idx]
+    confidence = torch.softmax(output, dim=0)[pred_idx].item()
+
+    result = {
         "prediction": predicted_class,
-        "base_class": base_class,
+        "base_class": get_base_class(predicted_class),
         "confidence": round(confidence, 4),
-        "breeds": breed_suggestions
+        "breeds": fetch_species_names(predicted_class, top_n=3)
     }
+    if size is not None:
+        result["resolution"] = size
+    return result
+
+
+def full_resolution(result: dict) -> bool:
+    """Only results computed at full input size are cached."""
+    return "resolution" not in result or result["resolution"] == resolution_policy.full_size
+
+
+@app.post("/predict")
+async def predict(file: UploadFile = File(...)):
+    if model_manager.model is None:
+        return {"error": "Model not available. Please retrain first."}
+
+    contents = await read_upload(file, UPLOAD_LIMITS)
+
+    async def compute():
+        async with inference.decoded(decode_image, contents) as input_tensor:
+            output = await inference.predict(input_tensor)
+        return format_prediction(output)
+
+    result = await prediction_cache.get_or_compute(contents, compute, cacheable=full_resolution)
+
+    print(
+        f"Predicted: {result['prediction']} | Base: {result['base_class']} | Confidence: {result['confidence']}")
+
+    return result
+
+
+@app.post("/predict/batch")
+async def predict_batch(request: Request):
+    """
+    Classify many images in one request.
+
+    Accepts several ``files`` form fields, or a single zip/tar archive, and
+    streams one JSON line per image as soon as its batch has been classified.
+    """
+    if model_manager.model is None:
+        return {"error": "Model not available. Please retrain first."}
+
+    # Parse the form ourselves: FastAPI closes its own UploadFiles as soon as
+    # the handler returns, which is before a streamed body has been sent.
+    form = await request.form(max_files=BATCH_MAX_FILES)
+    uploads = [item for item in form.getlist("files") if hasattr(item, "filename")]
+
+    async def results():
+        try:
+            async for line in stream_batch_predictions(
+                    iter_upload_images(uploads, UPLOAD_LIMITS.max_upload_bytes), decode_image, inference.forward_batch,
+                    format_prediction, batch_size=BATCH_MAX_SIZE,
+                    executor=inference.decode_pool):
+                yield line
+        finally:
+            await form.close()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+def store_feedback_image(source, save_path: str, filename: str):
+    """
+    Validate and store a corrected image as ``save_path/filename``.
+
+    The image is written to a temporary file first; the class folder is
+    only created and the file moved into it once store_image() succeeded,
+    so rejected uploads leave nothing behind in dataset/.
+    """
+    os.makedirs("outputs", exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".feedback-", dir="outputs")
+    os.close(fd)
+    try:
+        store_image(source, tmp_path, UPLOAD_LIMITS)
+        os.makedirs(save_path, exist_ok=True)
+        shutil.move(tmp_path, os.path.join(save_path, filename))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
 
 @app.post("/feedback")
@@ -115,25 +320,75 @@ async def feedback(
     predicted: str = Form(...),
     actual: str = Form(...)
 ):
-    contents = await file.read()
-    filename = file.filename
+    # 🛡️ Only labels the model knows become dataset folders, and the upload
+    # name can't point outside its class folder
+    if actual not in current_class_names():
+        raise HTTPException(status_code=400, detail=f"Unknown class {actual!r}")
+    filename = os.path.basename(file.filename or "")
+    if not filename or filename.startswith("."):
+        raise HTTPException(status_code=400, detail="Upload needs a file name")
     save_path = os.path.join("dataset", actual)
-    os.makedirs(save_path, exist_ok=True)
 
-    with open(os.path.join(save_path, filename), "wb") as f:
-        f.write(contents)
+    # 📦 Spool within the size limit, check the header, and store oversized
+    # JPEGs downscaled so fine-tuning never decodes them at full size
+    with await spool_upload(file, UPLOAD_LIMITS) as spool:
+        await run_in_threadpool(store_feedback_image, spool, save_path, filename)
 
-    log_correction(filename, predicted, actual)
+    log_id = log_correction(filename, predicted, actual)
+    get_replay_buffer().add(f"{actual}/{filename}", actual)
+
+    # 🔁 Queue the fine-tune; the trainer worker coalesces corrections and
+    # publishes a new version that the model watcher hot-swaps in
+    job = training_queue.submit(os.path.join(save_path, filename), predicted, actual,
+                                log_id=log_id)
+    return {
+        "message": "✅ Feedback received. Model update queued.",
+        "job_id": job["id"],
+        "job_status": job["status"]
+    }
 
-    try:
-        import subprocess
-        subprocess.run([sys.executable, "feedback_trainer.py"], check=True)
-        return {"message": "✅ Feedback received and model updated."}
-    except Exception as e:
-        return {"message": f"⚠️ Feedback saved, but model update failed: {e}"}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: int):
+    """Status of a background training job"""
+    job = training_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
 
 
 @app.get("/classes")
 async def get_class_names():
     """Return the pre-loaded class names (no scanning required)"""
-    return {"classes": class_names}
+    return {"classes": current_class_names()}
+
+
+@app.get("/health")
+async def health_check():
+    """Liveness probe; never touches the model or the inference pools"""
+    return {
+        "status": "healthy",
+        "model_loaded": model_manager.model is not None,
+        "backend": INFERENCE_BACKEND,
+        **model_manager.info(),
+        "num_classes": len(current_class_names()),
+        "inference": inference.stats(),
+        "cache": prediction_cache.stats(),
+        "cascade": cascade.stats() if cascade else None,
+        "adaptive_resolution": adaptive.stats() if adaptive else None,
+        "upload_limits": UPLOAD_LIMITS.as_dict()
+    }
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Prediction cache hit/miss counters"""
+    return prediction_cache.stats()
+
+
+@app.get("/cascade/stats")
+async def cascade_stats():
+    """Escalation rate and per-tier latency of the cascade"""
+    if cascade is None:
+        raise HTTPException(status_code=404, detail="Cascade disabled (set ANIMAL_CASCADE=1)")
+    return cascade.stats()
@@ -1,13 +1,17 @@
 # model.py
+import torch
 import torch.nn as nn
 from torchvision import models
 
+from utilss.model_bundle import current_bundle, load_bundle
+
 
 class AnimalCNN(nn.Module):
-    def __init__(self, num_classes):
+    def __init__(self, num_classes, pretrained=True):
         super(AnimalCNN, self).__init__()
+        # pretrained=False builds the bare architecture, for loading a trained checkpoint
         self.base_model = models.resnet18(
-            weights=models.ResNet18_Weights.DEFAULT)
+            weights=models.ResNet18_Weights.DEFAULT if pretrained else None)
 
         # 🔓 Unfreeze only layer4 for Grad-CAM to access gradients
         for name, param in self.base_model.named_parameters():
@@ -23,3 +27,63 @@ class AnimalCNN(nn.Module):
 
     def forward(self, x):
         return self.base_model(x)
+
+    def stem(self, x):
+        """Frozen part of the backbone (conv1 through layer3)"""
+        m = self.base_model
+        x = m.maxpool(m.relu(m.bn1(m.conv1(x))))
+        return m.layer3(m.layer2(m.layer1(x)))
+
+    def embed(self, x):
+        """512-d penultimate embedding (the input of the fc head)"""
+        m = self.base_model
+        return torch.flatten(m.avgpool(m.layer4(self.stem(x))), 1)
+
+    def head(self, features):
+        """Trainable part (layer4, pooling and fc) applied to layer3 activations"""
+        m = self.base_model
+        x = m.avgpool(m.layer4(features))
+        return m.fc(torch.flatten(x, 1))
+
+
+class SmallAnimalCNN(nn.Module):
+    """MobileNetV3-small first stage for cascade inference (see utilss/cascade.py)"""
+
+    def __init__(self, num_classes, pretrained=True):
+        super(SmallAnimalCNN, self).__init__()
+        self.base_model = models.mobilenet_v3_small(
+            weights=models.MobileNet_V3_Small_Weights.DEFAULT if pretrained else None)
+
+        # 🔓 Fine-tune the last feature blocks and the classifier
+        for name, param in self.base_model.named_parameters():
+            param.requires_grad = name.startswith(("features.10.", "features.11.", "features.12.", "classifier."))
+
+        # 🔁 Replace the classification head
+        self.base_model.classifier[-1] = nn.Linear(
+            self.base_model.classifier[-1].in_features, num_classes)
+
+    def forward(self, x):
+        return self.base_model(x)
+
+
+def load_inference_model(checkpoint_path, num_classes=None, device="cpu", model_cls=AnimalCNN):
+    """
+    Build a trained model straight from its checkpoint, in eval mode.
+
+    The architecture is created on the meta device, so there is no
+    pretrained-weight download and no random initialization, and the
+    checkpoint tensors are assigned as the parameters instead of being
+    copied into freshly allocated ones. When the checkpoint has a model
+    bundle (utilss/model_bundle.py), the parameters are views of the
+    memory-mapped bundle and the class count comes from its metadata.
+    """
+    bundle = current_bundle(checkpoint_path)
+    if bundle:
+        state_dict, metadata = load_bundle(bundle, device)
+        num_classes = len(metadata["classes"])
+    else:
+        state_dict = torch.load(checkpoint_path, map_location=device)
+    with torch.device("meta"):
+        model = model_cls(num_classes=num_classes, pretrained=False)
+    model.load_state_dict(state_dict, assign=True)
+    return model.eval()
@@ -2,36 +2,29 @@ import os
 import torch
 import shutil
 import subprocess
-from torchvision import transforms
-from PIL import Image
-from model import AnimalCNN
-from data.dataloader import AnimalDataset
+from model import load_inference_model
 from torch.nn.functional import softmax
+from utilss.dataset_manager import get_class_names_from_dataset
+from utilss.inference_backend import CHECKPOINT_PATH
 from utilss.logger import log_correction
+from utilss.model_bundle import read_class_names
+from utilss.replay_buffer import get_replay_buffer
+from utilss.preprocess import Preprocessor, load_image
 
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-# Load model
-model = AnimalCNN(num_classes=15).to(device)
-model.load_state_dict(torch.load("outputs/best_model.pth"))
-model.eval()
-
-# Load class names
-dataset = AnimalDataset("dataset", transform=None)
-class_names = list(dataset.class_map.keys())
+# Load model and the class names it was trained on (from its bundle;
+# checkpoints without one fall back to the dataset folders)
+class_names = read_class_names(CHECKPOINT_PATH) or get_class_names_from_dataset()
+model = load_inference_model(CHECKPOINT_PATH, num_classes=len(class_names), device=device)
 
 # Load and preprocess image
 image_path = input("📷 Enter path to test image: ").strip()
 assert os.path.exists(image_path), f"File not found: {image_path}"
 
-transform = transforms.Compose([
-    transforms.Resize((224, 224)),
-    transforms.ToTensor(),
-    transforms.Normalize(mean=[0.485, 0.456, 0.406],
-                         std=[0.229, 0.224, 0.225])
-])
-image = Image.open(image_path).convert("RGB")
-input_tensor = transform(image).unsqueeze(0).to(device)
+preprocess = Preprocessor()
+image = load_image(image_path)
+input_tensor = preprocess(image).unsqueeze(0).to(device)
 
 # Predict
 with torch.no_grad():
@@ -62,6 +55,7 @@ if true_class.lower() != "skip":
 
     # Log correction
     log_correction(image_path, predicted_class, true_class)
+    get_replay_buffer().add(f"{true_class}/{os.path.basename(image_path)}", true_class)
 
     print("📥 Image saved and correction logged.")
 
@@ -0,0 +1,86 @@
+# quantize.py
+"""
+Build the INT8 serving artifact and report what it costs and gains.
+
+Usage:
+    python quantize.py [--calibration-size 256] [--eval-size 1000]
+
+Serve it with ANIMAL_QUANTIZED=1 uvicorn main_api:app
+"""
+import argparse
+
+import torch
+from torch.utils.data import Subset
+
+from data.dataloader import AnimalDataset
+from data.loaders import make_loader, tune_loader
+from evaluate import evaluate, per_class_accuracy
+from model import load_inference_model
+from utilss.preprocess import Preprocessor, load_image
+from utilss.quantization import (QUANTIZED_MODEL_PATH, measure_latency, quantize_model,
+                                 save_quantized_model, serialized_size_mb)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize AnimalCNN to INT8")
+    parser.add_argument("--checkpoint", default="outputs/best_model.pth")
+    parser.add_argument("--output", default=QUANTIZED_MODEL_PATH)
+    parser.add_argument("--dataset", default="dataset")
+    parser.add_argument("--calibration-size", type=int, default=256)
+    parser.add_argument("--eval-size", type=int, default=1000)
+    parser.add_argument("--backend", default="fbgemm", choices=["fbgemm", "qnnpack"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # 🐾 Calibration and evaluation samples are disjoint
+    dataset = AnimalDataset(args.dataset, transform=Preprocessor(), loader=load_image)
+    class_names = list(dataset.class_map.keys())
+    order = torch.randperm(len(dataset), generator=torch.Generator().manual_seed(args.seed)).tolist()
+    calibration_set = Subset(dataset, order[:args.calibration_size])
+    eval_set = Subset(dataset, order[args.calibration_size:args.calibration_size + args.eval_size])
+    print(f"📦 {len(calibration_set)} calibration / {len(eval_set)} evaluation images")
+
+    # 🧠 Float model
+    float_model = load_inference_model(args.checkpoint, len(class_names))
+
+    # 🔢 Quantize
+    print("\n🔢 Calibrating and quantizing...")
+    calibration_loader = make_loader(calibration_set, batch_size=32, name="calibration")
+    int8_model = quantize_model(float_model, (images for images, _ in calibration_loader),
+                                backend=args.backend)
+    save_quantized_model(int8_model, args.output)
+    print(f"💾 Saved quantized model to {args.output}")
+
+    # 📊 Accuracy
+    eval_loader = make_loader(eval_set, config=tune_loader(eval_set, batch_sizes=(64, 128, 256)),
+                              name="eval")
+    print("\n📊 FP32:")
+    y_true, fp32_pred = evaluate(float_model, eval_loader, class_names, show_plot=False)
+    print("\n📊 INT8:")
+    _, int8_pred = evaluate(int8_model, eval_loader, class_names, show_plot=False)
+
+    fp32_acc = per_class_accuracy(y_true, fp32_pred, len(class_names))
+    int8_acc = per_class_accuracy(y_true, int8_pred, len(class_names))
+
+    print("\n📋 Per-class accuracy (FP32 → INT8):")
+    for name, before, after in zip(class_names, fp32_acc, int8_acc):
+        if before is None:
+            continue
+        print(f"  {name:<24} {before:.3f} → {after:.3f} ({after - before:+.3f})")
+    print(f"  {'Overall':<24} {(fp32_pred == y_true).mean():.3f} → {(int8_pred == y_true).mean():.3f}"
+          f" | prediction agreement {(fp32_pred == int8_pred).mean():.3f}")
+
+    # ⚡ Latency and size
+    print("\n⚡ Latency / size:")
+    for batch_size in (1, 16):
+        fp32_ms = measure_latency(float_model, batch_size)
+        int8_ms = measure_latency(int8_model, batch_size)
+        print(f"  batch {batch_size:<3} FP32 {fp32_ms:7.1f} ms | INT8 {int8_ms:7.1f} ms"
+              f" | {fp32_ms / int8_ms:.2f}x faster")
+    fp32_mb = serialized_size_mb(float_model)
+    int8_mb = serialized_size_mb(int8_model)
+    print(f"  weights   FP32 {fp32_mb:7.1f} MB | INT8 {int8_mb:7.1f} MB | {fp32_mb / int8_mb:.2f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# resolution_sweep.py
+"""
+Accuracy/latency curve of the served model per input resolution.
+
+The test split is evaluated at every size, and each smaller size is also
+simulated with low-confidence rows re-run at full resolution, which is what
+ANIMAL_RESOLUTION_FIRST_PASS does in serving.
+
+Usage:
+    python resolution_sweep.py [--sizes 224 192 160 128] [--output outputs/resolution_sweep.json]
+"""
+import argparse
+import json
+import os
+from functools import partial
+
+import numpy as np
+import torch
+from torch.utils.data import Subset, random_split
+
+from data.dataloader import AnimalDataset
+from data.loaders import make_loader, tune_loader
+from evaluate import per_class_accuracy, predict_with_confidence
+from model import load_inference_model
+from utilss.preprocess import Preprocessor, load_image
+from utilss.quantization import measure_latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep inference resolutions")
+    parser.add_argument("--dataset", default="dataset")
+    parser.add_argument("--checkpoint", default="outputs/best_model.pth")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[224, 192, 160, 128])
+    parser.add_argument("--min-confidence", type=float, nargs="+", default=[0.8, 0.9, 0.95],
+                        help="Re-run thresholds to simulate for the smaller sizes")
+    parser.add_argument("--batch-size", type=int, default=16, help="Batch size for latency")
+    parser.add_argument("--output", default="outputs/resolution_sweep.json")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the split (matches main.py)")
+    args = parser.parse_args()
+
+    sizes = sorted(set(args.sizes), reverse=True)
+    class_names = list(AnimalDataset(args.dataset).class_map.keys())
+    model = load_inference_model(args.checkpoint, len(class_names))
+
+    results = {}
+    config = None
+    for size in sizes:
+        # 📦 Same test split as main.py, decoded straight at this size
+        dataset = AnimalDataset(args.dataset, transform=Preprocessor(size=size),
+                                loader=partial(load_image, size=(size, size)))
+        train_size = int(0.7 * len(dataset))
+        val_size = int(0.15 * len(dataset))
+        _, _, test_set = random_split(
+            dataset, [train_size, val_size, len(dataset) - train_size - val_size],
+            generator=torch.Generator().manual_seed(args.seed))
+        config = config or tune_loader(test_set, batch_sizes=(64, 128), verbose=False)
+        loader = make_loader(Subset(dataset, test_set.indices), config=config,
+                             name=f"test@{size}", report=False)
+
+        y_true, y_pred, confidence = predict_with_confidence(model, loader)
+        per_class = [a for a in per_class_accuracy(y_true, y_pred, len(class_names)) if a is not None]
+        results[size] = {
+            "y_pred": y_pred, "confidence": confidence,
+            "accuracy": float((y_pred == y_true).mean()),
+            "worst_class_accuracy": min(per_class),
+            "mean_confidence": float(confidence.mean()),
+            "latency_ms_b1": measure_latency(model, input_size=size),
+            f"latency_ms_b{args.batch_size}": measure_latency(model, batch_size=args.batch_size,
+                                                              input_size=size),
+        }
+        print(f"  📏 {size}px: acc {results[size]['accuracy']:.4f} | "
+              f"{results[size]['latency_ms_b1']:.1f} ms/img")
+
+    # 🔁 Low-res first pass with low-confidence rows re-run at full resolution
+    full = results[sizes[0]]
+    reruns = []
+    for size in sizes[1:]:
+        for threshold in args.min_confidence:
+            rerun = results[size]["confidence"] < threshold
+            pred = np.where(rerun, full["y_pred"], results[size]["y_pred"])
+            rate = float(rerun.mean())
+            reruns.append({
+                "first_pass_size": size, "min_confidence": threshold,
+                "accuracy": float((pred == y_true).mean()),
+                "rerun_rate": rate,
+                "expected_latency_ms_b1": results[size]["latency_ms_b1"] + rate * full["latency_ms_b1"],
+            })
+
+    print(f"\n{'size':>6}{'accuracy':>10}{'worst cls':>11}{'mean conf':>11}{'ms (b1)':>9}"
+          f"{f'ms (b{args.batch_size})':>11}{'speedup':>9}")
+    for size in sizes:
+        r = results[size]
+        print(f"{size:>6}{r['accuracy']:>10.4f}{r['worst_class_accuracy']:>11.4f}"
+              f"{r['mean_confidence']:>11.4f}{r['latency_ms_b1']:>9.1f}"
+              f"{r[f'latency_ms_b{args.batch_size}']:>11.1f}"
+              f"{full['latency_ms_b1'] / r['latency_ms_b1']:>8.2f}x")
+
+    print(f"\n{'first pass':>11}{'min conf':>10}{'accuracy':>10}{'re-run':>9}{'ms (b1)':>9}")
+    for r in reruns:
+        print(f"{r['first_pass_size']:>11}{r['min_confidence']:>10.2f}{r['accuracy']:>10.4f}"
+              f"{r['rerun_rate']:>9.1%}{r['expected_latency_ms_b1']:>9.1f}")
+
+    report = {
+        "checkpoint": args.checkpoint,
+        "samples": len(y_true),
+        "resolutions": {str(size): {k: round(v, 4) for k, v in r.items() if not isinstance(v, np.ndarray)}
+                        for size, r in results.items()},
+        "first_pass": [{k: round(v, 4) if isinstance(v, float) else v for k, v in r.items()} for r in reruns],
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Saved sweep to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# serve.py
+"""
+Pre-fork launcher for main_api.
+
+The parent loads the serving model once, freezes it, moves its weights to
+shared memory and forks --workers uvicorn workers onto one listening
+socket. Each worker is pinned to its own cores with a matching torch
+thread count, so N workers cost one copy of the weights and one model
+construction instead of N. Workers that exit are re-forked from the parent.
+
+Usage:
+    python serve.py --workers 4 [--host 0.0.0.0] [--port 8000]
+
+Compare against plain ``uvicorn main_api:app --workers N`` with
+benchmarks/bench_prefork.py.
+"""
+import argparse
+import os
+import signal
+import socket
+import time
+
+import torch
+
+
+def run_worker(index, args, sock):
+    from utilss.inference_executor import plan_threads
+    from utilss.prefork import pin_worker, worker_cpus
+
+    # 📌 Own cores, split between decode threads and torch intra-op threads
+    cpus = worker_cpus(index, args.workers)
+    decode_workers = int(os.environ.get("ANIMAL_DECODE_WORKERS", "0")) or None
+    model_workers = int(os.environ.get("ANIMAL_MODEL_WORKERS", "1"))
+    plan = plan_threads(decode_workers, model_workers, cpu_count=len(cpus))
+    threads = pin_worker(cpus, args.threads_per_worker or plan["intra_op_threads"])
+    os.environ["ANIMAL_DECODE_WORKERS"] = str(plan["decode_workers"])
+    os.environ["ANIMAL_TORCH_THREADS"] = str(threads)
+    # Feedback fine-tuning runs in worker 0 only; the others hot-reload its results
+    if index != 0:
+        os.environ["ANIMAL_RUN_TRAINER"] = "0"
+    print(f"👷 Worker {index} (pid {os.getpid()}) on cores {cpus} with {threads} torch threads")
+
+    import uvicorn
+    from main_api import app
+    uvicorn.Server(uvicorn.Config(app, log_level=args.log_level)).run(sockets=[sock])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork multi-worker server for main_api")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="Torch intra-op threads per worker (default: planned from its cores)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    # No intra-op pool in the parent: a pool created before fork is unusable in the children
+    torch.set_num_threads(1)
+
+    from utilss.dataset_manager import get_class_names_from_dataset
+    from utilss.inference_backend import CHECKPOINT_PATH, backend_path, load_backend
+    from utilss.model_bundle import read_class_names
+    from utilss.prefork import freeze_heap, memory_usage, preload_backend
+
+    # 🧠 Load and share the model once
+    quantized = os.environ.get("ANIMAL_QUANTIZED", "0") == "1"
+    backend = os.environ.get("ANIMAL_INFERENCE_BACKEND", "int8" if quantized else "eager")
+    num_classes = len(read_class_names(CHECKPOINT_PATH) or get_class_names_from_dataset()) or 1
+    path = backend_path(backend)
+    if os.path.exists(path):
+        start = time.perf_counter()
+        info = preload_backend(load_backend(backend, num_classes, torch.device("cpu"), num_threads=1), path)
+        print(f"✅ Preloaded {backend} model {info['version']} in {time.perf_counter() - start:.1f}s "
+              f"({info['shared_bytes'] / 1e6:.1f} MB shared) | parent {memory_usage()}")
+    else:
+        print(f"⚠️ {path} not found; workers will load the model once it is published")
+
+    # 🔌 One listening socket inherited by every worker
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    freeze_heap()
+
+    children = {}
+    stopping = False
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                run_worker(index, args, sock)
+            finally:
+                os._exit(0)
+        children[pid] = index
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(args.workers):
+        spawn(index)
+    print(f"🚀 Serving on http://{args.host}:{args.port} with {args.workers} workers")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is not None and not stopping:
+            print(f"⚠️ Worker {index} (pid {pid}) exited with status {status}; restarting")
+            time.sleep(1)
+            spawn(index)
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
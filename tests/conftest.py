@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the repo's top-level modules (model, train, utilss, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
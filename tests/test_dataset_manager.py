@@ -0,0 +1,15 @@
+from PIL import Image
+
+from utilss.dataset_manager import scan_dataset
+
+
+def test_truncated_jpeg_is_corrupted(tmp_path):
+    dataset = tmp_path / "dataset"
+    (dataset / "Cat").mkdir(parents=True)
+    Image.new("RGB", (64, 64), (200, 30, 30)).save(dataset / "Cat" / "ok.jpg", quality=95)
+    data = (dataset / "Cat" / "ok.jpg").read_bytes()
+    (dataset / "Cat" / "truncated.jpg").write_bytes(data[:len(data) // 2])
+
+    scan = scan_dataset(str(dataset), workers=1, channel_stats=False)
+    assert scan["classes"] == {"Cat": 1}
+    assert [p.replace("\\", "/").rsplit("/", 1)[-1] for p in scan["corrupted"]] == ["truncated.jpg"]
@@ -0,0 +1,41 @@
+import pytest
+import torch
+
+from export_model import export_onnx, export_torchscript
+from model import AnimalCNN, load_inference_model
+from utilss.inference_backend import EagerBackend, TorchScriptBackend, check_parity
+from utilss.model_bundle import bundle_metadata
+from utilss.model_registry import publish_checkpoint
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    model = AnimalCNN(num_classes=3, pretrained=False)
+    path = str(tmp_path / "best_model.pth")
+    publish_checkpoint(model.state_dict(), path, bundle=bundle_metadata(["a", "b", "c"]))
+    return path
+
+
+def test_torchscript_export_matches_eager(checkpoint, tmp_path):
+    path = str(tmp_path / "model.ts")
+    export_torchscript(load_inference_model(checkpoint), path)
+
+    worst = check_parity(EagerBackend(3, checkpoint), TorchScriptBackend(path), atol=1e-3)
+    assert worst <= 1e-3
+
+
+def test_onnx_export_matches_eager(checkpoint, tmp_path):
+    pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    from utilss.inference_backend import OnnxRuntimeBackend
+
+    path = str(tmp_path / "model.onnx")
+    export_onnx(load_inference_model(checkpoint), path, opset=17)
+
+    backend = OnnxRuntimeBackend(path)
+    assert check_parity(EagerBackend(3, checkpoint), backend, atol=1e-3) <= 1e-3
+    # Spatial axes are dynamic for adaptive-resolution serving
+    batch = torch.randn(2, 3, 160, 160)
+    with torch.no_grad():
+        expected = load_inference_model(checkpoint)(batch)
+    assert torch.allclose(backend(batch), expected, atol=1e-3)
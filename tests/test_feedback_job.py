@@ -0,0 +1,64 @@
+import os
+import time
+
+from PIL import Image
+
+import utilss.embedding_store as embedding_store
+import utilss.replay_buffer as replay_buffer
+from feedback_trainer import correction_path, fine_tune_head
+from model import AnimalCNN
+from utilss.job_queue import TrainingJobQueue
+from utilss.model_bundle import bundle_metadata, read_class_names
+from utilss.model_registry import publish_checkpoint, read_version
+
+CLASSES = ("Cat", "Dog")
+
+
+def make_dataset(root):
+    for class_name, color in zip(CLASSES, ((200, 60, 60), (60, 60, 200))):
+        os.makedirs(os.path.join(root, class_name))
+        for i in range(4):
+            Image.new("RGB", (64, 64), (color[0], color[1] + 10 * i, color[2])).save(
+                os.path.join(root, class_name, f"{i}.jpg"))
+
+
+def wait_for(queue, job_id, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.1)
+    raise TimeoutError(f"job {job_id} still {job['status']}")
+
+
+def test_feedback_job_publishes_new_version(tmp_path, monkeypatch):
+    # Default stores live under relative outputs/ paths
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(embedding_store, "_default_store", None)
+    monkeypatch.setattr(replay_buffer, "_default_buffer", None)
+    make_dataset("dataset")
+
+    checkpoint = os.path.join("outputs", "best_model.pth")
+    initial = publish_checkpoint(AnimalCNN(num_classes=len(CLASSES), pretrained=False).state_dict(),
+                                 checkpoint, bundle=bundle_metadata(list(CLASSES)))
+
+    def run(corrections):
+        paths = [correction_path(c["image"], c["actual"]) for c in corrections]
+        return fine_tune_head(paths, checkpoint_path=checkpoint, max_accuracy_drop=1.0,
+                              in_process=True)
+
+    queue = TrainingJobQueue(run, db_path=os.path.join("outputs", "jobs.db"),
+                             min_corrections=1, poll_interval=0.05)
+    queue.start()
+    try:
+        job = queue.submit(os.path.join("dataset", "Dog", "0.jpg"), "Cat", "Dog")
+        job = wait_for(queue, job["id"])
+    finally:
+        queue.stop()
+
+    assert job["status"] == "succeeded", job["error"]
+    version = read_version(checkpoint)["version"]
+    assert version != initial
+    assert job["result"]["version"] == version
+    assert read_class_names(checkpoint) == list(CLASSES)
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+
+import torch
+
+from utilss.inference_executor import InferenceExecutor
+
+
+def test_cancelled_decode_keeps_buffer_until_the_thread_finishes():
+    executor = InferenceExecutor(lambda batch: batch.flatten(1).sum(1, keepdim=True),
+                                 decode_workers=1, buffer_factory=lambda: torch.zeros(3, 4, 4))
+    started, release = threading.Event(), threading.Event()
+
+    def slow_decode(value, out=None):
+        started.set()
+        release.wait(5)
+        return out.fill_(value)
+
+    async def request():
+        async with executor.decoded(slow_decode, 1.0) as tensor:
+            return await executor.predict(tensor)
+
+    async def run():
+        task = asyncio.create_task(request())
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # The decode thread still writes into the buffer: it must not be reused yet
+        assert executor._buffers == []
+        release.set()
+        for _ in range(100):
+            if executor._buffers:
+                break
+            await asyncio.sleep(0.01)
+        assert len(executor._buffers) == 1
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.shutdown()
+
+
+def test_buffer_returns_after_prediction():
+    executor = InferenceExecutor(lambda batch: batch.flatten(1).sum(1, keepdim=True),
+                                 buffer_factory=lambda: torch.zeros(3, 4, 4))
+
+    async def run():
+        async with executor.decoded(lambda value, out=None: out.fill_(value), 2.0) as tensor:
+            output = await executor.predict(tensor)
+        return output
+
+    try:
+        assert asyncio.run(run()).item() == 96.0
+        assert len(executor._buffers) == 1
+    finally:
+        executor.shutdown()
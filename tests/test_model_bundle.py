@@ -0,0 +1,61 @@
+import torch
+
+from model import AnimalCNN, load_inference_model
+from utilss.model_bundle import bundle_metadata, load_bundle, read_bundle_metadata, save_bundle
+from utilss.model_registry import publish_checkpoint, read_version
+
+
+def test_bundle_round_trip(tmp_path):
+    model = AnimalCNN(num_classes=3, pretrained=False)
+    state_dict = model.state_dict()
+    # 0-dim BatchNorm counters are part of every ResNet state_dict
+    assert any(t.dim() == 0 for t in state_dict.values())
+
+    path = str(tmp_path / "model.safetensors")
+    save_bundle(state_dict, path, bundle_metadata(["a", "b", "c"], "fp"))
+
+    loaded, metadata = load_bundle(path)
+    assert metadata["classes"] == ["a", "b", "c"]
+    assert read_bundle_metadata(path)["data_fingerprint"] == "fp"
+    assert loaded.keys() == state_dict.keys()
+    for name, tensor in state_dict.items():
+        assert loaded[name].dtype == tensor.dtype
+        assert loaded[name].shape == tensor.shape
+        assert torch.equal(loaded[name], tensor)
+
+
+def test_publish_with_bundle_serves_same_weights(tmp_path):
+    model = AnimalCNN(num_classes=3, pretrained=False).eval()
+    checkpoint = str(tmp_path / "best_model.pth")
+
+    version = publish_checkpoint(model.state_dict(), checkpoint,
+                                 bundle=bundle_metadata(["a", "b", "c"]))
+
+    assert read_version(checkpoint)["version"] == version
+    served = load_inference_model(checkpoint)
+    batch = torch.randn(2, 3, 64, 64)
+    with torch.no_grad():
+        assert torch.allclose(served(batch), model(batch))
+
+
+def test_failed_bundle_write_keeps_previous_version(tmp_path, monkeypatch):
+    import utilss.model_bundle as model_bundle
+
+    checkpoint = str(tmp_path / "best_model.pth")
+    first = AnimalCNN(num_classes=3, pretrained=False).state_dict()
+    version = publish_checkpoint(first, checkpoint, bundle=bundle_metadata(["a", "b", "c"]))
+
+    def fail(f, state_dict, metadata):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(model_bundle, "write_bundle", fail)
+    second = AnimalCNN(num_classes=3, pretrained=False).state_dict()
+    try:
+        publish_checkpoint(second, checkpoint, bundle=bundle_metadata(["a", "b", "c"]))
+    except RuntimeError:
+        pass
+
+    assert read_version(checkpoint)["version"] == version
+    restored = torch.load(checkpoint, map_location="cpu")
+    assert all(torch.equal(restored[name], first[name]) for name in first)
+    assert not [name for name in tmp_path.iterdir() if name.name.startswith(".tmp-")]
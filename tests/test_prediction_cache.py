@@ -0,0 +1,23 @@
+import asyncio
+
+from utilss.prediction_cache import PredictionCache
+
+
+def test_rejected_results_are_not_cached():
+    cache = PredictionCache(version_fn=lambda: "v1")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"prediction": "Cat", "resolution": 128}
+
+    async def run():
+        for _ in range(2):
+            result = await cache.get_or_compute(b"image", compute,
+                                                cacheable=lambda r: r["resolution"] == 224)
+            assert result["prediction"] == "Cat"
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    assert cache.stats()["uncached"] == 2
+    assert cache.stats()["entries"] == 0
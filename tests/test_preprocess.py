@@ -0,0 +1,41 @@
+import io
+
+import pytest
+from PIL import Image
+from torchvision import transforms
+
+from utilss.preprocess import IMAGENET_MEAN, IMAGENET_STD, INPUT_SIZE, Preprocessor
+
+MEAN_TOLERANCE = 0.05  # mean |difference| in normalized units, as in benchmarks/bench_preprocess.py
+
+reference = transforms.Compose([
+    transforms.Resize((INPUT_SIZE, INPUT_SIZE)),
+    transforms.ToTensor(),
+    transforms.Normalize(IMAGENET_MEAN, IMAGENET_STD)
+])
+
+
+def synthetic_image(width, height, fmt):
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 24)
+    image = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.FLIP_LEFT_RIGHT)))
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **({"quality": 90} if fmt == "JPEG" else {}))
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("width, height, fmt", [
+    (2000, 1500, "JPEG"),  # draft-mode downscaled decode
+    (640, 480, "JPEG"),
+    (640, 480, "PNG"),
+    (100, 300, "GIF"),
+])
+def test_fast_path_matches_reference_transform(width, height, fmt):
+    data = synthetic_image(width, height, fmt)
+    expected = reference(Image.open(io.BytesIO(data)).convert("RGB"))
+
+    preprocessor = Preprocessor()
+    actual = preprocessor.from_bytes(data, out=preprocessor.empty())
+
+    assert actual.shape == expected.shape
+    assert (expected - actual).abs().mean().item() <= MEAN_TOLERANCE
@@ -0,0 +1,31 @@
+from utilss.replay_buffer import ReplayBuffer
+
+
+def test_workers_share_one_buffer(tmp_path):
+    path = str(tmp_path / "replay_buffer.db")
+    first = ReplayBuffer(path, capacity=4, seed=0)
+    second = ReplayBuffer(path, capacity=4, seed=1)
+
+    first.add("Cat/0.jpg", "Cat")
+    second.add("Dog/0.jpg", "Dog")
+    first.add("Cat/1.jpg", "Cat")
+
+    stats = second.stats()
+    assert stats["Cat"] == {"seen": 2, "buffered": 2}
+    assert stats["Dog"] == {"seen": 1, "buffered": 1}
+    assert first.stats() == stats
+
+
+def test_sample_respects_per_class_after_exclude(tmp_path):
+    buffer = ReplayBuffer(str(tmp_path / "replay_buffer.db"), capacity=8, seed=0)
+    for i in range(6):
+        buffer.add(f"Cat/{i}.jpg", "Cat")
+
+    exclude = {"Cat/0.jpg", "Cat/1.jpg"}
+    picked = buffer.sample(3, exclude=exclude)
+    assert len(picked) == 3
+    assert not exclude & {path for path, _ in picked}
+
+    # Fewer candidates than per_class left after excluding
+    picked = buffer.sample(5, exclude={f"Cat/{i}.jpg" for i in range(3)})
+    assert len(picked) == 3
@@ -0,0 +1,22 @@
+import torch
+from PIL import Image
+
+from data.shards import ShardDataset, build_shards
+from utilss.preprocess import Preprocessor
+
+
+def test_eval_shards_match_serving_preprocess(tmp_path):
+    dataset = tmp_path / "dataset"
+    (dataset / "Cat").mkdir(parents=True)
+    # Wide image: a center crop would differ from the squash serving uses
+    image = Image.new("RGB", (320, 160), (250, 10, 10))
+    image.paste((10, 10, 250), (0, 0, 80, 160))
+    image.save(dataset / "Cat" / "wide.png")
+
+    build_shards(str(dataset), str(tmp_path / "shards"), workers=1)
+    tensor, label = ShardDataset(str(tmp_path / "shards"), train=False)[0]
+
+    expected = Preprocessor()(image)
+    assert label == 0
+    assert tensor.shape == expected.shape
+    assert torch.allclose(tensor, expected, atol=0.1)
@@ -0,0 +1,19 @@
+import pytest
+
+from train import check_run_config
+
+CONFIG = {"world_size": 2, "source": "dataset", "batch_size": 64, "accumulation_steps": 4}
+
+
+def test_matching_config_resumes():
+    check_run_config(dict(CONFIG), dict(CONFIG), "train_state.pt")
+
+
+def test_changed_world_size_refuses_to_resume():
+    with pytest.raises(ValueError, match="world_size: 2 -> 4"):
+        check_run_config(dict(CONFIG), {**CONFIG, "world_size": 4}, "train_state.pt")
+
+
+def test_state_without_config_refuses_to_resume():
+    with pytest.raises(ValueError, match="batch_size"):
+        check_run_config(None, CONFIG, "train_state.pt")
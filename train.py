@@ -0,0 +1,287 @@
+# train.py
+import os
+import random
+import time
+from contextlib import nullcontext
+
+import numpy as np
+import torch
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.checkpoint import checkpoint
+from torch.utils.data.distributed import DistributedSampler
+from torch.utils.tensorboard import SummaryWriter
+
+from utilss.distributed import all_reduce_sum, broadcast_object, broadcast_values, is_main_process
+from utilss.model_registry import _atomic_write, publish_checkpoint
+
+TRAIN_STATE_PATH = "outputs/train_state.pt"
+
+
+def enable_activation_checkpointing(model):
+    """
+    Recompute the blocks of every ``layer4`` in the backward pass instead of
+    storing their activations (only layer4 is trainable, so only its
+    activations are kept for backward in the first place). The blocks'
+    forward is patched in place, so state_dict keys are unchanged.
+    """
+    for name, module in model.named_modules():
+        if name.rsplit(".", 2)[-2:-1] != ["layer4"]:
+            continue
+        forward = module.forward
+
+        def checkpointed(x, _forward=forward, _module=module):
+            if _module.training and torch.is_grad_enabled():
+                return checkpoint(_forward, x, use_reentrant=False)
+            return _forward(x)
+
+        module.forward = checkpointed
+
+
+def _rng_state():
+    state = {"python": random.getstate(), "numpy": np.random.get_state(),
+             "torch": torch.get_rng_state()}
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def _set_rng_state(state):
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch.set_rng_state(state["torch"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+
+def save_train_state(path, model, optimizer, scheduler, epoch, best_val_loss, epochs_no_improve,
+                     run_config=None):
+    """Everything needed to continue a run after ``epoch``, written atomically"""
+    state = {
+        "run_config": run_config,
+        "epoch": epoch,
+        "model": model.state_dict(),
+        "optimizer": optimizer.state_dict(),
+        "scheduler": scheduler.state_dict(),
+        "best_val_loss": best_val_loss,
+        "epochs_no_improve": epochs_no_improve,
+        "rng": _rng_state(),
+    }
+    _atomic_write(path, lambda f: torch.save(state, f))
+
+
+def load_train_state(path, model, optimizer, scheduler, device, state=None):
+    """
+    Restore a run saved by save_train_state; returns (next epoch, best val
+    loss, epochs without improvement). ``state`` is used instead of reading
+    ``path`` when given (e.g. a state broadcast from rank 0).
+    """
+    if state is None:
+        state = torch.load(path, map_location=device, weights_only=False)
+    model.load_state_dict(state["model"])
+    optimizer.load_state_dict(state["optimizer"])
+    scheduler.load_state_dict(state["scheduler"])
+    _set_rng_state(state["rng"])
+    return state["epoch"] + 1, state["best_val_loss"], state["epochs_no_improve"]
+
+
+def check_run_config(saved, current, path):
+    """Refuse to resume a state saved by a run set up differently (world size, data, batching)"""
+    saved = saved or {}
+    changed = sorted(key for key in set(saved) | set(current) if saved.get(key) != current.get(key))
+    if changed:
+        details = ", ".join(f"{key}: {saved.get(key)!r} -> {current.get(key)!r}" for key in changed)
+        raise ValueError(f"{path} was saved by a differently configured run ({details}); "
+                         "rerun with the same settings or start over without resuming")
+
+
+def train(model, train_loader, val_loader, criterion, optimizer, scheduler, device,
+          num_epochs=50, save_path="outputs/best_model.pth", bf16=False, channels_last=True,
+          accumulation_steps=1, activation_checkpointing=False, state_path=TRAIN_STATE_PATH,
+          resume=True, export_model=None, bundle_metadata=None, run_config=None):
+    """
+    Train with early stopping, publishing the best model by validation loss.
+
+    Under torch.distributed, ``model`` is the DDP-wrapped module and the
+    training loader uses a DistributedSampler. Training metrics are summed
+    over ranks; validation, checkpointing, logging and printing happen on
+    rank 0 only, and the validation result is broadcast so every rank steps
+    the scheduler and stops early identically.
+
+    Args:
+        model: Module to train
+        train_loader, val_loader: Training and validation batches (val_loader
+            is only used on rank 0)
+        criterion: Loss function
+        optimizer: Optimizer over the trainable parameters
+        scheduler: ReduceLROnPlateau-style scheduler stepped on validation loss
+        device: Training device
+        num_epochs: Maximum number of epochs
+        save_path: Checkpoint the best model is published to
+        bf16: Run forward passes under bfloat16 autocast (fast on CPUs with AVX512-BF16/AMX)
+        channels_last: Use the NHWC memory format for the model and 4-D inputs
+        accumulation_steps: Batches whose gradients are summed before each optimizer step
+        activation_checkpointing: Recompute layer4 activations in backward to save memory
+        state_path: Full-state checkpoint written after every epoch (None disables it)
+        resume: Continue from ``state_path`` if it exists
+        export_model: Module whose weights are published (default: model)
+        bundle_metadata: Serving metadata published with the weights as a model
+            bundle (see utilss/model_bundle.py); None publishes the checkpoint only
+        run_config: Settings a resumed run must share with the interrupted one
+            (world size, data source, batch size, ...); stored in the state file
+            and compared on resume
+    """
+    export_model = export_model if export_model is not None else model
+    memory_format = torch.channels_last if channels_last else torch.contiguous_format
+    model.to(device, memory_format=memory_format)
+    if activation_checkpointing:
+        enable_activation_checkpointing(model)
+
+    best_val_loss = float('inf')
+    patience = 5
+    epochs_no_improve = 0
+    start_epoch = 1
+    # ♻️ Only rank 0 writes the state file, so only rank 0 reads it; ranks on
+    # other nodes (no shared outputs/) get it by broadcast and resume at the
+    # same epoch with the same weights, keeping the collectives in step
+    state = None
+    if resume and state_path and is_main_process() and os.path.exists(state_path):
+        state = torch.load(state_path, map_location="cpu", weights_only=False)
+    state = broadcast_object(state)
+    if state is not None:
+        if run_config is not None:
+            check_run_config(state.get("run_config"), run_config, state_path)
+        start_epoch, best_val_loss, epochs_no_improve = load_train_state(
+            state_path, model, optimizer, scheduler, device, state=state)
+        del state
+        if is_main_process():
+            print(f"♻️ Resuming from {state_path} at epoch {start_epoch}")
+
+    main_process = is_main_process()
+    writer = SummaryWriter(log_dir="logs") if main_process else None
+    sampler = getattr(train_loader, "sampler", None)
+    # Rank 0 validates on the unwrapped module: a DDP forward may sync buffers,
+    # a collective the other ranks would never join
+    eval_model = model.module if isinstance(model, DistributedDataParallel) else model
+
+    def to_device(imgs, labels):
+        imgs = imgs.to(device, non_blocking=True)
+        if imgs.dim() == 4:
+            imgs = imgs.contiguous(memory_format=memory_format)
+        return imgs, labels.to(device, non_blocking=True)
+
+    def autocast():
+        return torch.autocast(device_type=device.type, dtype=torch.bfloat16, enabled=bf16)
+
+    for epoch in range(start_epoch, num_epochs + 1):
+        if isinstance(sampler, DistributedSampler):
+            sampler.set_epoch(epoch)  # new shuffle each epoch, same on every rank
+        model.train()
+        total_loss, correct, total = 0, 0, 0
+        train_start = time.perf_counter()
+
+        optimizer.zero_grad()
+        num_steps = len(train_loader)
+        for step, (imgs, labels) in enumerate(train_loader, 1):
+            imgs, labels = to_device(imgs, labels)
+            update = step % accumulation_steps == 0 or step == num_steps
+            # The last group of an epoch may be shorter than accumulation_steps
+            group_start = (step - 1) // accumulation_steps * accumulation_steps
+            group_size = min(accumulation_steps, num_steps - group_start)
+            # Under DDP, gradients of the micro-steps before an update stay
+            # local; only the last one allreduces the accumulated sum
+            sync = nullcontext() if update or not isinstance(model, DistributedDataParallel) \
+                else model.no_sync()
+            with sync:
+                with autocast():
+                    outputs = model(imgs)
+                    loss = criterion(outputs, labels)
+                (loss / group_size).backward()
+            if update:
+                optimizer.step()
+                optimizer.zero_grad()
+
+            total_loss += loss.item() * imgs.size(0)
+            correct += (outputs.argmax(1) == labels).sum().item()
+            total += imgs.size(0)
+
+        train_seconds = time.perf_counter() - train_start
+        total_loss, correct, total = all_reduce_sum([total_loss, correct, total])
+        avg_train_loss = total_loss / total
+        train_acc = correct / total
+
+        # 🧪 Validation (rank 0; the result is shared with the other ranks)
+        model.eval()
+        val_loss, val_correct, val_total = 0, 0, 0
+        val_start = time.perf_counter()
+        if main_process:
+            with torch.no_grad():
+                for imgs, labels in val_loader:
+                    imgs, labels = to_device(imgs, labels)
+                    with autocast():
+                        outputs = eval_model(imgs)
+                        loss = criterion(outputs, labels)
+                    val_loss += loss.item() * imgs.size(0)
+                    val_correct += (outputs.argmax(1) == labels).sum().item()
+                    val_total += imgs.size(0)
+        val_seconds = time.perf_counter() - val_start
+
+        if main_process and val_total == 0 and epoch == start_epoch:
+            print("⚠️ Validation split is empty; selecting and stopping on training loss")
+        if not main_process:
+            val_metrics = [0.0, 0.0]
+        elif val_total:
+            val_metrics = [val_loss / val_total, val_correct / val_total]
+        else:
+            val_metrics = [avg_train_loss, train_acc]
+        avg_val_loss, val_acc = broadcast_values(val_metrics)
+        train_throughput = total / train_seconds
+        val_throughput = val_total / val_seconds if main_process and val_seconds else 0.0
+
+        # 📈 TensorBoard
+        if main_process:
+            writer.add_scalar("Loss/train", avg_train_loss, epoch)
+            writer.add_scalar("Loss/val", avg_val_loss, epoch)
+            writer.add_scalar("Accuracy/train", train_acc, epoch)
+            writer.add_scalar("Accuracy/val", val_acc, epoch)
+            writer.add_scalar("Throughput/train", train_throughput, epoch)
+            writer.add_scalar("Throughput/val", val_throughput, epoch)
+
+        # 📉 Scheduler
+        scheduler.step(avg_val_loss)
+
+        # 💾 Publish the best model
+        if avg_val_loss < best_val_loss:
+            best_val_loss = avg_val_loss
+            if main_process:
+                publish_checkpoint(export_model.state_dict(), save_path,
+                                   metadata={"source": "train", "epoch": epoch,
+                                             "val_loss": round(avg_val_loss, 4),
+                                             "val_accuracy": round(val_acc, 4)},
+                                   bundle=bundle_metadata)
+            epochs_no_improve = 0
+        else:
+            epochs_no_improve += 1
+
+        if main_process:
+            print(f"\033[96m📘 Epoch {epoch:02d} | 🧮 Train Loss: {avg_train_loss:.4f} | 🎯 Train Acc: {train_acc:.4f}"
+                  f" || 🧪 Val Loss: {avg_val_loss:.4f} | ✅ Val Acc: {val_acc:.4f}\033[0m")
+            print(f"⚡ Throughput: train {train_throughput:.1f} img/s ({train_seconds:.1f}s)"
+                  f" | val {val_throughput:.1f} img/s ({val_seconds:.1f}s)")
+
+        # 💾 Full state after every epoch so an interrupted run resumes here
+        if state_path and main_process:
+            save_train_state(state_path, model, optimizer, scheduler, epoch,
+                             best_val_loss, epochs_no_improve, run_config=run_config)
+
+        # ⛔ Early stopping
+        if epochs_no_improve >= patience:
+            if main_process:
+                print(
+                    f"\n⛔ Early stopping triggered after {epoch} epochs (no val improvement in {patience} rounds).\n")
+            break
+
+    # ✅ The run is complete; the next one starts fresh
+    if main_process:
+        if state_path and os.path.exists(state_path):
+            os.remove(state_path)
+        writer.close()
@@ -0,0 +1,72 @@
+# train_small_model.py
+"""
+Train the MobileNetV3-small first stage used by cascade inference.
+
+Usage:
+    python train_small_model.py [--epochs 30]
+
+Then calibrate its thresholds with: python calibrate_cascade.py
+"""
+import argparse
+
+import torch
+from torch.optim.lr_scheduler import ReduceLROnPlateau
+from torch.utils.data import Subset, random_split
+
+from data.dataloader import AnimalDataset, train_transform
+from data.loaders import make_loader, tune_loader
+from evaluate import evaluate
+from model import SmallAnimalCNN
+from train import train
+from utilss.cascade import SMALL_MODEL_PATH
+from utilss.model_bundle import bundle_metadata
+from utilss.preprocess import Preprocessor, load_image
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the cascade's first-stage model")
+    parser.add_argument("--dataset", default="dataset")
+    parser.add_argument("--output", default=SMALL_MODEL_PATH)
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--bf16", action="store_true")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the split (matches main.py)")
+    args = parser.parse_args()
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    # 📦 Same seeded 70/15/15 split as main.py; val/test without augmentation
+    dataset = AnimalDataset(args.dataset, train_transform())
+    eval_dataset = AnimalDataset(args.dataset, transform=Preprocessor(), loader=load_image)
+    class_names = list(dataset.class_map.keys())
+    train_size = int(0.7 * len(dataset))
+    val_size = int(0.15 * len(dataset))
+    train_set, val_set, test_set = random_split(
+        dataset, [train_size, val_size, len(dataset) - train_size - val_size],
+        generator=torch.Generator().manual_seed(args.seed))
+    val_set = Subset(eval_dataset, val_set.indices)
+    test_set = Subset(eval_dataset, test_set.indices)
+
+    train_loader = make_loader(train_set, batch_size=64, shuffle=True, name="train")
+    eval_config = tune_loader(val_set, batch_sizes=(64, 128, 256))
+    val_loader = make_loader(val_set, config=eval_config, name="val")
+    test_loader = make_loader(test_set, config=eval_config, name="test")
+
+    # 🧠 Small model
+    model = SmallAnimalCNN(num_classes=len(class_names)).to(device)
+    loss_fn = torch.nn.CrossEntropyLoss()
+    optimizer = torch.optim.Adam([p for p in model.parameters() if p.requires_grad], lr=args.lr)
+    scheduler = ReduceLROnPlateau(optimizer, mode='min', factor=0.5, patience=3)
+
+    print("\n🚀 Training first-stage model...\n")
+    train(model, train_loader, val_loader, loss_fn, optimizer, scheduler, device,
+          num_epochs=args.epochs, save_path=args.output, bf16=args.bf16,
+          state_path="outputs/train_state_small.pt",
+          bundle_metadata=bundle_metadata(class_names, dataset.fingerprint, architecture="SmallAnimalCNN"))
+
+    print("\n📊 Evaluating first-stage model...\n")
+    evaluate(model, test_loader, class_names, show_plot=False)
+
+
+if __name__ == "__main__":
+    main()
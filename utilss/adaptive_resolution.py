@@ -0,0 +1,160 @@
+"""
+Adaptive-Resolution Inference
+Serve smaller inputs when the queue is deep or a low-resolution pass is already confident
+"""
+
+import threading
+from collections import Counter
+from typing import Callable, Optional, Sequence
+
+import torch
+import torch.nn.functional as F
+
+from utilss.preprocess import INPUT_SIZE
+
+RESOLUTIONS = (224, 160, 128)
+QUEUE_DEPTHS = (8, 32)
+
+
+class ResolutionPolicy:
+    """
+    Pick the forward-pass input size from the current load.
+
+    ``sizes`` run from full resolution downwards and ``queue_depths`` are
+    the (ascending) queue depths at which the next smaller size kicks in:
+    with the defaults, batches run at 224 below 8 queued requests, at 160
+    from 8 and at 128 from 32.
+
+    With ``first_pass_size`` set, even an idle server first runs at that
+    size and only re-runs the rows whose confidence is below
+    ``min_confidence`` at full resolution. Re-runs are skipped once the
+    queue reaches the last depth, where latency matters more than accuracy.
+    """
+
+    def __init__(self, sizes: Sequence[int] = RESOLUTIONS, queue_depths: Sequence[int] = QUEUE_DEPTHS,
+                 first_pass_size: Optional[int] = None, min_confidence: float = 0.9):
+        sizes = sorted(sizes, reverse=True)
+        if len(queue_depths) != len(sizes) - 1:
+            raise ValueError("queue_depths needs exactly one entry per size below full resolution")
+        self.sizes = sizes
+        self.queue_depths = sorted(queue_depths)
+        self.first_pass_size = first_pass_size
+        self.min_confidence = min_confidence
+
+    @property
+    def full_size(self) -> int:
+        return self.sizes[0]
+
+    def size_for(self, queue_depth: int) -> int:
+        """Input size for a batch taken while ``queue_depth`` requests wait behind it"""
+        size = self.sizes[sum(queue_depth >= depth for depth in self.queue_depths)]
+        if self.first_pass_size is not None:
+            size = min(size, self.first_pass_size)
+        return size
+
+    def allow_rerun(self, queue_depth: int) -> bool:
+        """Whether low-confidence rows may be re-run at full resolution"""
+        return self.first_pass_size is not None and \
+            (not self.queue_depths or queue_depth < self.queue_depths[-1])
+
+    def as_dict(self) -> dict:
+        return {
+            "sizes": self.sizes,
+            "queue_depths": self.queue_depths,
+            "first_pass_size": self.first_pass_size,
+            "min_confidence": self.min_confidence,
+        }
+
+
+def resize_batch(batch: torch.Tensor, size: int) -> torch.Tensor:
+    """Downscale a normalized ``(N, C, H, W)`` batch to ``size`` x ``size``."""
+    if batch.shape[-1] == size and batch.shape[-2] == size:
+        return batch
+    return F.interpolate(batch, size=(size, size), mode="bilinear", align_corners=False,
+                         antialias=True)
+
+
+class AdaptiveResolutionModel:
+    """
+    Forward callable that runs each batch at the size the policy picks.
+
+    Requests are still decoded at full resolution (so micro-batches always
+    stack); the whole batch is downscaled before the forward pass, which is
+    far cheaper than the convolutions it saves. The backbone ends in
+    adaptive average pooling, so any input size yields the same logits shape.
+
+    With ``with_sizes`` the call returns ``(logits, sizes)``, the input size
+    each row was finally computed at, so callers can tell degraded results
+    apart (e.g. to keep them out of the prediction cache).
+    """
+
+    def __init__(self, model: Callable[[torch.Tensor], torch.Tensor],
+                 policy: ResolutionPolicy, queue_depth_fn: Callable[[], int],
+                 with_sizes: bool = False):
+        """
+        Args:
+            model: Forward callable at any input size (ModelManager, CascadeModel, ...)
+            policy: Resolution policy
+            queue_depth_fn: Current number of queued requests (e.g. MicroBatcher.queue_depth)
+            with_sizes: Also return the per-row input sizes
+        """
+        self.model = model
+        self.policy = policy
+        self.queue_depth_fn = queue_depth_fn
+        self.with_sizes = with_sizes
+        self._lock = threading.Lock()
+        self._rows_by_size = Counter()
+        self.reruns = 0
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        depth = self.queue_depth_fn()
+        size = self.policy.size_for(depth)
+        logits = self.model(resize_batch(batch, size)).float()
+
+        sizes = [size] * len(batch)
+        rerun = 0
+        if size < self.policy.full_size and self.policy.allow_rerun(depth):
+            confidence = torch.softmax(logits, dim=1).max(dim=1).values
+            rows = (confidence < self.policy.min_confidence).nonzero(as_tuple=True)[0]
+            if len(rows):
+                logits = logits.clone()
+                logits[rows] = self.model(resize_batch(batch[rows], self.policy.full_size)).float()
+                rerun = len(rows)
+                for row in rows.tolist():
+                    sizes[row] = self.policy.full_size
+
+        with self._lock:
+            self._rows_by_size[size] += len(batch)
+            self.reruns += rerun
+        return (logits, sizes) if self.with_sizes else logits
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = sum(self._rows_by_size.values())
+            return {
+                "policy": self.policy.as_dict(),
+                "rows_by_size": {str(size): count for size, count in sorted(self._rows_by_size.items())},
+                "reruns": self.reruns,
+                "rerun_rate": round(self.reruns / rows, 4) if rows else None,
+            }
+
+
+def policy_from_env(environ) -> Optional[ResolutionPolicy]:
+    """
+    Build the serving policy from environment variables (None when disabled).
+
+    ANIMAL_ADAPTIVE_RESOLUTION=1 enables it; ANIMAL_RESOLUTIONS ("224,160,128"),
+    ANIMAL_RESOLUTION_QUEUE_DEPTHS ("8,32"), ANIMAL_RESOLUTION_FIRST_PASS (0 = off)
+    and ANIMAL_RESOLUTION_MIN_CONFIDENCE (0.9) tune it. Pick the values from
+    the curve printed by resolution_sweep.py.
+    """
+    if environ.get("ANIMAL_ADAPTIVE_RESOLUTION", "0") != "1":
+        return None
+    sizes = [int(s) for s in environ.get("ANIMAL_RESOLUTIONS", ",".join(map(str, RESOLUTIONS))).split(",")]
+    depths = [int(d) for d in environ.get("ANIMAL_RESOLUTION_QUEUE_DEPTHS",
+                                          ",".join(map(str, QUEUE_DEPTHS))).split(",") if d]
+    if max(sizes) != INPUT_SIZE:
+        raise ValueError(f"ANIMAL_RESOLUTIONS must include the decode size {INPUT_SIZE}")
+    return ResolutionPolicy(sizes, depths,
+                            first_pass_size=int(environ.get("ANIMAL_RESOLUTION_FIRST_PASS", "0")) or None,
+                            min_confidence=float(environ.get("ANIMAL_RESOLUTION_MIN_CONFIDENCE", "0.9")))
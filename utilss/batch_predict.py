@@ -0,0 +1,159 @@
+"""
+Batch Prediction Utilities
+Unpacks multi-file and archive uploads and streams batched predictions as NDJSON
+"""
+
+import asyncio
+import json
+import tarfile
+import zipfile
+from concurrent.futures import Executor
+from itertools import islice
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import torch
+
+IMAGE_EXTENSIONS = ('png', 'jpg', 'jpeg')
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+
+def is_image_name(name: str) -> bool:
+    """Return True if the file name looks like a supported image."""
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def is_archive_name(name: str) -> bool:
+    """Return True if the file name looks like a zip or tar archive."""
+    return (name or "").lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def _too_large(size: Optional[int], max_bytes: Optional[int]) -> bool:
+    return max_bytes is not None and size is not None and size > max_bytes
+
+
+def iter_archive_images(fileobj, filename: str,
+                        max_bytes: Optional[int] = None) -> Iterator[Tuple[str, Optional[bytes]]]:
+    """
+    Yield ``(member_name, bytes)`` for every image inside a zip or tar archive.
+
+    Members are read one at a time, so only a single image is held in memory.
+    Members larger than ``max_bytes`` (by their archive entry) are not
+    extracted and are yielded with ``None`` instead of their bytes.
+
+    Args:
+        fileobj: Seekable binary file object holding the archive
+        filename: Original upload name, used to pick the archive format
+        max_bytes: Largest member extracted (None for no limit)
+    """
+    if filename.lower().endswith('.zip') or zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and is_image_name(info.filename):
+                    if _too_large(info.file_size, max_bytes):
+                        yield info.filename, None
+                    else:
+                        yield info.filename, archive.read(info)
+        return
+
+    fileobj.seek(0)
+    # "r|*" reads the tar as a forward-only stream (no member index kept)
+    with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+        for member in archive:
+            if member.isfile() and is_image_name(member.name):
+                if _too_large(member.size, max_bytes):
+                    yield member.name, None
+                else:
+                    yield member.name, archive.extractfile(member).read()
+
+
+def iter_upload_images(uploads: Iterable,
+                       max_bytes: Optional[int] = None) -> Iterator[Tuple[str, Optional[bytes]]]:
+    """
+    Yield ``(name, bytes)`` for every image in a list of uploaded files.
+
+    Archives are expanded in place; plain files are passed through as-is.
+    Images larger than ``max_bytes`` are yielded with ``None`` and reported
+    as per-file errors by stream_batch_predictions().
+
+    Args:
+        uploads: Starlette ``UploadFile`` objects
+        max_bytes: Largest single image read (None for no limit)
+    """
+    for upload in uploads:
+        name = upload.filename or "upload"
+        if is_archive_name(name):
+            yield from iter_archive_images(upload.file, name, max_bytes)
+        elif _too_large(getattr(upload, "size", None), max_bytes):
+            yield name, None
+        else:
+            upload.file.seek(0)
+            yield name, upload.file.read()
+
+
+def _decode(decode_fn: Callable[[bytes], torch.Tensor], data: Optional[bytes]):
+    if data is None:
+        return None, "Error processing image: file exceeds the upload size limit"
+    try:
+        return decode_fn(data), None
+    except Exception as e:
+        return None, f"Error processing image: {e}"
+
+
+async def stream_batch_predictions(
+    items: Iterable[Tuple[str, Optional[bytes]]],
+    decode_fn: Callable[[bytes], torch.Tensor],
+    forward_fn: Callable[[torch.Tensor], torch.Tensor],
+    format_fn: Callable[[torch.Tensor], Dict[str, Any]],
+    batch_size: int = 16,
+    executor: Optional[Executor] = None,
+) -> AsyncIterator[str]:
+    """
+    Decode and classify images chunk by chunk, yielding one JSON line per image.
+
+    At most ``batch_size`` images are read, decoded and held at a time, so
+    memory stays bounded regardless of how many images the upload contains.
+
+    Args:
+        items: ``(name, bytes)`` pairs, e.g. from iter_upload_images()
+        decode_fn: Turns raw image bytes into a ``(C, H, W)`` tensor
+        forward_fn: Runs a ``(N, C, H, W)`` batch through the model; coroutine
+            functions are awaited directly, plain functions run on ``executor``
+        format_fn: Turns one output row into the /predict response dict
+        batch_size: Images decoded and classified together
+        executor: Thread pool used for reading, decoding and plain forward functions
+
+    Yields:
+        NDJSON lines of the form ``{"file": ..., **prediction}`` or ``{"file": ..., "error": ...}``
+    """
+    loop = asyncio.get_running_loop()
+    iterator = iter(items)
+
+    while True:
+        chunk = await loop.run_in_executor(
+            executor, lambda: list(islice(iterator, batch_size)))
+        if not chunk:
+            break
+
+        # 🖼️ Decode the whole chunk in parallel
+        names = [name for name, _ in chunk]
+        decoded = await asyncio.gather(*(
+            loop.run_in_executor(executor, _decode, decode_fn, data)
+            for _, data in chunk))
+        del chunk  # drop raw bytes as soon as they are decoded
+
+        tensors = [tensor for tensor, _ in decoded if tensor is not None]
+        outputs = iter(())
+        if tensors:
+            batch = torch.stack(tensors)
+            if asyncio.iscoroutinefunction(forward_fn):
+                outputs = iter(await forward_fn(batch))
+            else:
+                outputs = iter(await loop.run_in_executor(executor, forward_fn, batch))
+
+        for name, (tensor, error) in zip(names, decoded):
+            if tensor is None:
+                result = {"file": name, "error": error}
+            else:
+                result = {"file": name, **format_fn(next(outputs))}
+            yield json.dumps(result) + "\n"
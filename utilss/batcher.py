@@ -0,0 +1,155 @@
+"""
+Dynamic Micro-Batching
+Collects single-image inference requests into batched forward passes
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Tuple
+
+import torch
+
+
+class MicroBatcher:
+    """
+    Gather concurrent single-image requests into one batched forward pass.
+
+    Callers submit preprocessed ``(C, H, W)`` tensors. A worker thread takes
+    the first queued item, then keeps collecting until ``max_batch_size``
+    items are gathered or ``max_wait_ms`` has elapsed, runs one forward pass
+    and hands each caller its own row of the output.
+
+    A ``forward_fn`` may also return a tuple of per-row sequences (e.g.
+    logits and the input size each row ran at); callers then receive the
+    tuple of their own rows.
+    """
+
+    def __init__(self, forward_fn: Callable[[torch.Tensor], torch.Tensor],
+                 max_batch_size: int = 16, max_wait_ms: float = 5.0,
+                 num_workers: int = 1, name: str = "micro-batcher"):
+        """
+        Args:
+            forward_fn: Callable mapping a ``(N, C, H, W)`` batch to ``(N, K)`` outputs
+            max_batch_size: Largest batch handed to ``forward_fn``
+            max_wait_ms: Longest time the first request of a batch waits for company
+            num_workers: Number of threads running forward passes
+            name: Prefix for the worker thread names
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.forward_fn = forward_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.0
+        self.num_workers = max(num_workers, 1)
+        self.name = name
+
+        self._queue: "queue.Queue[Tuple[torch.Tensor, Future]]" = queue.Queue()
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+        # 📊 Running counters, exposed through stats()
+        self.batches_run = 0
+        self.items_run = 0
+
+    def start(self):
+        """Start the worker threads (called lazily on first submit)."""
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(self.num_workers):
+                worker = threading.Thread(
+                    target=self._run, name=f"{self.name}-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def stop(self):
+        """Stop the worker threads once the queue has drained."""
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for _ in workers:
+            self._queue.put(None)
+        for worker in workers:
+            worker.join()
+
+    def submit(self, tensor: torch.Tensor) -> Future:
+        """
+        Queue one preprocessed image tensor.
+
+        Args:
+            tensor: Image tensor of shape ``(C, H, W)``
+
+        Returns:
+            Future resolving to the output row of shape ``(K,)``
+        """
+        if not self._workers:
+            self.start()
+        future = Future()
+        self._queue.put((tensor, future))
+        return future
+
+    async def predict(self, tensor: torch.Tensor) -> torch.Tensor:
+        """Awaitable wrapper around submit() for async request handlers."""
+        return await asyncio.wrap_future(self.submit(tensor))
+
+    def queue_depth(self) -> int:
+        """Number of requests waiting for a batch slot."""
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        """Return batching counters."""
+        return {
+            "batches": self.batches_run,
+            "items": self.items_run,
+            "avg_batch_size": round(self.items_run / self.batches_run, 2) if self.batches_run else 0.0,
+            "queue_depth": self.queue_depth(),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+
+    def _collect(self, first) -> list:
+        """Gather items after ``first`` until the batch is full or the wait expires."""
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 \
+                    else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the shutdown marker back for after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch = [item for item in self._collect(first)
+                     if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                inputs = torch.stack([tensor for tensor, _ in batch])
+                with torch.no_grad():
+                    outputs = self.forward_fn(inputs)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            with self._lock:
+                self.batches_run += 1
+                self.items_run += len(batch)
+            rows = zip(*outputs) if isinstance(outputs, tuple) else outputs
+            for row, (_, future) in zip(rows, batch):
+                future.set_result(row)
@@ -0,0 +1,181 @@
+"""
+Cascade Inference
+A small first-stage model answers confident requests; the rest escalate to the full model
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import torch
+
+SMALL_MODEL_PATH = "outputs/small_model.pth"
+THRESHOLDS_PATH = "outputs/cascade_thresholds.json"
+NEVER = 1.01  # threshold above any softmax probability: always escalate
+
+
+def calibrate_thresholds(y_true: np.ndarray, y_pred: np.ndarray, confidence: np.ndarray,
+                         num_classes: int, target_accuracy: float = 0.95,
+                         min_samples: int = 20) -> List[float]:
+    """
+    Per-class confidence thresholds for the first stage.
+
+    For every predicted class, the threshold is the lowest confidence at
+    which the first stage's answers for that class (those at or above the
+    threshold) are still at least ``target_accuracy`` correct. Classes with
+    fewer than ``min_samples`` accepted predictions always escalate.
+
+    Args:
+        y_true, y_pred, confidence: First-stage results on a held-out split
+            (as returned by evaluate.predict_with_confidence)
+        num_classes: Number of classes
+        target_accuracy: Required accuracy of first-stage answers per class
+        min_samples: Smallest accepted set a threshold may be based on
+
+    Returns:
+        One threshold per class index
+    """
+    thresholds = []
+    for class_idx in range(num_classes):
+        mask = y_pred == class_idx
+        conf = confidence[mask]
+        correct = (y_true[mask] == class_idx)
+        order = np.argsort(-conf)
+        conf, correct = conf[order], correct[order]
+        # Accuracy of the top-k most confident predictions, for every k
+        running = np.cumsum(correct) / np.arange(1, len(correct) + 1)
+        ok = np.flatnonzero((running >= target_accuracy) & (np.arange(1, len(correct) + 1) >= min_samples))
+        thresholds.append(float(conf[ok[-1]]) if len(ok) else NEVER)
+    return thresholds
+
+
+def simulate_cascade(y_true: np.ndarray, small_pred: np.ndarray, small_conf: np.ndarray,
+                     full_pred: np.ndarray, thresholds: Sequence[float]) -> Dict[str, float]:
+    """Accuracy and escalation rate the cascade would have had on a labelled split."""
+    accept = small_conf >= np.asarray(thresholds)[small_pred]
+    cascade_pred = np.where(accept, small_pred, full_pred)
+    return {
+        "cascade_accuracy": float((cascade_pred == y_true).mean()),
+        "small_accuracy": float((small_pred == y_true).mean()),
+        "full_accuracy": float((full_pred == y_true).mean()),
+        "escalation_rate": float(1.0 - accept.mean()),
+    }
+
+
+def save_thresholds(path: str, thresholds: Sequence[float], class_names: Sequence[str], **info):
+    record = {
+        "calibrated_at": datetime.now(timezone.utc).isoformat(),
+        "classes": list(class_names),
+        "thresholds": [round(t, 6) for t in thresholds],
+        **info,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
+    return record
+
+
+def load_thresholds(path: str, class_names: Sequence[str]) -> Dict:
+    with open(path, "r", encoding="utf-8") as f:
+        record = json.load(f)
+    if record["classes"] != list(class_names):
+        raise ValueError(f"{path} was calibrated for different classes; rerun calibrate_cascade.py")
+    return record
+
+
+def calibration_version(record: Dict) -> str:
+    """Short path-safe ID of a calibration (hash of its thresholds and calibration time)."""
+    payload = json.dumps([record["thresholds"], record.get("calibrated_at")])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:8]
+
+
+class _LatencyStats:
+    def __init__(self):
+        self.batches = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, rows: int, ms: float):
+        self.batches += 1
+        self.rows += rows
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def as_dict(self) -> dict:
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch_ms": round(self.total_ms / self.batches, 3) if self.batches else None,
+            "max_batch_ms": round(self.max_ms, 3),
+        }
+
+
+class CascadeModel:
+    """
+    Two-tier forward callable for the inference executor.
+
+    Every batch goes through the small model first. Rows whose top softmax
+    probability reaches the threshold of their predicted class are answered
+    with the small model's logits; the remaining rows are gathered into one
+    sub-batch for the full model and their logits substituted in place.
+    """
+
+    def __init__(self, small_model: Callable[[torch.Tensor], torch.Tensor],
+                 full_model: Callable[[torch.Tensor], torch.Tensor],
+                 thresholds: Sequence[float], version: Optional[str] = None):
+        """
+        Args:
+            small_model: First-stage model
+            full_model: Escalation model (e.g. the ModelManager, so hot reloads still apply)
+            thresholds: Per-class confidence thresholds
+            version: Identifier of the small model + thresholds (used in cache keys)
+        """
+        self.small_model = small_model
+        self.full_model = full_model
+        self.thresholds = torch.tensor(thresholds, dtype=torch.float32)
+        self.version = version
+        self._lock = threading.Lock()
+        self._small = _LatencyStats()
+        self._full = _LatencyStats()
+        self.requests = 0
+        self.escalated = 0
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        start = time.perf_counter()
+        logits = self.small_model(batch).float()
+        confidence, pred = torch.softmax(logits, dim=1).max(dim=1)
+        escalate = confidence < self.thresholds.to(confidence.device)[pred]
+        small_ms = (time.perf_counter() - start) * 1000
+
+        full_ms = None
+        if escalate.any():
+            start = time.perf_counter()
+            rows = escalate.nonzero(as_tuple=True)[0]
+            logits = logits.clone()
+            logits[rows] = self.full_model(batch[rows]).float().to(logits.device)
+            full_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self.requests += len(batch)
+            self.escalated += int(escalate.sum())
+            self._small.add(len(batch), small_ms)
+            if full_ms is not None:
+                self._full.add(int(escalate.sum()), full_ms)
+        return logits
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "version": self.version,
+                "requests": self.requests,
+                "escalated": self.escalated,
+                "escalation_rate": round(self.escalated / self.requests, 4) if self.requests else None,
+                "small": self._small.as_dict(),
+                "full": self._full.as_dict(),
+            }
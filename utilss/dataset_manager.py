@@ -3,10 +3,25 @@ Dataset Management Utilities
 Handles dataset operations like class extraction, validation, and statistics
 """
 
+import json
 import os
-from typing import List, Dict, Tuple
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Dict, Optional, Tuple
+
+import numpy as np
 from PIL import Image, UnidentifiedImageError
 
+IMAGE_EXTENSIONS = ('png', 'jpg', 'jpeg', 'gif')
+STATS_VERSION = 2  # 2: header-only entries come from a full decode, not verify() alone
+STATS_SIDE = 256  # images are reduced to roughly this size for channel statistics
+
+# (upper bound, label) buckets for the histograms
+RESOLUTION_BUCKETS = [(128, "<128px"), (224, "128-223px"), (512, "224-511px"),
+                      (1024, "512-1023px"), (None, ">=1024px")]
+FILE_SIZE_BUCKETS = [(10 << 10, "<10KB"), (50 << 10, "10-50KB"), (200 << 10, "50-200KB"),
+                     (1 << 20, "200KB-1MB"), (None, ">=1MB")]
+
 
 def get_class_names_from_dataset(dataset_path: str = "dataset") -> List[str]:
     """
@@ -31,6 +46,171 @@ def get_class_names_from_dataset(dataset_path: str = "dataset") -> List[str]:
     return sorted(class_names)
 
 
+def stats_path_for(dataset_path: str) -> str:
+    """Scan cache stored next to the dataset folder, e.g. dataset_stats.json"""
+    dataset_path = os.path.abspath(dataset_path)
+    return os.path.join(os.path.dirname(dataset_path), f"{os.path.basename(dataset_path)}_stats.json")
+
+
+def _bucket(value: int, buckets: List[Tuple[Optional[int], str]]) -> str:
+    for upper, label in buckets:
+        if upper is None or value < upper:
+            return label
+    return buckets[-1][1]
+
+
+def _scan_image(img_path: str, channel_stats: bool) -> Dict[str, Any]:
+    """
+    Inspect one image in a worker process.
+
+    Without channel statistics verify() rejects obviously broken files
+    cheaply, then the image is fully decoded, because verify() does not
+    notice truncated JPEG data. Only new or changed files reach this, so the
+    decode is paid once per file. With channel statistics the image is
+    decoded at reduced size (JPEG draft mode) and per-channel sums of x and
+    x^2 are returned so the parent can combine them into an exact mean/std
+    over all sampled pixels.
+    """
+    try:
+        if not channel_stats:
+            with Image.open(img_path) as img:
+                img.verify()
+            with Image.open(img_path) as img:
+                img.load()
+                width, height = img.size
+            return {"valid": True, "width": width, "height": height}
+        with Image.open(img_path) as img:
+            width, height = img.size
+            img.draft("RGB", (STATS_SIDE, STATS_SIDE))
+            img = img.convert("RGB")
+            img.thumbnail((STATS_SIDE, STATS_SIDE))
+            pixels = np.asarray(img, dtype=np.float64).reshape(-1, 3) / 255.0
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError):
+        return {"valid": False}
+    return {
+        "valid": True,
+        "width": width,
+        "height": height,
+        "pixels": int(pixels.shape[0]),
+        "sum": pixels.sum(axis=0).tolist(),
+        "sumsq": np.square(pixels).sum(axis=0).tolist(),
+    }
+
+
+def _scan_image_star(args):
+    return _scan_image(*args)
+
+
+def _load_scan_cache(cache_path: str) -> Dict[str, Any]:
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("version") == STATS_VERSION:
+            return cache["files"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return {}
+
+
+def _save_scan_cache(cache_path: str, files: Dict[str, Any]):
+    fd, tmp_path = tempfile.mkstemp(prefix=".stats-", dir=os.path.dirname(cache_path) or ".")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"version": STATS_VERSION, "files": files}, f)
+    os.replace(tmp_path, cache_path)
+
+
+def _is_stale(entry: Optional[Dict[str, Any]], stat: os.stat_result, channel_stats: bool) -> bool:
+    if entry is None or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+        return True
+    # Header-only entries can't serve a channel-stats query
+    return channel_stats and entry["valid"] and "sum" not in entry
+
+
+def scan_dataset(dataset_path: str = "dataset", workers: Optional[int] = None,
+                 channel_stats: bool = True, cache_path: Optional[str] = None,
+                 refresh: bool = False) -> Dict[str, Any]:
+    """
+    Single parallel pass over the dataset that collects every statistic at once.
+
+    Per-file results are cached next to the dataset and keyed by size and
+    mtime, so later calls only stat the files and re-scan the ones that
+    changed.
+
+    Args:
+        dataset_path: Path to the dataset folder
+        workers: Worker processes (default: all cores)
+        channel_stats: Also compute per-channel mean/std (needs a reduced decode
+            per image; without it images are only header-verified)
+        cache_path: Scan cache file (default: next to dataset_path)
+        refresh: Ignore the cache and re-scan every image
+
+    Returns:
+        Dictionary with per-class counts, corrupted files, resolution and
+        file-size histograms and, if requested, channel mean/std
+    """
+    cache_path = cache_path or stats_path_for(dataset_path)
+    cached = {} if refresh else _load_scan_cache(cache_path)
+    class_names = get_class_names_from_dataset(dataset_path)
+
+    files, pending = {}, []
+    for class_name in class_names:
+        class_path = os.path.join(dataset_path, class_name)
+        for file in sorted(os.listdir(class_path)):
+            if not file.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            rel_path = f"{class_name}/{file}"
+            stat = os.stat(os.path.join(class_path, file))
+            entry = cached.get(rel_path)
+            if _is_stale(entry, stat, channel_stats):
+                entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+                pending.append((rel_path, entry))
+            entry["label"] = class_name
+            files[rel_path] = entry
+
+    if pending:
+        print(f"🔍 Scanning {len(pending)} image(s) with {workers or os.cpu_count()} process(es)...")
+        jobs = [(os.path.join(dataset_path, rel_path), channel_stats) for rel_path, _ in pending]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_scan_image_star, jobs, chunksize=max(1, len(jobs) // 256))
+            for (_, entry), result in zip(pending, results):
+                entry.update(result)
+    if pending or len(files) != len(cached):
+        _save_scan_cache(cache_path, files)
+
+    classes = {class_name: 0 for class_name in class_names}
+    corrupted = []
+    resolution_hist = {label: 0 for _, label in RESOLUTION_BUCKETS}
+    size_hist = {label: 0 for _, label in FILE_SIZE_BUCKETS}
+    pixel_count, channel_sum, channel_sumsq = 0, np.zeros(3), np.zeros(3)
+    for rel_path, entry in files.items():
+        if not entry["valid"]:
+            corrupted.append(os.path.join(dataset_path, rel_path))
+            continue
+        classes[entry["label"]] += 1
+        resolution_hist[_bucket(min(entry["width"], entry["height"]), RESOLUTION_BUCKETS)] += 1
+        size_hist[_bucket(entry["size"], FILE_SIZE_BUCKETS)] += 1
+        if channel_stats:
+            pixel_count += entry["pixels"]
+            channel_sum += entry["sum"]
+            channel_sumsq += entry["sumsq"]
+
+    result = {
+        "classes": classes,
+        "total_images": sum(classes.values()),
+        "corrupted": corrupted,
+        "resolution_histogram": resolution_hist,
+        "file_size_histogram": size_hist,
+        "channel_mean": None,
+        "channel_std": None,
+    }
+    if channel_stats and pixel_count:
+        mean = channel_sum / pixel_count
+        std = np.sqrt(np.maximum(channel_sumsq / pixel_count - mean ** 2, 0.0))
+        result["channel_mean"] = [round(float(v), 4) for v in mean]
+        result["channel_std"] = [round(float(v), 4) for v in std]
+    return result
+
+
 def validate_dataset(dataset_path: str = "dataset") -> Dict[str, int]:
     """
     Validate dataset and return statistics.
@@ -41,26 +221,10 @@ def validate_dataset(dataset_path: str = "dataset") -> Dict[str, int]:
     Returns:
         Dictionary with class names as keys and image counts as values
     """
-    class_names = get_class_names_from_dataset(dataset_path)
-    stats = {}
-    
-    for class_name in class_names:
-        class_path = os.path.join(dataset_path, class_name)
-        valid_images = 0
-        
-        for file in os.listdir(class_path):
-            if file.lower().endswith(('png', 'jpg', 'jpeg', 'gif')):
-                img_path = os.path.join(class_path, file)
-                try:
-                    with Image.open(img_path) as img:
-                        img.convert("RGB")
-                    valid_images += 1
-                except (UnidentifiedImageError, OSError, SyntaxError):
-                    print(f"[Warning] Corrupted image: {img_path}")
-        
-        stats[class_name] = valid_images
-    
-    return stats
+    scan = scan_dataset(dataset_path, channel_stats=False)
+    for img_path in scan["corrupted"]:
+        print(f"[Warning] Corrupted image: {img_path}")
+    return scan["classes"]
 
 
 def print_dataset_stats(dataset_path: str = "dataset"):
@@ -73,8 +237,9 @@ def print_dataset_stats(dataset_path: str = "dataset"):
     print("📊 Dataset Statistics")
     print("=" * 50)
     
-    stats = validate_dataset(dataset_path)
-    total_images = sum(stats.values())
+    scan = scan_dataset(dataset_path)
+    stats = scan["classes"]
+    total_images = scan["total_images"]
     total_classes = len(stats)
     
     print(f"Total Classes: {total_classes}")
@@ -85,7 +250,25 @@ def print_dataset_stats(dataset_path: str = "dataset"):
     print("📁 Class Breakdown:")
     for class_name, count in stats.items():
         print(f"  {class_name}: {count} images")
-    
+    print()
+
+    if scan["corrupted"]:
+        print(f"⚠️ Corrupted Images: {len(scan['corrupted'])}")
+        for img_path in scan["corrupted"]:
+            print(f"  {img_path}")
+        print()
+
+    print("📐 Shorter Side:")
+    for label, count in scan["resolution_histogram"].items():
+        print(f"  {label}: {count}")
+    print("💾 File Size:")
+    for label, count in scan["file_size_histogram"].items():
+        print(f"  {label}: {count}")
+    if scan["channel_mean"] is not None:
+        print()
+        print(f"🎨 Channel Mean: {scan['channel_mean']}")
+        print(f"🎨 Channel Std:  {scan['channel_std']}")
+
     print("=" * 50)
 
 
@@ -0,0 +1,86 @@
+"""
+Distributed Training Helpers
+torch.distributed (gloo) setup and the few collectives the training loop needs
+
+Launch with torchrun, which sets RANK / WORLD_SIZE / LOCAL_RANK / MASTER_ADDR:
+    torchrun --standalone --nproc_per_node 8 main.py --ddp
+    torchrun --nnodes 2 --node_rank 0 --master_addr HOST --master_port 29500 \\
+             --nproc_per_node 32 main.py --ddp
+"""
+
+import os
+from typing import List, Sequence
+
+import torch
+import torch.distributed as dist
+
+from data.loaders import available_cpus
+
+
+def is_distributed() -> bool:
+    return dist.is_available() and dist.is_initialized()
+
+
+def get_rank() -> int:
+    return dist.get_rank() if is_distributed() else 0
+
+
+def get_world_size() -> int:
+    return dist.get_world_size() if is_distributed() else 1
+
+
+def is_main_process() -> bool:
+    return get_rank() == 0
+
+
+def init_distributed(backend: str = "gloo") -> int:
+    """
+    Join the process group described by torchrun's environment variables.
+
+    Each process gets an equal share of the machine's cores for its torch
+    intra-op threads, so N processes on one node don't oversubscribe it.
+
+    Returns:
+        This process's global rank
+    """
+    local_world_size = int(os.environ.get("LOCAL_WORLD_SIZE", os.environ.get("WORLD_SIZE", "1")))
+    torch.set_num_threads(max(1, available_cpus() // local_world_size))
+    dist.init_process_group(backend=backend)
+    return dist.get_rank()
+
+
+def cleanup():
+    if is_distributed():
+        dist.destroy_process_group()
+
+
+def barrier():
+    if is_distributed():
+        dist.barrier()
+
+
+def all_reduce_sum(values: Sequence[float]) -> List[float]:
+    """Element-wise sum of ``values`` over all ranks (identity when not distributed)."""
+    if not is_distributed():
+        return list(values)
+    tensor = torch.tensor(values, dtype=torch.float64)
+    dist.all_reduce(tensor, op=dist.ReduceOp.SUM)
+    return tensor.tolist()
+
+
+def broadcast_values(values: Sequence[float], src: int = 0) -> List[float]:
+    """Every rank receives rank ``src``'s ``values`` (identity when not distributed)."""
+    if not is_distributed():
+        return list(values)
+    tensor = torch.tensor(values, dtype=torch.float64)
+    dist.broadcast(tensor, src=src)
+    return tensor.tolist()
+
+
+def broadcast_object(obj, src: int = 0):
+    """Rank ``src``'s picklable ``obj`` on every rank (identity when not distributed)."""
+    if not is_distributed():
+        return obj
+    objects = [obj]
+    dist.broadcast_object_list(objects, src=src)
+    return objects[0]
@@ -0,0 +1,167 @@
+"""
+Embedding Store
+Cached 512-d penultimate embeddings of the dataset for head-only fine-tuning
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import zlib
+from typing import Optional
+
+import numpy as np
+import torch
+from torch.utils.data import Subset
+
+from data.loaders import make_loader
+
+EMBEDDING_DIR = "outputs/embeddings"
+INDEX_FILE = "index.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+HEAD_PREFIX = "base_model.fc."
+
+
+def backbone_fingerprint(model) -> str:
+    """Hash of every weight and buffer except the fc head."""
+    digest = hashlib.sha256()
+    for name, tensor in model.state_dict().items():
+        if not name.startswith(HEAD_PREFIX):
+            digest.update(name.encode())
+            digest.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+class EmbeddingStore:
+    """
+    Penultimate embeddings of every dataset image under one backbone.
+
+    Head-only updates leave the backbone untouched, so the store stays valid
+    across them and each sync only embeds images added since the last one
+    (typically the corrected images). When the backbone fingerprint changes,
+    e.g. after a full retrain, everything is embedded again. Rows follow the
+    order of ``dataset.samples`` and are looked up by path relative to the
+    dataset root; each row also records the image's content hash (from the
+    dataset manifest), so a file replaced under the same name is re-embedded.
+    """
+
+    def __init__(self, store_dir: str = EMBEDDING_DIR):
+        self.store_dir = store_dir
+        self.fingerprint: Optional[str] = None
+        self.paths = []
+        self.hashes = []
+        self.labels = np.zeros(0, dtype=np.int64)
+        self.embeddings = np.zeros((0, 512), dtype=np.float32)
+        self._index = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(os.path.join(self.store_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+                index = json.load(f)
+            embeddings = np.load(os.path.join(self.store_dir, EMBEDDINGS_FILE))
+        except (OSError, ValueError):
+            return
+        if len(index["paths"]) != len(embeddings):
+            return
+        self.fingerprint = index["fingerprint"]
+        self.paths = index["paths"]
+        # Stores written before hashes were recorded match nothing and are rebuilt
+        self.hashes = index.get("hashes") or [None] * len(self.paths)
+        self.labels = np.array(index["labels"], dtype=np.int64)
+        self.embeddings = embeddings
+        self._index = {path: i for i, path in enumerate(self.paths)}
+
+    def save(self):
+        os.makedirs(self.store_dir, exist_ok=True)
+        # Embeddings first, index last: a crash in between leaves a length mismatch, which load() rejects
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".npy", dir=self.store_dir)
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, self.embeddings)
+        os.replace(tmp_path, os.path.join(self.store_dir, EMBEDDINGS_FILE))
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=self.store_dir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, "paths": self.paths,
+                       "hashes": self.hashes, "labels": self.labels.tolist()}, f)
+        os.replace(tmp_path, os.path.join(self.store_dir, INDEX_FILE))
+
+    def __len__(self):
+        return len(self.paths)
+
+    def index_of(self, rel_path: str) -> Optional[int]:
+        """Row of an image given its path relative to the dataset root."""
+        return self._index.get(rel_path.replace(os.sep, "/"))
+
+    def holdout_mask(self, fraction: float = 0.1) -> np.ndarray:
+        """Stable held-out split: a path is held out based on a hash of its name."""
+        threshold = int(fraction * 1000)
+        return np.array([zlib.crc32(path.encode()) % 1000 < threshold for path in self.paths],
+                        dtype=bool)
+
+    def sync(self, model, dataset, batch_size: int = 64, tune: bool = True) -> int:
+        """
+        Bring the store in line with ``dataset`` under ``model``'s backbone.
+
+        A row is reused only if both its path and its content hash are
+        unchanged; new and replaced images are embedded.
+
+        Args:
+            model: AnimalCNN providing ``embed``
+            dataset: AnimalDataset yielding preprocessed tensors (its
+                ``hashes`` identify each sample's content)
+            batch_size: Embedding batch size
+            tune: Probe DataLoader settings (False: load in this thread, no
+                worker processes, as inside a server process)
+
+        Returns:
+            Number of images embedded by this call
+        """
+        fingerprint = backbone_fingerprint(model)
+        known = self._index if fingerprint == self.fingerprint else {}
+        rel_paths = [os.path.relpath(img_path, dataset.root_dir).replace(os.sep, "/")
+                     for img_path, _ in dataset.samples]
+        hashes = list(dataset.hashes)
+        reusable = {i: known[path] for i, (path, sha) in enumerate(zip(rel_paths, hashes))
+                    if path in known and self.hashes[known[path]] == sha}
+        missing = [i for i in range(len(rel_paths)) if i not in reusable]
+        if not missing and len(rel_paths) == len(self.paths):
+            return 0
+
+        embeddings = np.empty((len(rel_paths), self.embeddings.shape[1]), dtype=np.float32)
+        for i, row in reusable.items():
+            embeddings[i] = self.embeddings[row]
+
+        if missing:
+            device = next(model.parameters()).device
+            model.eval()
+            loader = make_loader(Subset(dataset, missing), batch_size=batch_size, tune=tune,
+                                 name="embed", report=len(missing) > batch_size)
+            offset = 0
+            with torch.no_grad():
+                for images, _ in loader:
+                    batch = model.embed(images.to(device)).cpu().numpy()
+                    embeddings[missing[offset:offset + len(batch)]] = batch
+                    offset += len(batch)
+
+        self.fingerprint = fingerprint
+        self.paths = rel_paths
+        self.hashes = hashes
+        self.labels = np.array([label for _, label in dataset.samples], dtype=np.int64)
+        self.embeddings = embeddings
+        self._index = {path: i for i, path in enumerate(rel_paths)}
+        self.save()
+        return len(missing)
+
+
+_default_store: Optional[EmbeddingStore] = None
+_default_lock = threading.Lock()
+
+
+def get_embedding_store() -> EmbeddingStore:
+    """Process-wide EmbeddingStore at EMBEDDING_DIR."""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = EmbeddingStore()
+        return _default_store
@@ -0,0 +1,177 @@
+"""
+Inference Backends
+Interchangeable runtimes for the trained AnimalCNN graph: eager PyTorch,
+TorchScript, ONNX Runtime and the INT8 TorchScript artifact
+
+Every backend is a callable mapping a ``(N, 3, H, W)`` float batch to
+``(N, num_classes)`` logits, so it can be handed straight to MicroBatcher.
+Heavy imports happen inside the backend that needs them, which lets the
+ONNX Runtime backend run without importing torch at all.
+"""
+
+import os
+from typing import Optional
+
+import numpy as np
+
+CHECKPOINT_PATH = "outputs/best_model.pth"
+TORCHSCRIPT_MODEL_PATH = "outputs/best_model.ts"
+ONNX_MODEL_PATH = "outputs/best_model.onnx"
+QUANTIZED_MODEL_PATH = "outputs/best_model_int8.pt"
+
+BACKEND_PATHS = {
+    "eager": CHECKPOINT_PATH,
+    "torchscript": TORCHSCRIPT_MODEL_PATH,
+    "onnxruntime": ONNX_MODEL_PATH,
+    "int8": QUANTIZED_MODEL_PATH,
+}
+BACKENDS = tuple(BACKEND_PATHS)
+
+
+class EagerBackend:
+    """Plain PyTorch AnimalCNN loaded from a state_dict checkpoint."""
+
+    name = "eager"
+
+    def __init__(self, num_classes: int, path: str = CHECKPOINT_PATH, device=None):
+        import torch
+        from model import load_inference_model
+        from utilss.model_bundle import current_bundle, read_bundle_metadata
+
+        self.device = device or torch.device("cpu")
+        self.path = path
+        # Memory-mapped bundle the weights are views of (None: read from the .pth)
+        self.bundle = current_bundle(path)
+        # Labels the weights were trained on (None: the caller's list applies)
+        self.class_names = read_bundle_metadata(self.bundle).get("classes") if self.bundle else None
+        self.model = load_inference_model(path, num_classes, self.device)
+
+    def __call__(self, batch):
+        return self.model(batch.to(self.device))
+
+
+class TorchScriptBackend:
+    """Frozen TorchScript module written by export_model.py."""
+
+    name = "torchscript"
+
+    def __init__(self, path: str = TORCHSCRIPT_MODEL_PATH, device=None):
+        import torch
+
+        self.device = device or torch.device("cpu")
+        self.path = path
+        self.model = torch.jit.load(path, map_location=self.device)
+        self.model.eval()
+
+    def __call__(self, batch):
+        return self.model(batch.to(self.device))
+
+
+class QuantizedBackend(TorchScriptBackend):
+    """INT8 TorchScript artifact written by quantize.py (CPU only)."""
+
+    name = "int8"
+
+    def __init__(self, path: str = QUANTIZED_MODEL_PATH, device=None):
+        import torch
+        from utilss.quantization import load_quantized_model
+
+        self.device = torch.device("cpu")
+        self.path = path
+        self.model = load_quantized_model(path)
+
+
+class OnnxRuntimeBackend:
+    """ONNX graph with a dynamic batch axis, executed by ONNX Runtime on CPU."""
+
+    name = "onnxruntime"
+
+    def __init__(self, path: str = ONNX_MODEL_PATH, num_threads: Optional[int] = None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.path = path
+        self.session = ort.InferenceSession(path, sess_options=options,
+                                            providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch):
+        """Run a numpy or torch batch; returns the same kind of array it was given."""
+        if isinstance(batch, np.ndarray):
+            return self.session.run(None, {self.input_name: batch.astype(np.float32, copy=False)})[0]
+
+        import torch
+        logits = self.session.run(None, {self.input_name: batch.detach().cpu().contiguous().numpy()})[0]
+        return torch.from_numpy(logits)
+
+
+def backend_path(name: str, root: str = ".") -> str:
+    """Artifact path a backend loads from."""
+    if name not in BACKEND_PATHS:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of {BACKENDS}")
+    return os.path.join(root, BACKEND_PATHS[name])
+
+
+def load_backend(name: str, num_classes: int, device=None, root: str = ".",
+                 num_threads: Optional[int] = None):
+    """
+    Build the inference backend selected by name.
+
+    Args:
+        name: One of BACKENDS
+        num_classes: Output classes (needed to rebuild the eager model)
+        device: Torch device for the eager and TorchScript backends
+        root: Directory the default artifact paths are relative to
+        num_threads: Intra-op threads for ONNX Runtime (torch backends use torch's setting)
+
+    Returns:
+        Callable backend instance
+    """
+    path = backend_path(name, root)
+    if name == "eager":
+        return EagerBackend(num_classes, path, device)
+    if name == "torchscript":
+        return TorchScriptBackend(path, device)
+    if name == "int8":
+        return QuantizedBackend(path)
+    return OnnxRuntimeBackend(path, num_threads)
+
+
+def check_parity(reference, backend, batch_sizes=(1, 4), atol: float = 1e-3,
+                 input_size: int = 224, seed: int = 0) -> float:
+    """
+    Compare a backend's logits against a reference backend on random inputs.
+
+    Args:
+        reference: Backend producing the expected logits (usually eager)
+        backend: Backend under test
+        batch_sizes: Batch sizes to try (exercises the dynamic batch axis)
+        atol: Maximum allowed absolute logit difference
+        input_size: Spatial input size
+        seed: Seed for the random inputs
+
+    Returns:
+        Largest absolute difference observed
+
+    Raises:
+        AssertionError: If any difference exceeds ``atol``
+    """
+    import torch
+
+    generator = torch.Generator().manual_seed(seed)
+    worst = 0.0
+    with torch.no_grad():
+        for batch_size in batch_sizes:
+            batch = torch.randn(batch_size, 3, input_size, input_size, generator=generator)
+            expected = torch.as_tensor(reference(batch)).float()
+            actual = torch.as_tensor(backend(batch)).float()
+            if expected.shape != actual.shape:
+                raise AssertionError(
+                    f"{backend.name}: shape {tuple(actual.shape)} != {tuple(expected.shape)}")
+            worst = max(worst, (expected - actual).abs().max().item())
+    if worst > atol:
+        raise AssertionError(f"{backend.name}: max |Δlogit| {worst:.2e} exceeds {atol:.0e}")
+    return worst
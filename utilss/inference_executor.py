@@ -0,0 +1,168 @@
+"""
+Inference Executor
+Keeps image decoding and model execution off the asyncio event loop
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional
+
+import torch
+
+from utilss.batcher import MicroBatcher
+
+
+def plan_threads(decode_workers: Optional[int] = None, model_workers: int = 1,
+                 cpu_count: Optional[int] = None) -> dict:
+    """
+    Split the host's cores between decode threads and torch intra-op threads.
+
+    Decode threads get roughly a quarter of the cores; the rest are shared
+    evenly by the model workers so that decode + model threads never exceed
+    the core count.
+
+    Args:
+        decode_workers: Decode pool size (default: a quarter of the cores)
+        model_workers: Number of threads running forward passes
+        cpu_count: Core count to plan for (default: os.cpu_count())
+
+    Returns:
+        Dictionary with decode_workers, model_workers and intra_op_threads
+    """
+    cores = cpu_count or os.cpu_count() or 1
+    model_workers = max(model_workers, 1)
+    if decode_workers is None:
+        decode_workers = max(1, cores // 4)
+    intra_op_threads = max(1, (cores - decode_workers) // model_workers)
+    return {
+        "decode_workers": decode_workers,
+        "model_workers": model_workers,
+        "intra_op_threads": intra_op_threads,
+    }
+
+
+class InferenceExecutor:
+    """
+    Dedicated thread pools for the two CPU-heavy halves of a prediction.
+
+    PIL decoding and transforms run on a decode pool, while forward passes
+    run on the micro-batcher's model workers. Async handlers only await the
+    results, so the event loop stays free for other requests.
+
+    With a ``buffer_factory``, decoded() writes each image into a reusable
+    preallocated input buffer. A decoded tensor outlives its decode call (it
+    waits in the batcher queue until stacked), so buffers are leased per
+    request and returned once the forward pass is done, rather than owned by
+    a decode thread that would overwrite them while still queued. A request
+    cancelled mid-way (e.g. its client left) only returns its buffer once
+    the decode thread and any batch that may still read it have finished.
+    """
+
+    def __init__(self, forward_fn: Callable[[torch.Tensor], torch.Tensor],
+                 decode_workers: Optional[int] = None, model_workers: int = 1,
+                 intra_op_threads: Optional[int] = None,
+                 max_batch_size: int = 16, max_wait_ms: float = 5.0,
+                 buffer_factory: Optional[Callable[[], torch.Tensor]] = None):
+        """
+        Args:
+            forward_fn: Callable mapping a ``(N, C, H, W)`` batch to ``(N, K)`` outputs
+            decode_workers: Size of the decode pool (default: see plan_threads())
+            model_workers: Number of forward-pass threads
+            intra_op_threads: Torch threads per forward pass (default: see plan_threads())
+            max_batch_size: Micro-batcher batch size limit
+            max_wait_ms: Micro-batcher wait limit in milliseconds
+            buffer_factory: Allocates one empty input buffer for decoded()
+                (e.g. utilss.preprocess.default_preprocessor.empty)
+        """
+        self.plan = plan_threads(decode_workers, model_workers)
+        if intra_op_threads:
+            self.plan["intra_op_threads"] = intra_op_threads
+
+        # 🧵 Pin torch's intra-op pool so decode + model threads fit the cores
+        torch.set_num_threads(self.plan["intra_op_threads"])
+
+        self.decode_pool = ThreadPoolExecutor(
+            max_workers=self.plan["decode_workers"], thread_name_prefix="decode")
+        self.batcher = MicroBatcher(
+            forward_fn, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms,
+            num_workers=self.plan["model_workers"], name="model")
+
+        # ♻️ Free input buffers; enough are kept for every decode thread plus
+        # the batches being formed and run
+        self.buffer_factory = buffer_factory
+        self._buffers: List[torch.Tensor] = []
+        self._buffers_lock = threading.Lock()
+        # Buffer data pointer -> futures that may still read or write the buffer
+        self._leases: Dict[int, list] = {}
+        self._max_free_buffers = self.plan["decode_workers"] + \
+            2 * max_batch_size * self.plan["model_workers"]
+
+    async def decode(self, fn: Callable, *args):
+        """Run a decode/transform function on the decode pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.decode_pool, fn, *args)
+
+    @asynccontextmanager
+    async def decoded(self, fn: Callable, *args):
+        """
+        Run ``fn(*args, out=buffer)`` on the decode pool with a leased input buffer.
+
+        The buffer goes back to the free list when the block exits, so keep
+        the forward pass that consumes the tensor inside the block. If the
+        block exits early (cancellation, errors), the buffer is held back
+        until the decode and every predict() it was submitted to are done.
+        Without a buffer_factory this is plain decode().
+        """
+        if self.buffer_factory is None:
+            yield await self.decode(fn, *args)
+            return
+
+        with self._buffers_lock:
+            buffer = self._buffers.pop() if self._buffers else None
+        if buffer is None:
+            buffer = self.buffer_factory()
+        key = buffer.data_ptr()
+        decode = self.decode_pool.submit(fn, *args, out=buffer)
+        lease = [decode]
+        with self._buffers_lock:
+            self._leases[key] = lease
+        try:
+            yield await asyncio.wrap_future(decode)
+        finally:
+            self._release(key, buffer, lease)
+
+    def _release(self, key: int, buffer: torch.Tensor, lease: list):
+        """Return a buffer to the free list once none of its lease's futures can touch it."""
+        with self._buffers_lock:
+            pending = next((future for future in lease if not future.done()), None)
+            if pending is None:
+                del self._leases[key]
+                if len(self._buffers) < self._max_free_buffers:
+                    self._buffers.append(buffer)
+                return
+        pending.add_done_callback(lambda _: self._release(key, buffer, lease))
+
+    async def predict(self, tensor: torch.Tensor) -> torch.Tensor:
+        """Classify one preprocessed ``(C, H, W)`` tensor on the model workers."""
+        future = self.batcher.submit(tensor)
+        with self._buffers_lock:
+            lease = self._leases.get(tensor.data_ptr())
+            if lease is not None:
+                lease.append(future)
+        return await asyncio.wrap_future(future)
+
+    async def forward_batch(self, batch: torch.Tensor) -> List[torch.Tensor]:
+        """Classify an already stacked batch, one output row per image."""
+        return await asyncio.gather(*(self.batcher.predict(t) for t in batch))
+
+    def stats(self) -> dict:
+        """Return thread layout and batching counters."""
+        return {**self.plan, **self.batcher.stats()}
+
+    def shutdown(self):
+        """Stop the model workers and the decode pool."""
+        self.batcher.stop()
+        self.decode_pool.shutdown(wait=True)
@@ -0,0 +1,251 @@
+"""
+Upload Ingestion
+Bounded upload buffering and header-only image checks before any pixel is decoded
+
+Every upload is streamed into a spooled buffer (in memory up to a few MB,
+on disk beyond) that refuses to grow past a byte limit, and its image
+header is read to check the format and pixel dimensions before decoding.
+Images above the pixel limits are rejected, or, for JPEGs, downscaled while
+decoding (libjpeg DCT scaling), so the memory and CPU one request can cost
+stay bounded no matter what is uploaded.
+"""
+
+import io
+import shutil
+import tempfile
+from typing import Optional, Sequence
+
+from PIL import Image, UnidentifiedImageError
+from starlette.exceptions import HTTPException
+
+CHUNK_SIZE = 64 * 1024
+ALLOWED_FORMATS = ("JPEG", "PNG", "WEBP", "BMP", "GIF")
+FORM_OVERHEAD_BYTES = 64 * 1024  # multipart boundaries and form fields around the file
+
+
+class UploadRejected(HTTPException):
+    """Upload refused by the ingestion limits (413 too large, 415 unsupported)."""
+
+
+class IngestLimits:
+    """
+    Per-request ingestion limits.
+
+    Args:
+        max_upload_bytes: Largest single image upload
+        max_batch_bytes: Largest /predict/batch request body (archives included)
+        max_pixels: Largest header width x height accepted at all
+        max_decode_pixels: Largest image decoded at full resolution; bigger
+            JPEGs are downscaled while decoding, other formats are rejected
+        spool_bytes: Part of an upload kept in memory before spilling to disk
+        allowed_formats: PIL format names accepted
+    """
+
+    def __init__(self, max_upload_bytes: int = 20 * 2**20, max_batch_bytes: int = 1024 * 2**20,
+                 max_pixels: int = 50_000_000, max_decode_pixels: int = 16_000_000,
+                 spool_bytes: int = 2**20, allowed_formats: Sequence[str] = ALLOWED_FORMATS):
+        self.max_upload_bytes = max_upload_bytes
+        self.max_batch_bytes = max_batch_bytes
+        self.max_pixels = max_pixels
+        self.max_decode_pixels = max_decode_pixels
+        self.spool_bytes = spool_bytes
+        self.allowed_formats = tuple(allowed_formats)
+
+    def as_dict(self) -> dict:
+        return {
+            "max_upload_bytes": self.max_upload_bytes,
+            "max_batch_bytes": self.max_batch_bytes,
+            "max_pixels": self.max_pixels,
+            "max_decode_pixels": self.max_decode_pixels,
+            "allowed_formats": list(self.allowed_formats),
+        }
+
+
+def limits_from_env(environ) -> IngestLimits:
+    """
+    Limits from ANIMAL_MAX_UPLOAD_MB (20), ANIMAL_MAX_BATCH_UPLOAD_MB (1024),
+    ANIMAL_MAX_IMAGE_PIXELS (50000000), ANIMAL_MAX_DECODE_PIXELS (16000000)
+    and ANIMAL_UPLOAD_SPOOL_MB (1).
+    """
+    mb = lambda name, default: int(float(environ.get(name, default)) * 2**20)  # noqa: E731
+    return IngestLimits(
+        max_upload_bytes=mb("ANIMAL_MAX_UPLOAD_MB", "20"),
+        max_batch_bytes=mb("ANIMAL_MAX_BATCH_UPLOAD_MB", "1024"),
+        max_pixels=int(environ.get("ANIMAL_MAX_IMAGE_PIXELS", "50000000")),
+        max_decode_pixels=int(environ.get("ANIMAL_MAX_DECODE_PIXELS", "16000000")),
+        spool_bytes=mb("ANIMAL_UPLOAD_SPOOL_MB", "1"))
+
+
+def _too_large(what: str, limit: int) -> UploadRejected:
+    return UploadRejected(status_code=413, detail=f"{what} exceeds the limit of {limit:,}")
+
+
+async def spool_upload(upload, limits: IngestLimits, max_bytes: Optional[int] = None):
+    """
+    Stream an UploadFile into a bounded SpooledTemporaryFile.
+
+    Reading stops as soon as the upload passes ``max_bytes`` (default
+    ``limits.max_upload_bytes``), so an oversized upload is never held whole.
+
+    Returns:
+        The spooled file, rewound to the start (the caller closes it)
+
+    Raises:
+        UploadRejected: If the upload is larger than the limit
+    """
+    max_bytes = max_bytes or limits.max_upload_bytes
+    if getattr(upload, "size", None) is not None and upload.size > max_bytes:
+        raise _too_large("Upload size in bytes", max_bytes)
+
+    spool = tempfile.SpooledTemporaryFile(max_size=limits.spool_bytes)
+    total = 0
+    while True:
+        chunk = await upload.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            spool.close()
+            raise _too_large("Upload size in bytes", max_bytes)
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+
+async def read_upload(upload, limits: IngestLimits) -> bytes:
+    """Bytes of an upload, read through spool_upload() so the size limit applies while reading."""
+    spool = await spool_upload(upload, limits)
+    with spool:
+        return spool.read()
+
+
+def check_image_header(source, limits: IngestLimits) -> dict:
+    """
+    Validate an image from its header alone (no pixel data is decoded).
+
+    Args:
+        source: Image bytes or a seekable binary file (rewound afterwards)
+        limits: Ingestion limits
+
+    Returns:
+        Dictionary with format, width, height and pixels
+
+    Raises:
+        UploadRejected: Unreadable or disallowed format (415), or too many pixels (413)
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    start = source.tell()
+    try:
+        with Image.open(source) as img:
+            image_format, (width, height) = img.format, img.size
+    except Image.DecompressionBombError:
+        raise _too_large("Image size in pixels", limits.max_pixels)
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        raise UploadRejected(status_code=415, detail="Upload is not a readable image")
+    finally:
+        source.seek(start)
+
+    if image_format not in limits.allowed_formats:
+        raise UploadRejected(status_code=415, detail=f"Unsupported image format {image_format}; "
+                                                     f"allowed: {', '.join(limits.allowed_formats)}")
+    pixels = width * height
+    if pixels > limits.max_pixels:
+        raise _too_large(f"Image size in pixels ({width}x{height})", limits.max_pixels)
+    if pixels > limits.max_decode_pixels and image_format != "JPEG":
+        # Only JPEG can be decoded straight to a smaller size
+        raise _too_large(f"{image_format} size in pixels ({width}x{height})", limits.max_decode_pixels)
+    return {"format": image_format, "width": width, "height": height, "pixels": pixels}
+
+
+def open_downscaled(source, limits: IngestLimits, info: Optional[dict] = None) -> Image.Image:
+    """
+    Decode an image as RGB with at most ``limits.max_decode_pixels`` pixels.
+
+    Oversized JPEGs are decoded in draft mode at the largest DCT scale that
+    still covers the target, so the full-resolution bitmap never exists.
+    """
+    info = info or check_image_header(source, limits)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    img = Image.open(source)
+    if info["pixels"] <= limits.max_decode_pixels:
+        return img.convert("RGB")
+
+    scale = (limits.max_decode_pixels / info["pixels"]) ** 0.5
+    target = (max(1, int(info["width"] * scale)), max(1, int(info["height"] * scale)))
+    img.draft("RGB", target)
+    img = img.convert("RGB")
+    img.thumbnail(target)
+    return img
+
+
+def store_image(source, path: str, limits: IngestLimits) -> dict:
+    """
+    Save an uploaded image to ``path`` after checking its header.
+
+    Images within ``max_decode_pixels`` are copied byte for byte; larger
+    JPEGs are downscaled while decoding and re-encoded, so later training
+    passes never decode them at full size either.
+
+    Returns:
+        The header info, plus ``downscaled_to`` when the image was resized
+    """
+    info = check_image_header(source, limits)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    if info["pixels"] <= limits.max_decode_pixels:
+        with open(path, "wb") as f:
+            shutil.copyfileobj(source, f)
+        return info
+
+    image = open_downscaled(source, limits, info)
+    image.save(path, format="JPEG", quality=95)
+    info["downscaled_to"] = list(image.size)
+    return info
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware capping request bodies before the form is parsed.
+
+    A declared Content-Length over the limit is refused outright; otherwise
+    the body is counted as it streams in, and the request fails with 413 as
+    soon as it passes the limit instead of being spooled to the end.
+    """
+
+    def __init__(self, app, max_bytes: int, path_limits: Optional[dict] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            return await self.app(scope, receive, send)
+
+        limit = self.path_limits.get(scope["path"], self.max_bytes)
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            return await _send_413(send, limit)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside form parsing, so the framework answers 413
+                    raise _too_large("Request body in bytes", limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def _send_413(send, limit: int):
+    body = f'{{"detail":"Request body exceeds the limit of {limit:,} bytes"}}'.encode("utf-8")
+    await send({"type": "http.response.start", "status": 413,
+                "headers": [(b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode("ascii"))]})
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,241 @@
+"""
+Training Job Queue
+Persistent queue that coalesces feedback corrections into background fine-tuning runs
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Optional
+
+JOBS_DB_PATH = "outputs/jobs.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner_pid INTEGER,
+    result TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS corrections (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id INTEGER NOT NULL REFERENCES jobs(id),
+    log_id INTEGER,
+    image TEXT NOT NULL,
+    predicted TEXT,
+    actual TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+CREATE INDEX IF NOT EXISTS idx_corrections_job ON corrections(job_id);
+"""
+
+
+def _pid_alive(pid: int) -> bool:
+    """True if a process with this pid exists on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # exists, owned by another user
+        return True
+    return True
+
+
+class TrainingJobQueue:
+    """
+    SQLite-backed queue of fine-tuning jobs with a single long-lived worker.
+
+    Every correction is attached to the one pending job, so corrections that
+    arrive while a job waits are coalesced into a single run. The worker
+    starts the pending job once it holds ``min_corrections`` corrections or
+    its oldest correction is ``max_wait_seconds`` old. Only one job runs at a
+    time, so trainers never overlap or race on the checkpoint.
+    """
+
+    def __init__(self, run_fn: Callable[[List[Dict[str, Any]]], Dict[str, Any]],
+                 db_path: str = JOBS_DB_PATH, min_corrections: int = 5,
+                 max_wait_seconds: float = 60.0, poll_interval: float = 1.0):
+        """
+        Args:
+            run_fn: Runs one job given its corrections; returns a JSON-serializable result
+            db_path: SQLite database file
+            min_corrections: Pending corrections that trigger a run immediately
+            max_wait_seconds: Age of the oldest pending correction that triggers a run
+            poll_interval: Seconds between worker checks when idle
+        """
+        self.run_fn = run_fn
+        self.db_path = db_path
+        self.min_corrections = max(min_corrections, 1)
+        self.max_wait_seconds = max_wait_seconds
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        # Every server worker opens the queue; the busy timeout serializes their writers
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None,
+                                     timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(corrections)")}
+        if "log_id" not in columns:  # queues created before log_id existed
+            self._conn.execute("ALTER TABLE corrections ADD COLUMN log_id INTEGER")
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "owner_pid" not in columns:  # queues created before owner_pid existed
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner_pid INTEGER")
+
+    def submit(self, image: str, predicted: str, actual: str,
+               log_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Attach a correction to the pending job (creating one if needed).
+
+        Args:
+            image: Path of the corrected image
+            predicted: Class the model predicted
+            actual: Class the user says is correct
+            log_id: ID of the matching correction log entry
+
+        Returns:
+            The pending job the correction was added to
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'pending' ORDER BY id LIMIT 1").fetchone()
+                if row is None:
+                    job_id = self._conn.execute(
+                        "INSERT INTO jobs (status, created_at) VALUES ('pending', ?)", (now,)).lastrowid
+                else:
+                    job_id = row["id"]
+                self._conn.execute(
+                    "INSERT INTO corrections (job_id, log_id, image, predicted, actual, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", (job_id, log_id, image, predicted, actual, now))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._wake.set()
+        return self.get(job_id)
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Return a job's status, timestamps, correction count and result."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            count = self._conn.execute(
+                "SELECT COUNT(*) FROM corrections WHERE job_id = ?", (job_id,)).fetchone()[0]
+        return {
+            "id": row["id"],
+            "status": row["status"],
+            "corrections": count,
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+        }
+
+    def start(self):
+        """Retry jobs orphaned by dead trainers, then start the worker thread."""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._recover_orphaned_jobs()
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._run, name="training-worker", daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        """Stop the worker after its current job."""
+        self._stop.set()
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join()
+
+    def _recover_orphaned_jobs(self):
+        """
+        Return running jobs whose trainer process is gone to the pending state.
+
+        Only processes that run a trainer call this (from start()), and a job
+        is reclaimed only when its owner pid no longer exists, so a server
+        worker starting up never resets a job another process is training.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, owner_pid FROM jobs WHERE status = 'running'").fetchall()
+                for row in rows:
+                    if row["owner_pid"] is not None and _pid_alive(row["owner_pid"]):
+                        continue
+                    # ♻️ A job that was running when its trainer died is retried
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'pending', started_at = NULL, owner_pid = NULL "
+                        "WHERE id = ?", (row["id"],))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _claim_ready_job(self) -> Optional[int]:
+        """Mark the pending job running if it crossed a threshold."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT j.id, COUNT(c.id) AS n, MIN(c.created_at) AS oldest "
+                "FROM jobs j JOIN corrections c ON c.job_id = j.id "
+                "WHERE j.status = 'pending' GROUP BY j.id ORDER BY j.id LIMIT 1").fetchone()
+            if row is None:
+                return None
+            if row["n"] < self.min_corrections and time.time() - row["oldest"] < self.max_wait_seconds:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, owner_pid = ? WHERE id = ?",
+                (time.time(), os.getpid(), row["id"]))
+            return row["id"]
+
+    def _corrections(self, job_id: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT log_id, image, predicted, actual, created_at FROM corrections "
+                "WHERE job_id = ? ORDER BY id", (job_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def _finish(self, job_id: int, status: str, result=None, error=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? WHERE id = ?",
+                (status, time.time(), json.dumps(result) if result is not None else None,
+                 error, job_id))
+
+    def _run(self):
+        while not self._stop.is_set():
+            job_id = self._claim_ready_job()
+            if job_id is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+
+            corrections = self._corrections(job_id)
+            print(f"🔁 Training job {job_id} started with {len(corrections)} correction(s)")
+            try:
+                result = self.run_fn(corrections)
+                self._finish(job_id, "succeeded", result=result)
+                print(f"✅ Training job {job_id} finished")
+            except Exception as e:
+                traceback.print_exc()
+                self._finish(job_id, "failed", error=str(e))
+                print(f"❌ Training job {job_id} failed: {e}")
@@ -1,21 +1,215 @@
+"""
+Correction Log
+Append-only, indexed store of user corrections (SQLite in WAL mode)
+"""
+
 import json
 import os
+import sqlite3
+import threading
+import time
 from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Union
 
-LOG_PATH = "outputs/correction_log.json"
+LOG_PATH = "outputs/correction_log.json"  # legacy whole-file JSON log
+LOG_DB_PATH = "outputs/corrections.db"
 os.makedirs("outputs", exist_ok=True)
 
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS corrections (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    image TEXT NOT NULL,
+    predicted TEXT,
+    actual TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    ts REAL NOT NULL,
+    consumed_at REAL,
+    consumed_by TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_corrections_ts ON corrections(ts);
+CREATE INDEX IF NOT EXISTS idx_corrections_actual ON corrections(actual, ts);
+CREATE INDEX IF NOT EXISTS idx_corrections_unconsumed ON corrections(id) WHERE consumed_at IS NULL;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+TimeLike = Union[datetime, float, str]
+
+
+def _to_epoch(value: TimeLike) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return float(value)
+
+
+class CorrectionLog:
+    """
+    Correction log with O(1) appends that is safe under concurrent writers.
+
+    Each correction is a single-row INSERT. WAL mode lets readers and the
+    writer work at the same time and batches fsyncs at checkpoints, and the
+    busy timeout serializes writers from other processes (for example the
+    API server and predict_and_correct.py). Indexes cover queries by time
+    range, by corrected class and for entries training has not consumed yet.
+    """
+
+    def __init__(self, db_path: str = LOG_DB_PATH, legacy_path: Optional[str] = LOG_PATH):
+        """
+        Args:
+            db_path: SQLite database file
+            legacy_path: Old JSON log to import once (None skips the migration)
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False,
+                                     isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        if legacy_path:
+            self.migrate_from_json(legacy_path)
+
+    def append(self, image: str, predicted: str, actual: str,
+               timestamp: Optional[datetime] = None) -> int:
+        """Append one correction and return its ID."""
+        timestamp = timestamp or datetime.now()
+        with self._lock:
+            return self._conn.execute(
+                "INSERT INTO corrections (image, predicted, actual, timestamp, ts) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (image, predicted, actual, str(timestamp), timestamp.timestamp())).lastrowid
+
+    def query(self, since: Optional[TimeLike] = None, until: Optional[TimeLike] = None,
+              actual: Optional[str] = None, unconsumed: bool = False,
+              limit: Optional[int] = None, newest_first: bool = False) -> List[Dict[str, Any]]:
+        """
+        Return corrections matching all given filters.
+
+        Args:
+            since: Inclusive lower time bound (datetime, epoch seconds or ISO string)
+            until: Exclusive upper time bound
+            actual: Only corrections to this class
+            unconsumed: Only corrections no training run has consumed yet
+            limit: Maximum number of rows
+            newest_first: Order by descending time instead of ascending
+        """
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(_to_epoch(since))
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(_to_epoch(until))
+        if actual is not None:
+            clauses.append("actual = ?")
+            params.append(actual)
+        if unconsumed:
+            clauses.append("consumed_at IS NULL")
+
+        sql = "SELECT * FROM corrections"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id DESC" if newest_first else " ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def recent(self, count: int) -> List[Dict[str, Any]]:
+        """The last ``count`` corrections, oldest first."""
+        return list(reversed(self.query(limit=count, newest_first=True)))
+
+    def unconsumed(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Corrections not yet used by a training run, oldest first."""
+        return self.query(unconsumed=True, limit=limit)
+
+    def mark_consumed(self, ids: Iterable[int], consumed_by: str = ""):
+        """Record that a training run used these corrections."""
+        ids = [i for i in ids if i is not None]
+        if not ids:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE corrections SET consumed_at = ?, consumed_by = ? WHERE id = ?",
+                [(now, consumed_by, i) for i in ids])
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM corrections").fetchone()[0]
+
+    def migrate_from_json(self, legacy_path: str) -> int:
+        """
+        Import the old whole-file JSON log once.
+
+        Imported entries are marked consumed, because the old flow fine-tuned
+        on every correction as it arrived. The JSON file is renamed to
+        ``*.migrated`` afterwards so it is not read again.
+
+        Returns:
+            Number of imported entries
+        """
+        if not os.path.exists(legacy_path):
+            return 0
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so concurrent processes
+            # cannot both import the file
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+                    self._conn.execute("ROLLBACK")
+                    return 0
+                with open(legacy_path, "r") as f:
+                    entries = json.load(f)
+
+                rows = []
+                for entry in entries:
+                    try:
+                        ts = datetime.fromisoformat(entry["timestamp"]).timestamp()
+                    except (KeyError, ValueError):
+                        ts = time.time()
+                    rows.append((entry.get("image", ""), entry.get("predicted"), entry.get("actual", ""),
+                                 entry.get("timestamp", ""), ts, ts, "legacy-json"))
+
+                self._conn.executemany(
+                    "INSERT INTO corrections (image, predicted, actual, timestamp, ts, consumed_at, consumed_by) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self._conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('json_migrated', ?)", (legacy_path,))
+                self._conn.execute("COMMIT")
+            except (OSError, ValueError) as e:
+                self._conn.execute("ROLLBACK")
+                print(f"[Warning] Could not migrate legacy correction log {legacy_path}: {e}")
+                return 0
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if os.path.exists(legacy_path):
+            os.replace(legacy_path, f"{legacy_path}.migrated")
+        print(f"📦 Migrated {len(rows)} corrections from {legacy_path} to {self.db_path}")
+        return len(rows)
+
+
+_default_log: Optional[CorrectionLog] = None
+_default_lock = threading.Lock()
+
+
+def get_correction_log() -> CorrectionLog:
+    """Process-wide CorrectionLog at LOG_DB_PATH (migrating LOG_PATH on first use)."""
+    global _default_log
+    with _default_lock:
+        if _default_log is None:
+            _default_log = CorrectionLog()
+        return _default_log
+
 
 def log_correction(image_path, predicted, actual):
-    log = []
-    if os.path.exists(LOG_PATH):
-        with open(LOG_PATH, "r") as f:
-            log = json.load(f)
-    log.append({
-        "image": image_path,
-        "predicted": predicted,
-        "actual": actual,
-        "timestamp": str(datetime.now())
-    })
-    with open(LOG_PATH, "w") as f:
-        json.dump(log, f, indent=2)
+    """Append a correction to the log and return its ID."""
+    return get_correction_log().append(image_path, predicted, actual)
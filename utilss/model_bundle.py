@@ -0,0 +1,169 @@
+"""
+Model Bundles
+Self-describing, memory-mapped weight files in the safetensors layout
+
+A bundle is ``<8-byte little-endian header length><JSON header><raw tensor
+bytes>``. The header maps every tensor name to its dtype, shape and byte
+range, and ``__metadata__`` carries the serving description (class names,
+normalization, input size, version, training-data fingerprint), so files
+stay readable by the ``safetensors`` library without depending on it.
+
+Loading maps the file copy-on-write and wraps each byte range in a tensor
+without copying, so processes serving the same bundle share its pages in
+the OS page cache. Reading the metadata needs only the header (no torch).
+"""
+
+import json
+import mmap
+import os
+import struct
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+BUNDLE_EXTENSION = ".safetensors"
+FORMAT_VERSION = 1
+
+# safetensors dtype names
+_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8", "BOOL": "bool",
+}
+
+
+def bundle_path(checkpoint_path: str) -> str:
+    """Bundle published next to a checkpoint (outputs/best_model.pth -> outputs/best_model.safetensors)."""
+    if checkpoint_path.endswith(BUNDLE_EXTENSION):
+        return checkpoint_path
+    return os.path.splitext(checkpoint_path)[0] + BUNDLE_EXTENSION
+
+
+def bundle_metadata(class_names: Sequence[str], data_fingerprint: Optional[str] = None,
+                    architecture: str = "AnimalCNN", **extra) -> Dict[str, Any]:
+    """Serving description stored with the weights (version fields are added on publish)."""
+    from utilss.preprocess import IMAGENET_MEAN, IMAGENET_STD, INPUT_SIZE
+
+    return {
+        "format_version": FORMAT_VERSION,
+        "architecture": architecture,
+        "classes": list(class_names),
+        "mean": list(IMAGENET_MEAN),
+        "std": list(IMAGENET_STD),
+        "input_size": INPUT_SIZE,
+        "data_fingerprint": data_fingerprint,
+        **extra,
+    }
+
+
+def write_bundle(f, state_dict, metadata: Dict[str, Any]):
+    """
+    Write a state_dict and its metadata as a bundle to the binary file ``f``.
+
+    Tensors are laid out by decreasing element size after an 8-byte aligned
+    header, so every tensor starts at a multiple of its element size.
+    """
+    import torch
+
+    reverse = {getattr(torch, name): code for code, name in _DTYPES.items()}
+    tensors = sorted(((name, t.detach().cpu().contiguous()) for name, t in state_dict.items()),
+                     key=lambda item: -item[1].element_size())
+
+    header = {"__metadata__": {"bundle": json.dumps(metadata)}}
+    offset = 0
+    for name, tensor in tensors:
+        size = tensor.numel() * tensor.element_size()
+        header[name] = {"dtype": reverse[tensor.dtype], "shape": list(tensor.shape),
+                        "data_offsets": [offset, offset + size]}
+        offset += size
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    header_bytes += b" " * (-len(header_bytes) % 8)
+
+    f.write(struct.pack("<Q", len(header_bytes)))
+    f.write(header_bytes)
+    for _, tensor in tensors:
+        if tensor.numel():
+            # Flattened first: 0-dim tensors (e.g. BatchNorm's num_batches_tracked) can't be viewed as bytes
+            f.write(memoryview(tensor.reshape(-1).view(torch.uint8).numpy()))
+
+
+def save_bundle(state_dict, path: str, metadata: Dict[str, Any]):
+    """Atomically write a state_dict and its metadata as a bundle (see write_bundle)."""
+    from utilss.model_registry import _atomic_write
+
+    _atomic_write(path, lambda f: write_bundle(f, state_dict, metadata))
+
+
+def _read_header(f) -> Tuple[int, Dict[str, Any]]:
+    (length,) = struct.unpack("<Q", f.read(8))
+    return 8 + length, json.loads(f.read(length))
+
+
+def read_bundle_metadata(path: str) -> Dict[str, Any]:
+    """Metadata of a bundle, reading only its header."""
+    with open(path, "rb") as f:
+        _, header = _read_header(f)
+    return json.loads(header.get("__metadata__", {}).get("bundle", "{}"))
+
+
+def current_bundle(checkpoint_path: str) -> Optional[str]:
+    """
+    Path of the bundle describing a checkpoint, or None.
+
+    A bundle left over from an older publish (the checkpoint was rewritten
+    by a tool that does not write bundles) is ignored: its version must
+    match the checkpoint's version record when there is one.
+    """
+    path = bundle_path(checkpoint_path)
+    if not os.path.exists(path):
+        return None
+    if path == checkpoint_path or not os.path.exists(checkpoint_path):
+        return path
+    try:
+        # Version sidecar written by model_registry.publish_checkpoint
+        with open(f"{checkpoint_path}.version.json", "r", encoding="utf-8") as f:
+            version = json.load(f).get("version")
+    except (OSError, ValueError):
+        # Same fallback as model_registry.read_version
+        from utilss.prediction_cache import model_fingerprint
+        version = f"unversioned-{model_fingerprint(checkpoint_path)}"
+    return path if read_bundle_metadata(path).get("version") == version else None
+
+
+def read_class_names(checkpoint_path: str) -> Optional[List[str]]:
+    """Class names stored with a checkpoint's bundle, or None when it has no current bundle."""
+    path = current_bundle(checkpoint_path)
+    return read_bundle_metadata(path).get("classes") if path else None
+
+
+def load_bundle(path: str, device=None):
+    """
+    Map a bundle's weights without copying them.
+
+    The file is mapped copy-on-write: pages come from (and stay shared in)
+    the page cache, and a later publish that replaces the file does not
+    disturb tensors of the old one.
+
+    Returns:
+        Tuple of (state_dict, metadata); tensors are copied only if
+        ``device`` is not the CPU
+    """
+    import torch
+
+    with open(path, "rb") as f:
+        data_start, header = _read_header(f)
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    metadata = json.loads(header.pop("__metadata__", {}).get("bundle", "{}"))
+    state_dict = {}
+    for name, info in header.items():
+        dtype = getattr(torch, _DTYPES[info["dtype"]])
+        start, end = info["data_offsets"]
+        if end > start:
+            tensor = torch.frombuffer(buffer, dtype=dtype, offset=data_start + start,
+                                      count=(end - start) // dtype.itemsize)
+        else:
+            tensor = torch.empty(0, dtype=dtype)
+        tensor = tensor.reshape(info["shape"])
+        if device is not None and torch.device(device).type != "cpu":
+            tensor = tensor.to(device)
+        state_dict[name] = tensor
+    return state_dict, metadata
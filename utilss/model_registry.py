@@ -0,0 +1,253 @@
+"""
+Model Registry
+Atomic checkpoint publishing with version IDs, and zero-downtime hot reload
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import torch
+
+from utilss.prediction_cache import model_fingerprint
+
+
+def version_path(checkpoint_path: str) -> str:
+    """Sidecar file holding the version record of a checkpoint."""
+    return f"{checkpoint_path}.version.json"
+
+
+def _write_temp(path: str, write_fn: Callable[[Any], None], mode: str = "wb") -> str:
+    """Write to a fsynced temp file in ``path``'s directory and return the temp file's path."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, mode) as f:
+            write_fn(f)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        _remove_quietly(tmp_path)
+        raise
+    return tmp_path
+
+
+def _remove_quietly(path: Optional[str]):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def _atomic_write(path: str, write_fn: Callable[[Any], None], mode: str = "wb"):
+    """Write to a temp file in the target directory, fsync it, then rename over ``path``."""
+    tmp_path = _write_temp(path, write_fn, mode)
+    try:
+        os.replace(tmp_path, path)
+    except BaseException:
+        _remove_quietly(tmp_path)
+        raise
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def publish_checkpoint(state_dict: Dict[str, torch.Tensor],
+                       checkpoint_path: str = "outputs/best_model.pth",
+                       metadata: Optional[Dict[str, Any]] = None,
+                       bundle: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Atomically publish a new checkpoint and its version record.
+
+    The weights (and the bundle, if any) are first written to temp files;
+    only when every file is complete are they renamed into place, in the
+    order checkpoint, bundle, version sidecar. A failure while writing
+    leaves the previous version intact, and readers see either the old or
+    the new file, never a partial one. The version sidecar is what servers
+    watch for, so it goes last.
+
+    Args:
+        state_dict: Model weights
+        checkpoint_path: Destination checkpoint path
+        metadata: Extra fields to store in the version record
+        bundle: Serving metadata (see utilss.model_bundle.bundle_metadata); when
+            given, a memory-mappable bundle is published next to the checkpoint
+            before the version record
+
+    Returns:
+        The new version ID
+    """
+    checkpoint_tmp = _write_temp(checkpoint_path, lambda f: torch.save(state_dict, f))
+    bundle_tmp = None
+    try:
+        sha256 = _sha256_file(checkpoint_tmp)
+        published_at = datetime.now(timezone.utc)
+        version = f"{published_at:%Y%m%d-%H%M%S}-{sha256[:8]}"
+        record = {
+            "version": version,
+            "published_at": published_at.isoformat(),
+            "sha256": sha256,
+            **(metadata or {}),
+        }
+        if bundle is not None:
+            from utilss.model_bundle import bundle_path, write_bundle
+            bundle_meta = {**bundle, "version": version, "published_at": record["published_at"]}
+            bundle_tmp = _write_temp(bundle_path(checkpoint_path),
+                                     lambda f: write_bundle(f, state_dict, bundle_meta))
+            record["data_fingerprint"] = bundle.get("data_fingerprint")
+
+        # ✅ Everything is on disk; commit checkpoint, bundle, then the version record
+        os.replace(checkpoint_tmp, checkpoint_path)
+        checkpoint_tmp = None
+        if bundle_tmp is not None:
+            from utilss.model_bundle import bundle_path
+            os.replace(bundle_tmp, bundle_path(checkpoint_path))
+            bundle_tmp = None
+    finally:
+        _remove_quietly(checkpoint_tmp)
+        _remove_quietly(bundle_tmp)
+
+    _atomic_write(version_path(checkpoint_path),
+                  lambda f: json.dump(record, f, indent=2), mode="w")
+    print(f"📦 Published checkpoint {checkpoint_path} as version {version}")
+    return version
+
+
+def read_version(checkpoint_path: str) -> Dict[str, Any]:
+    """
+    Return the version record of a checkpoint.
+
+    Checkpoints written before versioning existed (or by other tools) get a
+    fallback version derived from the file's size and mtime.
+    """
+    try:
+        with open(version_path(checkpoint_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"version": f"unversioned-{model_fingerprint(checkpoint_path)}"}
+
+
+class ModelManager:
+    """
+    Holds the active model and swaps in new checkpoint versions in the background.
+
+    The manager is itself a forward callable, so it can be handed to the
+    micro-batcher. Each call grabs the model reference once, which means a
+    batch that started on the old version finishes on it, while the next
+    batch picks up the new one. Nothing is dropped or blocked during a swap.
+    Models that know their labels expose ``class_names``; the list is swapped
+    together with the model, so labels always match the live version.
+    """
+
+    def __init__(self, loader: Callable[[], Callable], checkpoint_path: str,
+                 poll_interval: float = 2.0,
+                 warmup_input: Optional[torch.Tensor] = None):
+        """
+        Args:
+            loader: Builds a ready-to-serve model from ``checkpoint_path``
+            checkpoint_path: Checkpoint whose version record is watched
+            poll_interval: Seconds between version checks
+            warmup_input: Batch run once through a new model before it goes live
+        """
+        self.loader = loader
+        self.checkpoint_path = checkpoint_path
+        self.poll_interval = poll_interval
+        self.warmup_input = warmup_input if warmup_input is not None \
+            else torch.zeros(1, 3, 224, 224)
+
+        # (model, version record, loaded_at, class names) swapped as one reference
+        self._active = (None, {"version": None}, None, None)
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def model(self):
+        return self._active[0]
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._active[1]["version"]
+
+    @property
+    def class_names(self) -> Optional[List[str]]:
+        """Labels of the live model, or None if its loader did not provide them."""
+        return self._active[3]
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        model = self._active[0]
+        if model is None:
+            raise RuntimeError("No model loaded")
+        return model(batch)
+
+    def load(self) -> bool:
+        """
+        Load the current checkpoint version if it differs from the active one.
+
+        Returns:
+            True if a new model went live
+        """
+        with self._reload_lock:
+            record = read_version(self.checkpoint_path)
+            if record["version"] == self.version:
+                return False
+
+            try:
+                model = self.loader()
+                # A publish that raced with the load leaves a hash mismatch; retry next poll
+                if "sha256" in record and _sha256_file(self.checkpoint_path) != record["sha256"]:
+                    raise RuntimeError("checkpoint changed while loading")
+                with torch.no_grad():
+                    model(self.warmup_input)
+            except Exception as e:
+                self.last_error = f"{record['version']}: {e}"
+                print(f"❌ Could not load model version {record['version']}: {e}")
+                return False
+
+            previous = self.version
+            self._active = (model, record, datetime.now(timezone.utc),
+                            getattr(model, "class_names", None))
+            self.last_error = None
+            if previous is not None:
+                self.reloads += 1
+                print(f"🔄 Hot-swapped model {previous} -> {record['version']}")
+            return True
+
+    def start(self):
+        """Start the background watcher thread."""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        """Stop the background watcher thread."""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.load()
+
+    def info(self) -> dict:
+        """Active version details for /health."""
+        _, record, loaded_at, _ = self._active
+        return {
+            "model_version": record["version"],
+            "published_at": record.get("published_at"),
+            "loaded_at": loaded_at.isoformat() if loaded_at else None,
+            "reloads": self.reloads,
+            "last_reload_error": self.last_error,
+        }
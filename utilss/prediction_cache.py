@@ -0,0 +1,256 @@
+"""
+Prediction Cache
+Content-addressed cache for /predict results with in-flight request coalescing
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+TRASH_PREFIX = ".stale-"
+
+
+def _remove_trees(paths):
+    for path in paths:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def model_fingerprint(model_path: str) -> str:
+    """
+    Cheap version tag for a checkpoint file, based on its size and mtime.
+
+    Args:
+        model_path: Path to the checkpoint
+
+    Returns:
+        Hex fingerprint, or "missing" if the file does not exist
+    """
+    try:
+        stat = os.stat(model_path)
+    except OSError:
+        return "missing"
+    return f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+
+class PredictionCache:
+    """
+    Two-tier cache of prediction results keyed by image hash + model version.
+
+    The memory tier is an LRU of ``max_entries`` results. The optional disk
+    tier stores one JSON file per result under ``disk_dir/<model version>/``
+    and survives restarts. Whenever the model version changes, the memory
+    tier is cleared and disk entries of older versions are removed.
+
+    Concurrent lookups of the same key share a single computation.
+    """
+
+    def __init__(self, model_path: Optional[str] = None,
+                 version_fn: Optional[Callable[[], str]] = None,
+                 max_entries: int = 1024, disk_dir: Optional[str] = None,
+                 version_check_interval: float = 1.0):
+        """
+        Args:
+            model_path: Checkpoint whose fingerprint versions the cache
+            version_fn: Callable returning the model version (overrides model_path)
+            max_entries: Capacity of the in-memory LRU tier
+            disk_dir: Directory for the on-disk tier (None disables it)
+            version_check_interval: Seconds between model version checks
+        """
+        if version_fn is None:
+            if model_path is None:
+                raise ValueError("Either model_path or version_fn is required")
+            version_fn = lambda: model_fingerprint(model_path)  # noqa: E731
+        self.version_fn = version_fn
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.version_check_interval = version_check_interval
+
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._version: Optional[str] = None
+        self._version_checked_at = 0.0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self.uncached = 0
+
+    @staticmethod
+    def content_hash(contents: bytes) -> str:
+        """SHA-256 of the uploaded bytes."""
+        return hashlib.sha256(contents).hexdigest()
+
+    def current_version(self) -> str:
+        """Return the model version, invalidating stale entries when it changed."""
+        now = time.monotonic()
+        if self._version is not None and now - self._version_checked_at < self.version_check_interval:
+            return self._version
+        self._version_checked_at = now
+
+        version = self.version_fn()
+        if version != self._version:
+            if self._version is not None:
+                self.invalidations += 1
+                print(f"🔄 Model version changed ({self._version} -> {version}), clearing prediction cache")
+            self._memory.clear()
+            self._version = version
+            self._prune_disk(keep=version)
+        return version
+
+    async def get_or_compute(self, contents: bytes,
+                             compute: Callable[[], Awaitable[Dict[str, Any]]],
+                             cacheable: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Dict[str, Any]:
+        """
+        Return the cached result for ``contents`` or compute it once.
+
+        Args:
+            contents: Raw uploaded image bytes
+            compute: Coroutine function producing the result on a miss
+            cacheable: Predicate on a computed result; results it rejects are
+                returned (also to coalesced waiters) but never stored
+
+        Returns:
+            The prediction result dictionary
+        """
+        version = self.current_version()
+        digest = self.content_hash(contents)
+        key = f"{version}:{digest}"
+
+        result = self._memory.get(key)
+        if result is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return result
+
+        # 🤝 Singleflight: identical in-flight requests wait on one computation
+        while True:
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The request computing it was cancelled (e.g. its client left):
+                # take over the computation unless this request was cancelled
+                if not pending.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._read_disk(version, digest)
+            if result is not None:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+                result = await compute()
+                if cacheable is not None and not cacheable(result):
+                    self.uncached += 1
+                    future.set_result(result)
+                    return result
+                await self._write_disk(version, digest, result)
+            self._remember(key, result)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        """Return hit/miss counters."""
+        lookups = self.hits + self.disk_hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "uncached": self.uncached,
+            "hit_rate": round((lookups - self.misses) / lookups, 4) if lookups else 0.0,
+            "entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "disk_enabled": self.disk_dir is not None,
+            "invalidations": self.invalidations,
+            "model_version": self._version,
+        }
+
+    def _remember(self, key: str, result: Dict[str, Any]):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, version: str, digest: str) -> str:
+        return os.path.join(self.disk_dir, version, digest[:2], f"{digest}.json")
+
+    async def _read_disk(self, version: str, digest: str) -> Optional[Dict[str, Any]]:
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(version, digest)
+
+        def read():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return None
+
+        return await asyncio.get_running_loop().run_in_executor(None, read)
+
+    async def _write_disk(self, version: str, digest: str, result: Dict[str, Any]):
+        if self.disk_dir is None:
+            return
+        path = self._disk_path(version, digest)
+
+        def write():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(result, f)
+            os.replace(tmp_path, path)
+
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, write)
+        except OSError as e:
+            print(f"[Warning] Could not write prediction cache entry: {e}")
+
+    def _prune_disk(self, keep: str):
+        """
+        Delete on-disk entries written for other model versions.
+
+        Old version directories are renamed out of the way (cheap, so fine on
+        the event loop) and deleted by a background thread, since removing a
+        large cache tree would otherwise stall every in-flight request.
+        """
+        if self.disk_dir is None or not os.path.isdir(self.disk_dir):
+            return
+        stale = []
+        for name in os.listdir(self.disk_dir):
+            if name == keep:
+                continue
+            path = os.path.join(self.disk_dir, name)
+            if not name.startswith(TRASH_PREFIX):
+                trash = os.path.join(self.disk_dir, f"{TRASH_PREFIX}{name}-{os.getpid()}-{time.time_ns()}")
+                try:
+                    os.rename(path, trash)
+                except OSError:  # already moved by another worker
+                    continue
+                path = trash
+            stale.append(path)
+        if stale:
+            threading.Thread(target=_remove_trees, args=(stale,),
+                             name="cache-prune", daemon=True).start()
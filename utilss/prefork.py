@@ -0,0 +1,128 @@
+"""
+Pre-Fork Model Sharing
+Load the serving model once in a parent process and share its weights with forked workers
+"""
+
+import gc
+import itertools
+import os
+from typing import List, Optional
+
+import torch
+
+from data.loaders import available_cpus
+from utilss.model_registry import read_version
+
+# Set in the parent before forking; workers inherit it through fork
+_preloaded = {}
+
+
+def _tensors(model):
+    """Parameters and buffers of a module (TorchScript and eager alike)"""
+    if not isinstance(model, torch.nn.Module):
+        return []
+    return list(itertools.chain(model.parameters(), model.buffers()))
+
+
+def preload_backend(backend, path: str) -> dict:
+    """
+    Freeze a loaded backend and move its weights to shared memory.
+
+    The weights of eager and TorchScript modules are moved into shared
+    memory, so every forked worker maps the same pages instead of holding a
+    copy. Eager weights mapped from a model bundle are already shared
+    through the page cache and stay where they are. Weights the module does
+    not expose as tensors (frozen TorchScript constants, INT8 packed params,
+    ONNX Runtime sessions) stay in the parent's heap; they are only ever
+    read, so forked workers still share them copy-on-write.
+
+    Args:
+        backend: Result of utilss.inference_backend.load_backend()
+        path: Artifact the backend was loaded from (its version record is kept)
+
+    Returns:
+        Dictionary with the version and the number of shared bytes
+    """
+    model = getattr(backend, "model", None)
+    mapped = getattr(backend, "bundle", None) is not None
+    shared_bytes = 0
+    if isinstance(model, torch.nn.Module):
+        model.eval()
+        for tensor in _tensors(model):
+            tensor.requires_grad_(False)
+            if not mapped:
+                tensor.share_memory_()
+            shared_bytes += tensor.numel() * tensor.element_size()
+
+    version = read_version(path)["version"]
+    _preloaded[os.path.abspath(path)] = (version, backend)
+    return {"version": version, "shared_bytes": shared_bytes}
+
+
+def preloaded_backend(path: str):
+    """
+    The backend preloaded for ``path`` if it is still the published version.
+
+    Workers call this from their model loader; once a newer version has
+    been published the worker loads it itself (hot reload keeps working,
+    the new weights are just no longer shared until the launcher restarts).
+    """
+    entry = _preloaded.get(os.path.abspath(path))
+    if entry is None or entry[0] != read_version(path)["version"]:
+        return None
+    return entry[1]
+
+
+def freeze_heap():
+    """Move every live object to the GC's permanent generation before forking,
+    so collections in the workers don't write to (and un-share) parent pages."""
+    gc.collect()
+    gc.freeze()
+
+
+def worker_cpus(index: int, workers: int, cpus: Optional[List[int]] = None) -> List[int]:
+    """Contiguous, disjoint share of the usable cores for worker ``index``"""
+    cpus = sorted(cpus or (os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity")
+                           else range(available_cpus())))
+    per_worker = max(1, len(cpus) // workers)
+    start = (index * per_worker) % len(cpus)
+    return cpus[start:start + per_worker]
+
+
+def pin_worker(cpus: List[int], num_threads: Optional[int] = None) -> int:
+    """
+    Restrict this process to ``cpus`` and size torch's thread pool to match.
+
+    Returns:
+        The intra-op thread count
+    """
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    num_threads = num_threads or len(cpus)
+    torch.set_num_threads(num_threads)
+    return num_threads
+
+
+def memory_usage(pid: int = None) -> dict:
+    """
+    RSS and PSS of a process in MB (Linux /proc).
+
+    PSS splits shared pages between the processes mapping them, so the PSS
+    of all workers adds up to their real combined footprint; RSS counts
+    shared weights once per worker.
+    """
+    pid = pid or os.getpid()
+    usage = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS:", "RssAnon:", "RssShmem:")):
+                key, value = line.split(":")
+                usage[key.lower().replace("vm", "")] = int(value.split()[0]) / 1024
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    usage["pss"] = int(line.split()[1]) / 1024
+    except OSError:  # kernels without smaps_rollup
+        pass
+    return {f"{key}_mb": round(value, 1) for key, value in usage.items()}
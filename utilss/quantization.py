@@ -0,0 +1,101 @@
+"""
+INT8 Quantization
+Post-training quantization of AnimalCNN for CPU serving
+"""
+
+import io
+import os
+import time
+from typing import Iterable, Optional
+
+import torch
+from torch import nn
+from torch.ao.quantization import get_default_qconfig_mapping, quantize_dynamic
+from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+from utilss.inference_backend import QUANTIZED_MODEL_PATH
+from utilss.preprocess import INPUT_SIZE
+
+
+def quantize_model(model: nn.Module, calibration_batches: Iterable[torch.Tensor],
+                   backend: str = "fbgemm") -> torch.jit.ScriptModule:
+    """
+    Quantize a trained float AnimalCNN to INT8.
+
+    The convolutional backbone gets static post-training quantization
+    (FX graph mode, observers calibrated on ``calibration_batches``); the
+    ``fc`` head is left in float during that step and then gets dynamic
+    quantization, which quantizes activations per call and suits the small
+    Linear layers better than a fixed calibrated scale.
+
+    Args:
+        model: Trained float AnimalCNN (moved to CPU)
+        calibration_batches: Iterable of ``(N, 3, H, W)`` normalized image batches
+        backend: Quantized engine, "fbgemm" (x86) or "qnnpack" (ARM)
+
+    Returns:
+        TorchScript module running INT8 inference on CPU
+    """
+    torch.backends.quantized.engine = backend
+    model = model.cpu().eval()
+    example_inputs = (torch.randn(1, 3, INPUT_SIZE, INPUT_SIZE),)
+
+    # 🧮 Static PTQ for the backbone; fc stays float for now
+    qconfig_mapping = get_default_qconfig_mapping(backend).set_module_name("base_model.fc", None)
+    prepared = prepare_fx(model, qconfig_mapping, example_inputs)
+
+    with torch.no_grad():
+        for batch in calibration_batches:
+            prepared(batch)
+
+    quantized = convert_fx(prepared)
+
+    # 🔢 Dynamic quantization for the Linear layers of the head
+    quantized = quantize_dynamic(quantized, {nn.Linear}, dtype=torch.qint8)
+
+    return torch.jit.trace(quantized, example_inputs)
+
+
+def save_quantized_model(model: torch.jit.ScriptModule, path: str = QUANTIZED_MODEL_PATH):
+    """Save a quantized TorchScript model."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    torch.jit.save(model, path)
+
+
+def load_quantized_model(path: str = QUANTIZED_MODEL_PATH,
+                         backend: Optional[str] = None) -> torch.jit.ScriptModule:
+    """
+    Load a quantized TorchScript artifact for CPU inference.
+
+    Args:
+        path: Path written by save_quantized_model()
+        backend: Quantized engine to select before loading (default: keep current)
+    """
+    if backend:
+        torch.backends.quantized.engine = backend
+    model = torch.jit.load(path, map_location="cpu")
+    model.eval()
+    return model
+
+
+def serialized_size_mb(model: nn.Module) -> float:
+    """Size of the model's serialized weights in megabytes."""
+    buffer = io.BytesIO()
+    if isinstance(model, torch.jit.ScriptModule):
+        torch.jit.save(model, buffer)
+    else:
+        torch.save(model.state_dict(), buffer)
+    return buffer.tell() / 1e6
+
+
+def measure_latency(model: nn.Module, batch_size: int = 1, repeats: int = 30,
+                    warmup: int = 5, input_size: int = INPUT_SIZE) -> float:
+    """Mean forward latency in milliseconds for a random batch on CPU."""
+    inputs = torch.randn(batch_size, 3, input_size, input_size)
+    with torch.no_grad():
+        for _ in range(warmup):
+            model(inputs)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            model(inputs)
+    return (time.perf_counter() - start) / repeats * 1000.0
@@ -0,0 +1,190 @@
+"""
+Replay Buffer
+Persistent, class-balanced reservoir of dataset images for feedback training (SQLite)
+"""
+
+import os
+import random
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+REPLAY_BUFFER_PATH = "outputs/replay_buffer.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS replay_classes (
+    class_name TEXT PRIMARY KEY,
+    seen INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS replay_items (
+    class_name TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (class_name, slot)
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+class ReplayBuffer:
+    """
+    Fixed-capacity reservoir sample of every class's images.
+
+    Each class keeps at most ``capacity`` paths chosen by reservoir
+    sampling, so every image ever added to a class is equally likely to be
+    in the buffer no matter when it arrived. add() is O(1) and sample()
+    draws the same number of paths from every class, however large the
+    dataset grows. sync() reconciles the per-class counts with the dataset
+    and rebuilds only classes that changed without going through add().
+    Paths are stored relative to the dataset root.
+
+    The reservoir lives in SQLite: every add() and sync() is one
+    transaction under the write lock, so pre-forked server workers and
+    offline scripts update the same buffer without overwriting each other
+    (the old JSON file is not imported; the next sync() rebuilds from the dataset).
+    """
+
+    def __init__(self, path: str = REPLAY_BUFFER_PATH, capacity: int = 256,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            path: SQLite database file
+            capacity: Paths kept per class
+            seed: Seed for reservoir and sampling decisions
+        """
+        self.path = path
+        self.capacity = capacity
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False,
+                                     isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+        # A buffer kept at another capacity is emptied; the next sync() rebuilds it
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT value FROM meta WHERE key = 'capacity'").fetchone()
+                if row is None or int(row[0]) != capacity:
+                    self._conn.execute("DELETE FROM replay_items")
+                    self._conn.execute("DELETE FROM replay_classes")
+                    self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('capacity', ?)",
+                                       (str(capacity),))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def add(self, rel_path: str, class_name: str):
+        """Reservoir-insert one newly arrived image."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT seen FROM replay_classes WHERE class_name = ?",
+                                         (class_name,)).fetchone()
+                seen = (row[0] if row else 0) + 1
+                self._conn.execute("INSERT OR REPLACE INTO replay_classes (class_name, seen) VALUES (?, ?)",
+                                   (class_name, seen))
+                slot = seen - 1 if seen <= self.capacity else self._rng.randrange(seen)
+                if slot < self.capacity:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO replay_items (class_name, slot, path) VALUES (?, ?, ?)",
+                        (class_name, slot, rel_path))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def sync(self, dataset) -> int:
+        """
+        Rebuild the reservoirs of classes whose image count no longer matches ``dataset``.
+
+        Args:
+            dataset: AnimalDataset (uses ``samples``, ``class_map`` and ``root_dir``)
+
+        Returns:
+            Number of classes rebuilt
+        """
+        class_names = {idx: name for name, idx in dataset.class_map.items()}
+        by_class = defaultdict(list)
+        for img_path, label in dataset.samples:
+            by_class[class_names[label]].append(img_path)
+
+        rebuilt = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                seen = dict(self._conn.execute("SELECT class_name, seen FROM replay_classes"))
+                for class_name in set(seen) - set(by_class):
+                    self._conn.execute("DELETE FROM replay_items WHERE class_name = ?", (class_name,))
+                    self._conn.execute("DELETE FROM replay_classes WHERE class_name = ?", (class_name,))
+                    rebuilt += 1
+                for class_name, paths in by_class.items():
+                    if seen.get(class_name) == len(paths):
+                        continue
+                    chosen = self._rng.sample(paths, min(self.capacity, len(paths)))
+                    self._conn.execute("DELETE FROM replay_items WHERE class_name = ?", (class_name,))
+                    self._conn.executemany(
+                        "INSERT INTO replay_items (class_name, slot, path) VALUES (?, ?, ?)",
+                        [(class_name, slot, os.path.relpath(p, dataset.root_dir).replace(os.sep, "/"))
+                         for slot, p in enumerate(chosen)])
+                    self._conn.execute("INSERT OR REPLACE INTO replay_classes (class_name, seen) VALUES (?, ?)",
+                                       (class_name, len(paths)))
+                    rebuilt += 1
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return rebuilt
+
+    def sample(self, per_class: int, exclude: Iterable[str] = (),
+               classes: Optional[Iterable[str]] = None) -> List[Tuple[str, str]]:
+        """
+        Draw up to ``per_class`` paths from every class.
+
+        Args:
+            per_class: Paths per class
+            exclude: Relative paths never to return (e.g. the corrections themselves)
+            classes: Restrict to these classes (default: all)
+
+        Returns:
+            List of (relative path, class name), at most ``per_class`` per class
+        """
+        exclude = set(exclude)
+        with self._lock:
+            if classes is None:
+                classes = [row[0] for row in self._conn.execute(
+                    "SELECT class_name FROM replay_classes ORDER BY class_name")]
+            items = {class_name: [row[0] for row in self._conn.execute(
+                "SELECT path FROM replay_items WHERE class_name = ? ORDER BY slot", (class_name,))]
+                for class_name in classes}
+
+        picked = []
+        for class_name, paths in items.items():
+            candidates = [p for p in paths if p not in exclude]
+            kept = self._rng.sample(candidates, min(len(candidates), per_class))
+            picked.extend((p, class_name) for p in kept)
+        return picked
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT c.class_name, c.seen, COUNT(i.slot) FROM replay_classes c "
+                "LEFT JOIN replay_items i ON i.class_name = c.class_name GROUP BY c.class_name").fetchall()
+        return {name: {"seen": seen, "buffered": buffered} for name, seen, buffered in rows}
+
+
+_default_buffer: Optional[ReplayBuffer] = None
+_default_lock = threading.Lock()
+
+
+def get_replay_buffer() -> ReplayBuffer:
+    """Process-wide ReplayBuffer at REPLAY_BUFFER_PATH."""
+    global _default_buffer
+    with _default_lock:
+        if _default_buffer is None:
+            _default_buffer = ReplayBuffer()
+        return _default_buffer